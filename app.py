@@ -1,26 +1,32 @@
-import streamlit as st
-import pandas as pd
-import datetime
-from fpdf import FPDF
-import io
-import pickle
-import base64
-import streamlit.components.v1 as components
-
-# --- FILET DE SÉCURITÉ POUR PLOTLY ---
-try:
-    import plotly.express as px
-except ModuleNotFoundError:
-    px = None
-
-# --- FILET DE SÉCURITÉ POUR MATPLOTLIB / NUMPY (EXPORT PDF VISUEL) ---
-try:
-    import matplotlib.pyplot as plt
-    import matplotlib.patches as patches
+import time
+T0_SCRIPT = time.perf_counter()
+# Chronométrage des imports (rapport de démarrage dans l'onglet Admin) : crochet limité à ce bloc
+from regie import demarrage
+with demarrage.mesure_imports():
+    import streamlit as st
+    import pandas as pd
     import numpy as np
-    MATPLOTLIB_AVAILABLE = True
-except ModuleNotFoundError:
-    MATPLOTLIB_AVAILABLE = False
+    import datetime
+    import io
+    import os
+    import base64
+    import streamlit.components.v1 as components
+    from regie.besoins import BesoinsCache, pics_fenetre
+    from regie.cache import ExportCache, empreinte
+    from regie.catalogue import RegistreCatalogues
+    from regie.conflits import ConflitsCache
+    from regie.documents import contenu_besoins, contenu_patch, generer_xlsx_easyjob, get_migrated_contacts
+    from regie.edition import appliquer_edition
+    from regie.horaires import DEBUT_JOURNEE, PHASES, fin_par_duree, minute, minutes_vers_texte, phases_longues, rebaser
+    from regie.index import index_a_jour
+    from regie.projet import ProjetArchive, ProjetWriter, charger_pickle_legacy, est_archive_projet, normaliser_etat
+    from regie.logo import preparer_logo
+    from regie.ordonnanceur import Infaisable, appliquer, durees_planning, ordonnancer
+    from regie.patch import FORMATS_PATCH, TAILLES_MASTER, PatchAllocator, infrastructure, libelle_boitier, libelle_input, nb_boitiers, patch_automatique, projeter_tables, signature_patch, table_patch, table_patch_vide, taille_master
+    from regie.planning import MATPLOTLIB_AVAILABLE, build_planning_grid, generer_pdf_planning_mural, generer_pdf_planning_visuel, pages_planning_mural
+    from regie.riders import RiderStore
+    from regie.schema import SCHEMAS, table_vide, typer, vers_editeur
+    from regie.timeline import PLOTLY_AVAILABLE, donnees_timeline, figure_timeline
 
 # --- CONFIGURATION DE LA PAGE ---
 st.set_page_config(page_title="Regie-Festival", layout="wide", initial_sidebar_state="collapsed")
@@ -37,19 +43,6 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# --- AMÉLIORATION : POP-UP TIMER (JAVASCRIPT) ---
-st.components.v1.html(
-    """
-    <script>
-    setInterval(function(){
-        alert("💾 RAPPEL : Pensez à sauvegarder votre projet dans l'onglet 'Admin' !");
-    }, 600000);
-    </script>
-    """,
-    height=0,
-    width=0
-)
-
 # --- HELPER : LISTE DES HEURES (PAS DE 5 MIN) ---
 def get_time_options():
     times = ["-- none --"]
@@ -61,25 +54,14 @@ def get_time_options():
 time_options = get_time_options()
 
 # --- INITIALISATION DES VARIABLES DE SESSION ---
-cols_planning = [
-    "Scène", "Jour", "Artiste", 
-    "Load IN Début", "Load IN Fin", 
-    "Inst Off Début", "Inst Off Fin", 
-    "Inst On Début", "Inst On Fin", 
-    "Balance Début", "Balance Fin", 
-    "Change Over Début", "Change Over Fin", 
-    "Show Début", "Show Fin"
-]
-
-if 'planning' not in st.session_state:
-    st.session_state.planning = pd.DataFrame(columns=cols_planning)
-else:
-    for col in cols_planning:
-        if col not in st.session_state.planning.columns:
-            st.session_state.planning[col] = "-- none --"
-
-if 'fiches_tech' not in st.session_state:
-    st.session_state.fiches_tech = pd.DataFrame(columns=["Scène", "Jour", "Groupe", "Catégorie", "Marque", "Modèle", "Quantité", "Artiste_Apporte"])
+if 'debut_journee' not in st.session_state:
+    st.session_state.debut_journee = DEBUT_JOURNEE
+for nom_table in SCHEMAS:
+    if nom_table not in st.session_state:
+        st.session_state[nom_table] = table_vide(nom_table)
+    else:
+        st.session_state[nom_table] = typer(nom_table, st.session_state[nom_table], st.session_state.debut_journee)
+
 if 'riders_stockage' not in st.session_state:
     st.session_state.riders_stockage = {}
 if 'artist_circuits' not in st.session_state:
@@ -94,14 +76,24 @@ if 'festival_name' not in st.session_state:
     st.session_state.festival_name = "MON FESTIVAL"
 if 'festival_logo' not in st.session_state:
     st.session_state.festival_logo = None
-if 'custom_catalog' not in st.session_state:
-    st.session_state.custom_catalog = {} 
-if 'easyjob_mapping' not in st.session_state:
-    st.session_state.easyjob_mapping = {}
+if 'catalogue_version' not in st.session_state:
+    st.session_state.catalogue_version = None
+if 'fenetre_besoins' not in st.session_state:
+    st.session_state.fenetre_besoins = 2
+if 'projet_writer' not in st.session_state:
+    st.session_state.projet_writer = ProjetWriter()
+if 'index_tables' not in st.session_state:
+    st.session_state.index_tables = {}
+if 'besoins_cache' not in st.session_state:
+    st.session_state.besoins_cache = BesoinsCache()
+if 'conflits_cache' not in st.session_state:
+    st.session_state.conflits_cache = ConflitsCache()
+if 'infra_scenes' not in st.session_state:
+    st.session_state.infra_scenes = {}
+if 'allocateurs_patch' not in st.session_state:
+    st.session_state.allocateurs_patch = {}
 if 'notes_artistes' not in st.session_state:
     st.session_state.notes_artistes = {}
-if 'alim_elec' not in st.session_state:
-    st.session_state.alim_elec = pd.DataFrame(columns=["Scène", "Jour", "Groupe", "Format", "Métier", "Emplacement"])
 
 if 'contacts_festival' not in st.session_state:
     st.session_state.contacts_festival = {}
@@ -110,1155 +102,815 @@ if 'contacts_scenes' not in st.session_state:
 if 'contacts_artistes' not in st.session_state:
     st.session_state.contacts_artistes = {}
 
-# --- HELPER CONTACTS MIGRATION ---
-def get_migrated_contacts(contact_data, default_roles_map):
-    if isinstance(contact_data, pd.DataFrame):
-        if "Canal Talkie" not in contact_data.columns:
-            contact_data["Canal Talkie"] = ""
-        return contact_data
-    records = []
-    if isinstance(contact_data, dict) and contact_data:
-        for code, data in contact_data.items():
-            if isinstance(data, dict):
-                records.append({
-                    "Rôle": default_roles_map.get(code, code),
-                    "Nom": data.get("Nom", ""),
-                    "Prénom": data.get("Prénom", ""),
-                    "Tel": data.get("Tel", ""),
-                    "Mail": data.get("Mail", ""),
-                    "Canal Talkie": ""
-                })
-    return pd.DataFrame(records, columns=["Rôle", "Nom", "Prénom", "Tel", "Mail", "Canal Talkie"])
-
-
-# --- FONCTION TECHNIQUE POUR LE RENDU PDF STANDARD (PLANNING / PATCH) ---
-class FestivalPDF(FPDF):
-    def header(self):
-        if st.session_state.festival_logo:
-            try:
-                import tempfile
-                import os
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-                    tmp_file.write(st.session_state.festival_logo)
-                    tmp_path = tmp_file.name
-                self.image(tmp_path, 10, 8, 33)
-                os.unlink(tmp_path)
-            except: pass
-
-        self.set_font("helvetica", "B", 15)
-        offset_x = 45 if st.session_state.festival_logo else 10
-        self.set_xy(offset_x, 10)
-        self.cell(0, 10, st.session_state.festival_name.upper(), ln=1)
-        
-        self.set_font("helvetica", "I", 8)
-        self.set_xy(offset_x, 18)
-        self.cell(0, 5, f"Généré le {datetime.datetime.now().strftime('%d/%m/%Y à %H:%M')}", ln=1)
-        self.ln(10)
-
-    def ajouter_titre_section(self, titre):
-        self.set_font("helvetica", "B", 12)
-        self.set_fill_color(240, 240, 240)
-        self.cell(0, 10, titre, ln=True, fill=True, border="B")
-        self.ln(2)
-
-    def dessiner_texte(self, texte):
-        self.set_font("helvetica", "", 10)
-        val = str(texte).encode('latin-1', 'replace').decode('latin-1')
-        self.multi_cell(0, 6, val)
-        self.ln(5)
-
-    def dessiner_tableau(self, df):
-        if df.empty: return
-        self.set_font("helvetica", "B", 9)
-        cols = list(df.columns)
-        col_width = (self.w - 20) / len(cols)
-        
-        estimated_height = 8 + (len(df) * 6) + 5
-        if estimated_height < (self.h - 30) and (self.get_y() + estimated_height) > (self.h - 20):
-            self.add_page()
-            
-        self.set_fill_color(220, 230, 255)
-        for col in cols:
-            self.cell(col_width, 8, str(col), border=1, fill=True, align='C')
-        self.ln()
-        
-        self.set_font("helvetica", "", 8)
-        for _, row in df.iterrows():
-            if self.get_y() > (self.h - 20): self.add_page()
-            for item in row:
-                val = str(item).replace('\n', ' ').encode('latin-1', 'replace').decode('latin-1')
-                self.cell(col_width, 6, val, border=1, align='C')
-            self.ln()
-        self.ln(5)
-
-    def dessiner_planning_grille(self, df_grid):
-        if df_grid.empty: return
-        self.set_font("helvetica", "B", 10)
-        
-        col_w = [25, 25, 45, 0]
-        headers = ["DÉBUT", "FIN", "PHASE", "ARTISTE"]
-        
-        estimated_height = 8 + (len(df_grid) * 7) + 5
-        if estimated_height < (self.h - 30) and (self.get_y() + estimated_height) > (self.h - 15):
-            self.add_page()
-            
-        self.set_fill_color(200, 200, 200)
-        for i, h in enumerate(headers):
-            w = col_w[i] if col_w[i] != 0 else (self.w - 20 - sum(col_w[:3]))
-            self.cell(w, 8, h, border=1, fill=True, align='C')
-        self.ln()
-        
-        self.set_font("helvetica", "B", 9)
-        
-        for _, row in df_grid.iterrows():
-            if self.get_y() > (self.h - 15): self.add_page()
-            deb = str(row['Heure Début'])
-            fin = str(row['Heure Fin'])
-            act = str(row['Activité'])
-            art = str(row['Artiste']).encode('latin-1', 'replace').decode('latin-1')
-            
-            act_upper = act.upper()
-            if "LOAD IN" in act_upper: self.set_fill_color(180, 220, 255)
-            elif "INST OFF" in act_upper: self.set_fill_color(255, 230, 180)
-            elif "INST ON" in act_upper: self.set_fill_color(255, 200, 120)
-            elif "BALANCE" in act_upper: self.set_fill_color(180, 240, 180)
-            elif "CHANGE OVER" in act_upper: self.set_fill_color(255, 250, 180)
-            elif "SHOW" in act_upper: self.set_fill_color(255, 180, 180)
-            else: self.set_fill_color(255, 255, 255)
-            
-            self.set_text_color(0, 0, 0)
-            w3 = self.w - 20 - sum(col_w[:3])
-            
-            self.cell(col_w[0], 7, deb, border=1, fill=True, align='C')
-            self.cell(col_w[1], 7, fin, border=1, fill=True, align='C')
-            self.cell(col_w[2], 7, act, border=1, fill=True, align='C')
-            self.cell(w3, 7, "  " + art, border=1, fill=True, align='L')
-            self.ln()
-            
-        self.set_text_color(0, 0, 0)
-        self.ln(5)
-
-    def dessiner_tableau_patch(self, df):
-        if df.empty: return
-        self.set_font("helvetica", "B", 9)
-        cols = list(df.columns)
-        col_width = (self.w - 20) / len(cols)
-    
-        estimated_height = 8 + (len(df) * 6) + 5
-        if estimated_height < (self.h - 30) and (self.get_y() + estimated_height) > (self.h - 20):
-            self.add_page()
-            
-        self.set_fill_color(220, 230, 255)
-        for col in cols:
-            self.cell(col_width, 8, str(col), border=1, fill=True, align='C')
-        self.ln()
-    
-        self.set_font("helvetica", "", 8)
-        
-        EMOJI_COLORS = {
-            "🟤": (205, 133, 63), "🔴": (255, 153, 153), "🟠": (255, 204, 153),
-            "🟡": (255, 255, 153), "🟢": (153, 255, 153), "🔵": (153, 204, 255),
-            "🟣": (204, 153, 255), "⚪": (240, 240, 240), "🍏": (204, 255, 153)
-        }
-
-        for _, row in df.iterrows():
-            if self.get_y() > (self.h - 20): self.add_page()
-            
-            row_color = (255, 255, 255)
-            row_texts = []
-        
-            for item in row:
-                if isinstance(item, bool): val = "[ X ]" if item else "[   ]"
-                elif str(item).strip() == "True": val = "[ X ]"
-                elif str(item).strip() == "False": val = "[   ]"
-                else: val = str(item) if pd.notna(item) else ""
-
-                for emoji, color in EMOJI_COLORS.items():
-                    if emoji in val:
-                        row_color = color
-                        val = val.replace(emoji, "").strip()
-            
-                val = val.replace('\n', ' ').encode('latin-1', 'replace').decode('latin-1')
-                row_texts.append(val)
-            
-            self.set_fill_color(*row_color)
-            for val in row_texts:
-                self.cell(col_width, 6, val, border=1, align='C', fill=True)
-            self.ln()
-        self.ln(5)
-
-
-# --- NOUVELLE CLASSE EXCLUSIVE POUR L'EXPORT "BESOINS" (Mise en page demandée) ---
-class BesoinsPDF(FPDF):
-    def header(self):
-        # 1. Image du festival en haut a gauche
-        if st.session_state.festival_logo:
-            try:
-                import tempfile
-                import os
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-                    tmp_file.write(st.session_state.festival_logo)
-                    tmp_path = tmp_file.name
-                self.image(tmp_path, 10, 8, 33)
-                os.unlink(tmp_path)
-            except: pass
-
-        # 2. Nom du festival + date de génération centrée
-        self.set_font("helvetica", "B", 15)
-        self.cell(0, 6, st.session_state.festival_name.upper(), ln=1, align='C')
-        self.set_font("helvetica", "I", 10)
-        self.cell(0, 6, f"Généré le {datetime.datetime.now().strftime('%d/%m/%Y à %H:%M')}", ln=1, align='C')
-        self.ln(10)
-
-    def dessiner_tableau(self, df):
-        if df is None or df.empty: return
-        self.set_font("helvetica", "B", 9)
-        cols = list(df.columns)
-        col_width = (self.w - 20) / len(cols)
-        
-        estimated_height = 8 + (len(df) * 6) + 5
-        if estimated_height < (self.h - 30) and (self.get_y() + estimated_height) > (self.h - 20):
-            self.add_page()
-            
-        self.set_fill_color(220, 230, 255)
-        for col in cols:
-            self.cell(col_width, 8, str(col), border=1, fill=True, align='C')
-        self.ln()
-        
-        self.set_font("helvetica", "", 8)
-        for _, row in df.iterrows():
-            if self.get_y() > (self.h - 20): self.add_page()
-            for item in row:
-                val = str(item).replace('\n', ' ').encode('latin-1', 'replace').decode('latin-1')
-                self.cell(col_width, 6, val, border=1, align='C')
-            self.ln()
-        self.ln(5)
-
-def generer_pdf_besoins_custom(titre_doc, arts_infos, besoins_cats):
-    pdf = BesoinsPDF(orientation='P', unit='mm', format='A4')
-    pdf.add_page()
-    
-    # 3. BESOINS (Nom STAGE + période) centré avec trait 
-    pdf.ln(5)
-    pdf.set_draw_color(0, 0, 0)
-    pdf.set_line_width(0.5)
-    pdf.line(10, pdf.get_y(), pdf.w - 10, pdf.get_y())
-    pdf.ln(4)
-    pdf.set_font("helvetica", "B", 16)
-    pdf.cell(0, 10, titre_doc.upper(), ln=1, align='C')
-    pdf.ln(1)
-    pdf.line(10, pdf.get_y(), pdf.w - 10, pdf.get_y())
-    pdf.ln(10)
-
-    # 4. INFORMATION TECHNIQUE 
-    pdf.set_font("helvetica", "B", 14)
-    pdf.cell(0, 10, "INFORMATION TECHNIQUE", ln=1, align='L')
-    pdf.ln(3)
-
-    for art, info in arts_infos.items():
-        if pdf.get_y() > (pdf.h - 40): pdf.add_page()
-
-        # 4-X Groupe X dans un cadre avec un fond de couleur pale
-        pdf.set_font("helvetica", "B", 12)
-        pdf.set_fill_color(240, 248, 255) # Couleur pale (AliceBlue)
-        pdf.cell(0, 10, str(art), ln=1, align='C', fill=True, border=1)
-        pdf.ln(3)
-
-        # 4-X-1 Contact
-        if info.get("Contacts"):
-            pdf.set_font("helvetica", "B", 10)
-            pdf.cell(0, 6, "Contacts :", ln=1)
-            pdf.set_font("helvetica", "", 9)
-            val = str(info["Contacts"]).encode('latin-1', 'replace').decode('latin-1')
-            pdf.multi_cell(0, 5, val)
-            pdf.ln(2)
-
-        # 4-X-2 Configuration circuits
-        if info.get("Circuits") is not None and not info["Circuits"].empty:
-            pdf.set_font("helvetica", "B", 10)
-            pdf.cell(0, 6, "Configuration circuits :", ln=1)
-            pdf.dessiner_tableau(info["Circuits"])
-
-        # Alimentation 
-        if info.get("Alim") is not None and not info["Alim"].empty:
-            pdf.set_font("helvetica", "B", 10)
-            pdf.cell(0, 6, "Alimentation électrique :", ln=1)
-            pdf.dessiner_tableau(info["Alim"])
-
-        # 4-X-3 Informations complémentaire
-        if info.get("Notes"):
-            pdf.set_font("helvetica", "B", 10)
-            pdf.cell(0, 6, "Informations complémentaires :", ln=1)
-            pdf.set_font("helvetica", "", 9)
-            val = str(info["Notes"]).encode('latin-1', 'replace').decode('latin-1')
-            pdf.multi_cell(0, 5, val)
-            pdf.ln(2)
-
-        pdf.ln(5)
-
-    # 5. BESOINS TECHNIQUE 
-    if pdf.get_y() > (pdf.h - 30): pdf.add_page()
-    pdf.set_font("helvetica", "B", 14)
-    pdf.cell(0, 10, "BESOINS TECHNIQUE", ln=1, align='L')
-    pdf.ln(3)
-
-    for cat, df_cat in besoins_cats.items():
-        if pdf.get_y() > (pdf.h - 30): pdf.add_page()
-        pdf.set_font("helvetica", "B", 11)
-        pdf.set_fill_color(230, 230, 230)
-        pdf.cell(0, 8, f"CATÉGORIE : {cat}", ln=1, fill=True)
-        pdf.dessiner_tableau(df_cat)
-
-    out = pdf.output(dest='S')
-    return out.encode('latin-1') if isinstance(out, str) else bytes(out)
-
-def generer_pdf_complet(titre_doc, dictionnaire_dfs, orientation='P', format='A4', is_planning=False):
-    pdf = FestivalPDF(orientation=orientation, unit='mm', format=format)
-    pdf.add_page()
-    pdf.set_font("helvetica", "B", 16)
-    pdf.cell(0, 10, titre_doc, ln=True, align='C')
-    pdf.ln(5)
-    
-    for section, data in dictionnaire_dfs.items():
-        if isinstance(data, pd.DataFrame):
-            if not data.empty:
-                if pdf.get_y() > (pdf.h - 30): pdf.add_page()
-                pdf.ajouter_titre_section(section)
-                if is_planning:
-                    pdf.dessiner_planning_grille(data)
-                else:
-                    pdf.dessiner_tableau(data)
-        elif isinstance(data, str) and data.strip():
-            if pdf.get_y() > (pdf.h - 30): pdf.add_page()
-            pdf.ajouter_titre_section(section)
-            pdf.dessiner_texte(data)
-            
-    out = pdf.output(dest='S')
-    return out.encode('latin-1') if isinstance(out, str) else bytes(out)
-
-def generer_pdf_patch(titre_doc, dictionnaire_dfs):
-    pdf = FestivalPDF(orientation='L', unit='mm', format='A4')
-    pdf.add_page()
-    pdf.set_font("helvetica", "B", 16)
-    pdf.cell(0, 10, titre_doc, ln=True, align='C')
-    pdf.ln(5)
-    
-    for section, data in dictionnaire_dfs.items():
-        if isinstance(data, pd.DataFrame):
-            if not data.empty:
-                if pdf.get_y() > (pdf.h - 30): pdf.add_page()
-                pdf.ajouter_titre_section(section)
-                pdf.dessiner_tableau_patch(data)
-        elif isinstance(data, str) and data.strip():
-            if pdf.get_y() > (pdf.h - 30): pdf.add_page()
-            pdf.ajouter_titre_section(section)
-            pdf.dessiner_texte(data)
-            
-    out = pdf.output(dest='S')
-    return out.encode('latin-1') if isinstance(out, str) else bytes(out)
-
-# --- HELPERS CHRONO ---
-def time_to_hours(t_str):
-    if t_str == "-- none --" or not t_str: return -1
-    h, m = map(int, t_str.split(':'))
-    return h + m/60.0
-
-def time_to_minutes(t_str):
-    if t_str == "-- none --" or not t_str: return -1
-    h, m = map(int, t_str.split(':'))
-    shifted_h = h - 6
-    if shifted_h < 0: shifted_h += 24
-    return shifted_h * 60 + m
-
-def build_planning_grid(df_scene):
-    events = []
-    phases = [
-        ("Load IN", "Load IN Début", "Load IN Fin"),
-        ("Inst Off Stage", "Inst Off Début", "Inst Off Fin"),
-        ("Inst On Stage", "Inst On Début", "Inst On Fin"),
-        ("Balance", "Balance Début", "Balance Fin"),
-        ("Change Over", "Change Over Début", "Change Over Fin"),
-        ("Show", "Show Début", "Show Fin")
-    ]
-    for _, row in df_scene.iterrows():
-        art = row["Artiste"]
-        for p_name, c_deb, c_fin in phases:
-            deb = row.get(c_deb, "-- none --")
-            fin = row.get(c_fin, "-- none --")
-            if deb != "-- none --" and fin != "-- none --":
-                events.append({
-                    "Heure Début": deb,
-                    "Heure Fin": fin,
-                    "Activité": p_name,
-                    "Artiste": art,
-                    "_start_val": time_to_minutes(deb)
-                })
-    
-    if not events:
-        return pd.DataFrame(columns=["Heure Début", "Heure Fin", "Activité", "Artiste"])
-    
-    df_events = pd.DataFrame(events)
-    df_events = df_events.sort_values(by=["_start_val", "Heure Fin"]).drop(columns=["_start_val"])
-    return df_events
-
-def compute_times(deb, fin, dur):
-    if deb != "-- none --":
-        h, m = map(int, deb.split(':'))
-        dt_deb = datetime.datetime(2024, 1, 1, h, m)
-        if dur > 0 and fin == "-- none --":
-            dt_fin = dt_deb + datetime.timedelta(minutes=int(dur))
-            return deb, dt_fin.strftime("%H:%M")
-    return deb, fin
-
-# --- HELPER POUR LE PLANNING VISUEL (A3 PORTRAIT) ---
-def generer_pdf_planning_visuel(df_scene, titre):
-    if not MATPLOTLIB_AVAILABLE: return None
-    
-    phases_def = [
-        ("Load IN", "Load IN Début", "Load IN Fin", "#4a90e2"),
-        ("Inst Off Stage", "Inst Off Début", "Inst Off Fin", "#f39c12"),
-        ("Inst On Stage", "Inst On Début", "Inst On Fin", "#e67e22"),
-        ("Balance", "Balance Début", "Balance Fin", "#8e44ad"),
-        ("Change Over", "Change Over Début", "Change Over Fin", "#27ae60"),
-        ("Show", "Show Début", "Show Fin", "#e74c3c")
-    ]
-    
-    events = []
-    for _, row in df_scene.iterrows():
-        art = row["Artiste"]
-        for p_name, c_deb, c_fin, color in phases_def:
-            deb = row.get(c_deb, "-- none --")
-            fin = row.get(c_fin, "-- none --")
-            if deb != "-- none --" and fin != "-- none --":
-                start_h = time_to_hours(deb)
-                end_h = time_to_hours(fin)
-                if end_h < start_h: end_h += 24
-                events.append({"artiste": art, "phase": p_name, "start": start_h, "end": end_h, "color": color})
-    
-    if not events: return None
-    
-    fig, ax = plt.subplots(figsize=(11.7, 16.5)) # Format A3 Portrait
-    
-    artistes = list(dict.fromkeys([e["artiste"] for e in events]))
-    x_positions = {artiste: i for i, artiste in enumerate(artistes)}
-    
-    min_hour = np.floor(min([e["start"] for e in events]))
-    max_hour = np.ceil(max([e["end"] for e in events]))
-    if max_hour <= min_hour: max_hour = min_hour + 1
-
-    for item in events:
-        x = x_positions[item["artiste"]]
-        y_start = item["start"]
-        duration = item["end"] - item["start"]
-        
-        rect = patches.Rectangle((x - 0.4, y_start), 0.8, duration, facecolor=item["color"], edgecolor='white', linewidth=1)
-        ax.add_patch(rect)
-        
-        ax.text(x, y_start + duration/2, item["phase"], ha='center', va='center', color='white', fontsize=10, fontweight='bold', clip_on=True)
-
-    y_ticks = np.arange(min_hour, max_hour + 0.25, 0.25)
-    def format_hour(val):
-        h = int(val) % 24
-        m = int(round((val - int(val)) * 60))
-        if m == 60: h, m = (h + 1) % 24, 0
-        return f"{h:02d}:{m:02d}"
-        
-    ax.set_yticks(y_ticks)
-    ax.set_yticklabels([format_hour(y) for y in y_ticks])
-    ax.invert_yaxis()
-    ax.set_ylabel("Heure", fontsize=12)
-    
-    ax.set_xticks(range(len(artistes)))
-    ax.set_xticklabels(artistes, fontsize=12, fontweight='bold')
-    ax.set_xlabel("Artistes", fontsize=12, labelpad=15)
-    
-    ax.grid(axis='y', linestyle='-', color='#ecf0f1', alpha=0.7)
-    ax.set_xlim(-0.5, len(artistes) - 0.5)
-    ax.set_ylim(max_hour, min_hour)
-    
-    plt.title(titre, fontsize=18, pad=20, fontweight='bold')
-    
-    from matplotlib.lines import Line2D
-    legend_elements = [Line2D([0], [0], color=c, lw=6, label=p) for p, c in set((e["phase"], e["color"]) for e in events)]
-    ax.legend(handles=legend_elements, title="Phases", bbox_to_anchor=(1.02, 1), loc='upper left')
-    
-    plt.tight_layout()
-    buf = io.BytesIO()
-    plt.savefig(buf, format="pdf", bbox_inches="tight")
-    plt.close(fig)
-    return buf.getvalue()
+# --- STOCKAGE DES RIDERS (DISQUE, PARTAGÉ ENTRE SESSIONS) ---
+# st.session_state.riders_stockage[artiste][fichier] ne contient que le SHA-256 du PDF.
+@st.cache_resource
+def get_rider_store():
+    return RiderStore()
+
+rider_store = get_rider_store()
+
+# --- CATALOGUE MATÉRIEL (REGISTRE PARTAGÉ, VERSIONNÉ) ---
+# Un seul registre par serveur : un catalogue publié par l'admin est vu par toutes les sessions
+# sans nouvel envoi. La session ne garde que catalogue_version : None = version en service,
+# sinon la version du projet restauré (si ce serveur la connaît).
+@st.cache_resource
+def get_registre_catalogues():
+    return RegistreCatalogues()
+
+registre_catalogues = get_registre_catalogues()
+
+def get_catalogue():
+    courant = registre_catalogues.courant()
+    # Version du projet inconnue de ce serveur : catalogue en service
+    return (registre_catalogues.version(st.session_state.catalogue_version or courant)
+            or registre_catalogues.version(courant) or registre_catalogues.version(None))
+
+def bouton_rider(artiste, fichier, key):
+    sha = st.session_state.riders_stockage[artiste][fichier]
+    st.download_button(
+        label=f"📥 Télécharger {fichier}",
+        data=lambda: rider_store.lire(sha),
+        file_name=fichier,
+        mime="application/pdf",
+        key=key
+    )
+
+# --- HELPER RESTAURATION PROJET ---
+def restaurer_projet(data_loaded):
+    etat = normaliser_etat(data_loaded)
+    # Anciennes sauvegardes : PDF en octets -> versés dans le store
+    etat["riders_stockage"] = {a: {f: (ref if isinstance(ref, str) else rider_store.ajouter(ref)) for f, ref in docs.items()}
+                               for a, docs in etat["riders_stockage"].items()}
+    # Catalogue embarqué (anciennes sauvegardes) -> versé dans le registre, le projet n'en garde que la version
+    etat["catalogue_version"] = registre_catalogues.version_projet(etat)
+    del etat["custom_catalog"], etat["easyjob_mapping"]
+    for cle, valeur in etat.items():
+        st.session_state[cle] = valeur
+
+
+
+# --- INDEX (JOUR, SCÈNE) DES TABLES ---
+# Reconstruit seulement quand la table a été remplacée ; sert les options des selectbox et les tranches par journée.
+def get_index(nom, col_groupe="Artiste"):
+    idx = index_a_jour(st.session_state.index_tables.get(nom), st.session_state[nom], col_groupe)
+    st.session_state.index_tables[nom] = idx
+    return idx
+
+# --- CACHE DES BESOINS (PICS PAR JOUR & SCENE) ---
+# Seules les journées (Jour, Scène) dont le matériel ou l'ordre de passage a changé sont recalculées.
+def get_besoins_cache():
+    cache = st.session_state.besoins_cache
+    cache.actualiser(st.session_state.fiches_tech, st.session_state.planning, int(st.session_state.fenetre_besoins))
+    return cache
+
+# --- INDEX DE RECHERCHE DU CATALOGUE ---
+# Construit une fois par version de catalogue, partagé par toutes les sessions (registre).
+NB_RESULTATS_RECHERCHE = 30
+
+def get_index_catalogue():
+    return registre_catalogues.index(get_catalogue().version)
+
+# --- TIMELINE FESTIVAL ---
+# Planning déplié une fois par version (la table est remplacée à chaque édition) ; figures gardées par jour.
+def get_timeline(jour=None):
+    cache = st.session_state.get("timeline_cache")
+    if cache is None or cache["source"] is not st.session_state.planning or cache["debut"] != st.session_state.debut_journee:
+        cache = {"source": st.session_state.planning, "debut": st.session_state.debut_journee,
+                 "donnees": donnees_timeline(st.session_state.planning, st.session_state.debut_journee), "figures": {}}
+        st.session_state.timeline_cache = cache
+    if jour not in cache["figures"]:
+        titre = "Timeline Festival" + (f" - {jour}" if jour is not None else "")
+        cache["figures"][jour] = figure_timeline(cache["donnees"], jour, titre)
+    return cache["figures"][jour]
+
+# --- CONFLITS D'OCCUPATION DES SCÈNES ---
+# Balayage trié par journée (Jour, Scène), relancé seulement sur les journées éditées.
+def get_conflits():
+    cache = st.session_state.conflits_cache
+    cache.actualiser(st.session_state.planning, get_index("planning"), st.session_state.debut_journee)
+    return cache
+
+# --- CACHE DES EXPORTS (PDF / EXCEL) ---
+# Les documents ne sont générés qu'au clic sur le bouton de téléchargement, puis gardés
+# en mémoire (LRU plafonnée) sous l'empreinte des données qu'ils utilisent réellement.
+# La génération tourne hors du thread du script : les constructeurs ne doivent pas lire st.session_state.
+@st.cache_resource
+def get_export_cache():
+    return ExportCache(max_octets=128 * 1024 * 1024)
+
+def bouton_export(label, entrees, construire, file_name, mime="application/pdf", **kwargs):
+    cle = empreinte(label, file_name, *entrees)
+    cache = get_export_cache()
+    st.download_button(
+        label,
+        data=lambda: cache.obtenir(cle, construire) or b"",
+        file_name=file_name,
+        mime=mime,
+        use_container_width=True,
+        **kwargs
+    )
+
+# --- EXPORT GROUPÉ : POOL DE PROCESSUS PARTAGÉ ---
+# Démarré au premier export groupé puis réutilisé : le coût de lancement des processus n'est payé qu'une fois.
+@st.cache_resource
+def get_pool_export():
+    from regie.lot import nouveau_pool
+    return nouveau_pool()
+
+# --- ÉDITION DES TABLEAUX (CALLBACKS DES DATA_EDITOR) ---
+# Chaque tableau enregistre ses changements (edited_rows, added_rows, deleted_rows) dans son
+# callback on_change, avant le passage suivant du script : la table stockée est corrigée ligne à
+# ligne (regie.edition), sans comparer la table entière ni relancer le script une seconde fois.
+# Les lignes affichées sont retrouvées dans la table par les mêmes fonctions qu'à l'affichage.
+def lignes_alim(jour, scene, artiste):
+    pos = get_index("alim_elec", "Groupe").positions(jour, scene)
+    return pos[(st.session_state.alim_elec["Groupe"].iloc[pos] == artiste).to_numpy()]
+
+def lignes_fiches(artiste):
+    fiches = st.session_state.fiches_tech
+    vue = fiches[fiches["Groupe"] == artiste].sort_values(by=["Catégorie", "Marque"], kind="stable")
+    return fiches.index.get_indexer(vue.index)
+
+def editer_table(nom, key, lignes=None, fixes=None, defauts=None):
+    debut = st.session_state.debut_journee
+    st.session_state[nom] = appliquer_edition(st.session_state[nom], st.session_state[key], lignes,
+                                              lambda d: typer(nom, d, debut), fixes, defauts)
+
+def editer_alim(key, jour, scene, artiste):
+    editer_table("alim_elec", key, lignes_alim(jour, scene, artiste), {"Groupe": artiste, "Scène": scene, "Jour": jour})
+
+def editer_fiches(key, jour, scene, artiste):
+    editer_table("fiches_tech", key, lignes_fiches(artiste), {"Scène": scene, "Jour": jour, "Groupe": artiste})
+
+def editer_planning(key):
+    editer_table("planning", key, defauts={"Artiste": "À définir"})
+    artistes_actifs = set(st.session_state.planning["Artiste"])
+    for k in [k for k in st.session_state.riders_stockage if k not in artistes_actifs]:
+        del st.session_state.riders_stockage[k]
+
+def editer_contacts(key, nom, cle, roles):
+    """Contacts du festival (`cle` None), d'une scène ou d'un artiste (`nom` : dict de la session)."""
+    conteneur, cle = (st.session_state, nom) if cle is None else (st.session_state[nom], cle)
+    contacts = get_migrated_contacts(conteneur.get(cle, {}), roles).reset_index(drop=True)
+    conteneur[cle] = appliquer_edition(contacts, st.session_state[key])
+
+def editer_patch_in(key, artiste, mode_key, t_name):
+    tables = st.session_state.patches_io[artiste][mode_key]
+    ancienne = tables[t_name]
+    tables[t_name] = appliquer_edition(ancienne, st.session_state[key], typage=lambda d: table_patch(d, "Boîtier" in ancienne.columns))
+    alloc = st.session_state.allocateurs_patch.get((artiste, mode_key))
+    if alloc is not None and alloc.versions.get(t_name) is ancienne:
+        alloc.maj_table(t_name, ancienne, tables[t_name])
+
+def editer_patch_out(key, artiste):
+    st.session_state.patches_out[artiste] = appliquer_edition(st.session_state.patches_out[artiste].reset_index(drop=True), st.session_state[key])
 
 # --- INTERFACE PRINCIPALE ---
 st.title(f"{st.session_state.festival_name} - Gestion Régie")
+demarrage.jalon("Premier affichage", T0_SCRIPT)
 
 # --- CREATION DES ONGLETS PRINCIPAUX ---
-main_tabs = st.tabs(["Projet", "Gestion Festival", "Technique"])
+# Onglets à exécution différée : seul le corps de l'onglet ouvert est construit à chaque passage
+main_tabs = st.tabs(["Projet", "Gestion Festival", "Technique"], key="onglet", on_change="rerun")
 
 # ==========================================
 # ONGLET 1 : PROJET
 # ==========================================
 with main_tabs[0]:
-    sub_tabs_projet = st.tabs(["Admin & Sauvegarde", "Export"])
+    sub_tabs_projet = st.tabs(["Admin & Sauvegarde", "Export"], key="onglet_projet", on_change="rerun")
     
     with sub_tabs_projet[0]:
-        st.header("🛠️ Administration & Sauvegarde")
-        col_adm1, col_adm2 = st.columns(2)
-        with col_adm1:
-            st.subheader("🆔 Identité Festival")
-            with st.container(border=True):
-                new_name = st.text_input("Nom du Festival", st.session_state.festival_name)
-                if new_name != st.session_state.festival_name:
-                    st.session_state.festival_name = new_name
-                    st.rerun()
-                new_logo = st.file_uploader("Logo du Festival (Image)", type=['png', 'jpg', 'jpeg'])
-                if new_logo:
-                    st.session_state.festival_logo = new_logo.read()
-                    st.success("Logo chargé !")
-                st.info("Ces informations apparaitront sur tous les exports PDF.")
+        if main_tabs[0].open and sub_tabs_projet[0].open:
+            st.header("🛠️ Administration & Sauvegarde")
+            col_adm1, col_adm2 = st.columns(2)
+            with col_adm1:
+                st.subheader("🆔 Identité Festival")
+                with st.container(border=True):
+                    new_name = st.text_input("Nom du Festival", st.session_state.festival_name)
+                    if new_name != st.session_state.festival_name:
+                        st.session_state.festival_name = new_name
+                        st.rerun()
+                    new_logo = st.file_uploader("Logo du Festival (Image)", type=['png', 'jpg', 'jpeg'])
+                    if new_logo:
+                        logo_pret = preparer_logo(new_logo.getvalue())
+                        if logo_pret:
+                            st.session_state.festival_logo = logo_pret
+                            st.success("Logo chargé !")
+                        else:
+                            st.error("Image du logo illisible.")
+                    st.info("Ces informations apparaitront sur tous les exports PDF.")
+                    st.session_state.fenetre_besoins = st.number_input(
+                        "Calcul des besoins : nombre de groupes présents simultanément sur scène",
+                        min_value=1, max_value=6, value=int(st.session_state.fenetre_besoins),
+                        help="2 = pic de deux groupes consécutifs (standard). 3 pour des changements de plateau serrés."
+                    )
+                    heures_bascule = [f"{h:02d}:00" for h in range(24)]
+                    bascule = st.selectbox(
+                        "Début de journée festival", heures_bascule, index=st.session_state.debut_journee // 60,
+                        help="Les horaires antérieurs appartiennent à la nuit précédente (ex. 06:00 : un show à 01:00 suit celui de 23:00)."
+                    )
+                    nouveau_debut = heures_bascule.index(bascule) * 60
+                    if nouveau_debut != st.session_state.debut_journee:
+                        st.session_state.planning = rebaser(st.session_state.planning, st.session_state.debut_journee, nouveau_debut)
+                        st.session_state.debut_journee = nouveau_debut
             
-            st.subheader("💾 Sauvegarde / Chargement Projet (Cloud & Web)")
-            with st.container(border=True):
-                data_to_save = {
-                    "planning": st.session_state.planning,
-                    "fiches_tech": st.session_state.fiches_tech,
-                    "riders_stockage": st.session_state.riders_stockage,
-                    "artist_circuits": st.session_state.artist_circuits,
-                    "patches_io": st.session_state.patches_io,
-                    "patches_out": st.session_state.patches_out,
-                    "festival_name": st.session_state.festival_name,
-                    "festival_logo": st.session_state.festival_logo,
-                    "custom_catalog": st.session_state.custom_catalog,
-                    "easyjob_mapping": st.session_state.easyjob_mapping,
-                    "notes_artistes": st.session_state.notes_artistes,
-                    "alim_elec": st.session_state.alim_elec,
-                    "contacts_festival": st.session_state.contacts_festival,
-                    "contacts_scenes": st.session_state.contacts_scenes,
-                    "contacts_artistes": st.session_state.contacts_artistes
-                }
+                st.subheader("💾 Sauvegarde / Chargement Projet (Cloud & Web)")
+                with st.container(border=True):
+                    data_to_save = {
+                        "planning": st.session_state.planning,
+                        "fiches_tech": st.session_state.fiches_tech,
+                        "riders_stockage": st.session_state.riders_stockage,
+                        "artist_circuits": st.session_state.artist_circuits,
+                        "infra_scenes": st.session_state.infra_scenes,
+                        "patches_io": st.session_state.patches_io,
+                        "patches_out": st.session_state.patches_out,
+                        "festival_name": st.session_state.festival_name,
+                        "festival_logo": st.session_state.festival_logo,
+                        "catalogue_version": get_catalogue().version,
+                        "notes_artistes": st.session_state.notes_artistes,
+                        "fenetre_besoins": st.session_state.fenetre_besoins,
+                        "debut_journee": st.session_state.debut_journee,
+                        "alim_elec": st.session_state.alim_elec,
+                        "contacts_festival": st.session_state.contacts_festival,
+                        "contacts_scenes": st.session_state.contacts_scenes,
+                        "contacts_artistes": st.session_state.contacts_artistes
+                    }
                 
-                col_s1, col_s2 = st.columns(2)
+                    col_s1, col_s2 = st.columns(2)
                 
-                with col_s1:
-                    st.markdown("**1. Sauvegarder**")
-                    pickle_out = pickle.dumps(data_to_save)
-                    st.download_button(
-                        label="💾 Télécharger le projet (.pkl)", 
-                        data=pickle_out, 
-                        file_name=f"backup_festival_{datetime.date.today()}.pkl", 
-                        use_container_width=True
-                    )
-                    st.caption("💡 Votre navigateur téléchargera le fichier (Configurez-le pour demander où enregistrer).")
-
-                with col_s2:
-                    st.markdown("**2. Charger**")
-                    uploaded_session = st.file_uploader("📂 Uploader un projet (.pkl)", type=['pkl'], label_visibility="collapsed")
-                    if uploaded_session:
-                        if st.button("Restaurer le projet", use_container_width=True):
-                            try:
-                                data_loaded = pickle.loads(uploaded_session.read())
-                                
-                                st.session_state.planning = data_loaded["planning"]
-                                st.session_state.fiches_tech = data_loaded["fiches_tech"]
-                                st.session_state.riders_stockage = data_loaded["riders_stockage"]
-                                st.session_state.artist_circuits = data_loaded.get("artist_circuits", {})
-                                st.session_state.patches_io = data_loaded.get("patches_io", {})
-                                st.session_state.patches_out = data_loaded.get("patches_out", {})
-                                st.session_state.festival_name = data_loaded.get("festival_name", "Mon Festival")
-                                st.session_state.festival_logo = data_loaded.get("festival_logo", None)
-                                st.session_state.custom_catalog = data_loaded.get("custom_catalog", {})
-                                st.session_state.easyjob_mapping = data_loaded.get("easyjob_mapping", {})
-                                st.session_state.notes_artistes = data_loaded.get("notes_artistes", {})
-                                st.session_state.alim_elec = data_loaded.get("alim_elec", pd.DataFrame(columns=["Scène", "Jour", "Groupe", "Format", "Métier", "Emplacement"]))
-                                st.session_state.contacts_festival = data_loaded.get("contacts_festival", {})
-                                st.session_state.contacts_scenes = data_loaded.get("contacts_scenes", {})
-                                st.session_state.contacts_artistes = data_loaded.get("contacts_artistes", {})
-                                st.success("Session restaurée avec succès !")
+                    with col_s1:
+                        st.markdown("**1. Sauvegarder**")
+                        # L'archive n'est assemblée qu'au clic ; seules les sections modifiées sont re-sérialisées
+                        writer = st.session_state.projet_writer
+                        st.download_button(
+                            label="💾 Télécharger le projet (.regie)", 
+                            data=lambda: writer.ecrire(data_to_save, store=rider_store), 
+                            file_name=f"backup_festival_{datetime.date.today()}.regie", 
+                            mime="application/zip",
+                            use_container_width=True
+                        )
+                        st.caption("💡 Votre navigateur téléchargera le fichier (Configurez-le pour demander où enregistrer).")
+                        if writer.absents:
+                            st.warning("⚠️ Riders introuvables sur ce serveur, absents de la dernière sauvegarde : " + ", ".join(f"{a} / {f}" for a, f in writer.absents))
+
+                    with col_s2:
+                        st.markdown("**2. Charger**")
+                        uploaded_session = st.file_uploader("📂 Uploader un projet (.regie)", type=['regie', 'pkl'], label_visibility="collapsed")
+                        if uploaded_session:
+                            is_legacy = not est_archive_projet(uploaded_session.getvalue()[:4])
+                            if is_legacy:
+                                st.warning("⚠️ Ancien format (.pkl) : ne restaurez que vos propres sauvegardes.")
+                            if st.button("Restaurer le projet", use_container_width=True):
+                                try:
+                                    if is_legacy:
+                                        data_loaded = charger_pickle_legacy(uploaded_session.getvalue())
+                                    else:
+                                        archive = ProjetArchive(uploaded_session)
+                                        data_loaded = archive.charger(riders=False)
+                                        data_loaded["riders_stockage"] = archive.importer_riders(rider_store)
+                                        archive.close()
+                                    restaurer_projet(data_loaded)
+                                    st.success("Session restaurée avec succès !")
+                                    if not is_legacy and archive.riders_ecartes:
+                                        # Pas de rerun : l'avertissement reste affiché
+                                        st.warning("⚠️ Riders altérés ou manquants dans l'archive, non restaurés : " + ", ".join(f"{a} / {f}" for a, f in archive.riders_ecartes))
+                                    else:
+                                        st.rerun()
+                                except Exception as e:
+                                    st.error(f"Erreur lors du chargement : {e}")
+
+            with col_adm2:
+                st.subheader("📚 Catalogue Matériel (Excel)")
+                cat_session, v_courante = get_catalogue(), registre_catalogues.courant()
+                if cat_session.version:
+                    date_cat = datetime.datetime.fromtimestamp(cat_session.date).strftime("%d/%m/%Y %H:%M") if cat_session.date else "?"
+                    st.caption(f"Catalogue utilisé : {cat_session.nom or 'sans nom'} ({date_cat}, version {cat_session.version[:8]})")
+                else:
+                    st.caption("Aucun catalogue chargé sur ce serveur.")
+                v_projet = st.session_state.catalogue_version
+                if v_projet and registre_catalogues.version(v_projet) is None:
+                    st.warning(f"⚠️ Le catalogue du projet (version {v_projet[:8]}) est inconnu de ce serveur : catalogue en service utilisé.")
+                elif v_projet and v_projet != v_courante:
+                    st.info("Ce projet utilise son propre catalogue ; un catalogue plus récent est en service.")
+                    if st.button("Passer au catalogue en service"):
+                        st.session_state.catalogue_version = None
+                        st.rerun()
+                code_secret = st.text_input("🔒 Code Admin", type="password")
+                if code_secret == "0000":
+                    with st.container(border=True):
+                        xls_file = st.file_uploader("Fichier Excel Items", type=['xlsx', 'xls'])
+                        if xls_file:
+                            if st.button("Analyser et Charger le Catalogue"):
+                                try:
+                                    version = registre_catalogues.publier(xls_file.getvalue(), xls_file.name)
+                                    new_catalog = registre_catalogues.version(version).catalogue
+                                    st.session_state.catalogue_version = None
+                                    nb_refs = sum(len(mods) for marques in new_catalog.values() for mods in marques.values())
+                                    st.success(f"Catalogue publié pour toutes les sessions et mapping EasyJob configuré ! ({len(new_catalog)} catégories, {nb_refs} références, version {version[:8]})")
+                                except Exception as e:
+                                    st.error(f"Erreur lecture Excel : {e}")
+                        if registre_catalogues.courant():
+                            if st.button("🗑️ Réinitialiser Catalogue"):
+                                registre_catalogues.activer(None)
+                                st.session_state.catalogue_version = None
                                 st.rerun()
-                            except Exception as e:
-                                st.error(f"Erreur lors du chargement : {e}")
+                else:
+                    if code_secret: st.warning("Code incorrect")
 
-        with col_adm2:
-            st.subheader("📚 Catalogue Matériel (Excel)")
-            code_secret = st.text_input("🔒 Code Admin", type="password")
-            if code_secret == "0000":
-                with st.container(border=True):
-                    xls_file = st.file_uploader("Fichier Excel Items", type=['xlsx', 'xls'])
-                    if xls_file:
-                        if st.button("Analyser et Charger le Catalogue"):
-                            try:
-                                xls = pd.ExcelFile(xls_file)
-                                new_catalog = {}
-                                new_mapping = {}
-                                
-                                for sheet in xls.sheet_names:
-                                    df = pd.read_excel(xls, sheet_name=sheet)
-                                    new_catalog[sheet] = {}
-                                    new_mapping[sheet] = {}
-                                    
-                                    marques_normales = [col for col in df.columns if not str(col).endswith("_EASYJOB")]
-                                    for brand in marques_normales:
-                                        col_mod_raw = df[brand].tolist()
-                                        col_miroir = f"{brand}_EASYJOB"
-                                        
-                                        modeles_valides = []
-                                        new_mapping[sheet][brand] = {}
-                                        
-                                        has_miroir = col_miroir in df.columns
-                                        miroirs_raw = df[col_miroir].tolist() if has_miroir else []
-                                        
-                                        for i, val in enumerate(col_mod_raw):
-                                            if pd.notna(val) and str(val).strip() != "" and str(val).strip().lower() != "nan":
-                                                mod = str(val).strip()
-                                                modeles_valides.append(mod)
-
-                                                if has_miroir and i < len(miroirs_raw) and pd.notna(miroirs_raw[i]) and str(miroirs_raw[i]).strip() != "" and str(miroirs_raw[i]).strip().lower() != "nan":
-                                                    new_mapping[sheet][brand][mod] = str(miroirs_raw[i]).strip()
-                                                else:
-                                                    new_mapping[sheet][brand][mod] = f"{brand} {mod}"
-                                                   
-                                        if modeles_valides:
-                                            new_catalog[sheet][brand] = modeles_valides
-                                            
-                                st.session_state.custom_catalog = new_catalog
-                                st.session_state.easyjob_mapping = new_mapping
-                                st.success(f"Catalogue chargé et mapping EasyJob configuré !")
-                            except Exception as e:
-                                st.error(f"Erreur lecture Excel : {e}")
-                    if st.session_state.custom_catalog:
-                        if st.button("🗑️ Réinitialiser Catalogue"):
-                            st.session_state.custom_catalog = {}
-                            st.session_state.easyjob_mapping = {}
-                            st.rerun()
-            else:
-                if code_secret: st.warning("Code incorrect")
+            with st.expander("⏱️ Rapport de démarrage", expanded=False):
+                st.caption("Mesures du processus serveur : « À froid » = premier passage après le démarrage, « Dernier » = passage précédent.")
+                st.dataframe(demarrage.rapport_jalons(), use_container_width=True, hide_index=True)
+                st.dataframe(demarrage.rapport_imports(), use_container_width=True, hide_index=True)
 
     with sub_tabs_projet[1]:
-        st.header("📄 Génération des Exports PDF")
-        l_jours = sorted(st.session_state.planning["Jour"].dropna().astype(str).unique())
-        l_scenes = sorted(st.session_state.planning["Scène"].dropna().astype(str).unique())
-        cex1, cex2 = st.columns(2)
-
-        with cex1:
-            st.subheader("🗓️ Export Plannings")
-            with st.container(border=True):
-                m_plan = st.radio("Périmètre", ["Par Jour & Scène", "Global"], key="mp")
-                s_j_p = st.selectbox("Jour", l_jours) if m_plan == "Par Jour & Scène" else None
-                s_s_p = st.selectbox("Scène", l_scenes) if m_plan == "Par Jour & Scène" else None
+        if main_tabs[0].open and sub_tabs_projet[1].open:
+            # fpdf n'est chargé qu'à l'ouverture de l'onglet Export
+            with demarrage.mesure_imports("regie.lot", "regie.pdf"):
+                from regie.lot import cle_perimetre, exporter_zip, lister_documents, nom_fichier, purger_exports
+                from regie.pdf import generer_pdf_besoins_custom, generer_pdf_complet, generer_pdf_patch
+            st.header("📄 Génération des Exports PDF")
+            idx_plan = get_index("planning")
+            l_jours = idx_plan.jours
+            l_scenes = idx_plan.scenes
+            nom_fest = st.session_state.festival_name
+            logo_fest = st.session_state.festival_logo
+            debut_j = st.session_state.debut_journee
+            cex1, cex2 = st.columns(2)
+
+            with cex1:
+                st.subheader("🗓️ Export Plannings")
+                with st.container(border=True):
+                    m_plan = st.radio("Périmètre", ["Par Jour & Scène", "Global"], key="mp")
+                    s_j_p = st.selectbox("Jour", l_jours) if m_plan == "Par Jour & Scène" else None
+                    s_s_p = st.selectbox("Scène", l_scenes) if m_plan == "Par Jour & Scène" else None
                 
-                if m_plan == "Par Jour & Scène" and MATPLOTLIB_AVAILABLE:
-                    df_p = st.session_state.planning.copy()
-                    sub_df = df_p[(df_p["Jour"].astype(str) == str(s_j_p)) & (df_p["Scène"].astype(str) == str(s_s_p))]
-                    titre = f"Planning Vertical {s_s_p} - {s_j_p}"
-                    pdf_bytes = generer_pdf_planning_visuel(sub_df, titre)
-                    if pdf_bytes:
-                        st.download_button("📥 Télécharger PDF Planning Visuel", pdf_bytes, f"planning_visuel_{s_j_p}.pdf", "application/pdf", use_container_width=True)
+                    if m_plan == "Par Jour & Scène" and MATPLOTLIB_AVAILABLE:
+                        sub_df = idx_plan.tranche(s_j_p, s_s_p)
+                        titre = f"Planning Vertical {s_s_p} - {s_j_p}"
+                        if not build_planning_grid(sub_df, debut_j).empty:
+                            bouton_export(
+                                "📥 Télécharger PDF Planning Visuel", ("planning_visuel", titre, sub_df, debut_j),
+                                lambda: generer_pdf_planning_visuel(sub_df, titre, debut_j), f"planning_visuel_{s_j_p}.pdf"
+                            )
+                        else:
+                            st.warning("Aucune donnée pour générer le graphique.")
                     else:
-                        st.warning("Aucune donnée pour générer le graphique.")
-                else:
-                    df_p = st.session_state.planning.copy()
-                    dico_sections = {}
-                    jours_a_traiter = [s_j_p] if m_plan == "Par Jour & Scène" else l_jours
-                    scenes_a_traiter = [s_s_p] if m_plan == "Par Jour & Scène" else l_scenes
-                    
-                    for j in jours_a_traiter:
-                        for s in scenes_a_traiter:
-                            sub_df = df_p[(df_p["Jour"].astype(str) == str(j)) & (df_p["Scène"].astype(str) == str(s))]
-                            df_grid = build_planning_grid(sub_df)
-                            if not df_grid.empty:
-                                dico_sections[f"JOUR : {j} | SCENE : {s}"] = df_grid
+                        jours_a_traiter = [s_j_p] if m_plan == "Par Jour & Scène" else l_jours
+                        scenes_a_traiter = [s_s_p] if m_plan == "Par Jour & Scène" else l_scenes
+                        journees = {(j, s): idx_plan.tranche(j, s) for j in jours_a_traiter for s in scenes_a_traiter}
+                        df_p = idx_plan.tranche(s_j_p, s_s_p) if m_plan == "Par Jour & Scène" else st.session_state.planning
                     
-                    orient = 'L' if m_plan == "Global" else 'P'
-                    fmt = 'A3' if m_plan == "Global" else 'A4'
+                        def construire_planning_tableau():
+                            dico_sections = {}
+                            for j in jours_a_traiter:
+                                for s in scenes_a_traiter:
+                                    sub_df = journees[(j, s)]
+                                    df_grid = build_planning_grid(sub_df, debut_j)
+                                    if not df_grid.empty:
+                                        dico_sections[f"JOUR : {j} | SCENE : {s}"] = df_grid
+                        
+                            orient = 'L' if m_plan == "Global" else 'P'
+                            fmt = 'A3' if m_plan == "Global" else 'A4'
+                            return generer_pdf_complet(f"PLANNING {m_plan.upper()}", dico_sections, orientation=orient, format=fmt, is_planning=True, festival_name=nom_fest, festival_logo=logo_fest)
                     
-                    pdf_bytes = generer_pdf_complet(f"PLANNING {m_plan.upper()}", dico_sections, orientation=orient, format=fmt, is_planning=True)
-                    st.download_button("📥 Télécharger PDF Planning (Tableau)", pdf_bytes, "planning.pdf", "application/pdf", use_container_width=True)
+                        bouton_export(
+                            "📥 Télécharger PDF Planning (Tableau)", ("planning_tableau", m_plan, df_p, debut_j, nom_fest, logo_fest),
+                            construire_planning_tableau, "planning.pdf"
+                        )
 
-        with cex2:
-            st.subheader("📦 Export Besoins")
-            with st.container(border=True):
-                m_bes = st.radio("Type", ["Par Jour & Scène", "Total Période par Scène"], key="mb")
-                s_s_m = st.selectbox("Scène (Besoins)", l_scenes, key="ssm")
-                s_j_m = None
-                sel_grp_exp = "Tous"
-                if m_bes == "Par Jour & Scène":
-                    s_j_m = st.selectbox("Jour (Besoins)", l_jours, key="sjm")
-                    arts_du_jour = st.session_state.planning[(st.session_state.planning["Jour"].astype(str) == str(s_j_m)) & (st.session_state.planning["Scène"].astype(str) == str(s_s_m))]["Artiste"].unique()
-                    sel_grp_exp = st.selectbox("Filtrer par Groupe (Optionnel)", ["Tous"] + list(arts_du_jour))
-                
-                col_btn_pdf, col_btn_ej = st.columns(2)
-                
-                with col_btn_pdf:
-                    df_base = st.session_state.fiches_tech[(st.session_state.fiches_tech["Scène"].astype(str) == str(s_s_m)) & (st.session_state.fiches_tech["Artiste_Apporte"] == False)]
-                    if sel_grp_exp != "Tous": df_base = df_base[df_base["Groupe"] == sel_grp_exp]
-                        
-                    titre_besoin = f"BESOINS ({s_s_m} - {s_j_m if m_bes == 'Par Jour & Scène' else 'Période Totale'})"
-                    if sel_grp_exp != "Tous": titre_besoin += f" - {sel_grp_exp}"
+                st.subheader("🖼️ Plannings muraux (PDF multi-pages)")
+                with st.container(border=True):
+                    if MATPLOTLIB_AVAILABLE:
+                        m_mur = st.radio("Mise en page", ["Scènes côte à côte (1 page par jour)", "1 page par scène"], key="m_mur")
+                        c_mur1, c_mur2 = st.columns(2)
+                        j_mur = c_mur1.selectbox("Jour", ["Tous les jours"] + l_jours, key="j_mur")
+                        f_mur = c_mur2.selectbox("Format", ["A3", "A2"], key="f_mur")
+                        jours_mur = l_jours if j_mur == "Tous les jours" else [j_mur]
+                        journees_mur = [(j, s, idx_plan.tranche(j, s)) for j in jours_mur for s in idx_plan.scenes_du_jour(j)]
+                        mode_mur = "jour" if m_mur.startswith("Scènes") else "scene"
+                        pool_mur = get_pool_export()
+                        bouton_export(
+                            "📥 Télécharger PDF Plannings muraux", ("planning_mural", mode_mur, j_mur, f_mur, st.session_state.planning, debut_j),
+                            lambda: generer_pdf_planning_mural(pages_planning_mural(journees_mur, mode_mur, f_mur, debut_j), pool_mur),
+                            f"plannings_muraux_{nom_fichier(j_mur)}.pdf"
+                        )
+                    else:
+                        st.error("⚠️ La bibliothèque 'matplotlib' est manquante.")
 
-                    # 1. PRÉPARATION DES INFOS TECHNIQUES (Par Artiste)
+            with cex2:
+                st.subheader("📦 Export Besoins")
+                with st.container(border=True):
+                    m_bes = st.radio("Type", ["Par Jour & Scène", "Total Période par Scène"], key="mb")
+                    s_s_m = st.selectbox("Scène (Besoins)", l_scenes, key="ssm")
+                    s_j_m = None
+                    sel_grp_exp = "Tous"
+                    if m_bes == "Par Jour & Scène":
+                        s_j_m = st.selectbox("Jour (Besoins)", l_jours, key="sjm")
+                        arts_du_jour = idx_plan.groupes(s_j_m, s_s_m)
+                        sel_grp_exp = st.selectbox("Filtrer par Groupe (Optionnel)", ["Tous"] + list(arts_du_jour))
+                
+                    # Instantané des entrées utilisées par les exports besoins (la génération se fait au clic)
                     if m_bes == "Par Jour & Scène": 
-                        arts_scope = arts_du_jour if sel_grp_exp == "Tous" else [sel_grp_exp]
+                        arts_scope = list(arts_du_jour) if sel_grp_exp == "Tous" else [sel_grp_exp]
                     else:
-                        plan_scene = st.session_state.planning[st.session_state.planning["Scène"].astype(str) == str(s_s_m)]
-                        arts_scope = plan_scene["Artiste"].unique() if sel_grp_exp == "Tous" else [sel_grp_exp]
-
-                    arts_infos = {}
-                    roles_art_map = {"RG": "Régie générale", "RT": "Régie technique", "FOH": "Regie SON FOH", "MON": "Regie SON MON", "LUM": "Regie LUM", "VID": "Regie VIDEO"}
+                        arts_scope = list(idx_plan.groupes(scene=s_s_m)) if sel_grp_exp == "Tous" else [sel_grp_exp]
+                    fiches_scene = get_index("fiches_tech", "Groupe").tranche(scene=s_s_m)
+                    alim_scene = get_index("alim_elec", "Groupe").tranche(scene=s_s_m)
+                    circuits_scope = {a: dict(st.session_state.artist_circuits[a]) for a in arts_scope if a in st.session_state.artist_circuits}
+                    notes_scope = {a: st.session_state.notes_artistes.get(a, "") for a in arts_scope}
+                    contacts_scope = {a: st.session_state.contacts_artistes.get(a) for a in arts_scope}
+                    cats_scene = fiches_scene["Catégorie"].dropna().unique()
+                    mapping_cat = get_catalogue().mapping
+                    mapping_scope = {cat: mapping_cat.get(cat, {}) for cat in cats_scene}
+                    fiches_apporte = fiches_scene[fiches_scene["Artiste_Apporte"]]
+                
+                    besoins_cache = get_besoins_cache()
+                    groupe_exp = None if sel_grp_exp == "Tous" else sel_grp_exp
+                    if m_bes == "Par Jour & Scène":
+                        data_pic, col_total = besoins_cache.pics(s_j_m, s_s_m, groupe_exp), "Total"
+                    else:
+                        data_pic, col_total = besoins_cache.periode(s_s_m, groupe_exp), "Max_Periode"
+                
+                    col_btn_pdf, col_btn_ej = st.columns(2)
+                
+                    with col_btn_pdf:
+                        titre_besoin = f"BESOINS ({s_s_m} - {s_j_m if m_bes == 'Par Jour & Scène' else 'Période Totale'})"
+                        if sel_grp_exp != "Tous": titre_besoin += f" - {sel_grp_exp}"
+
+                        def construire_besoins():
+                            arts_infos, besoins_cats = contenu_besoins(
+                                arts_scope, data_pic, col_total, fiches_apporte, alim_scene, circuits_scope, notes_scope, contacts_scope,
+                                jour=s_j_m if m_bes == "Par Jour & Scène" else None, groupe=groupe_exp
+                            )
+                            return generer_pdf_besoins_custom(titre_besoin, arts_infos, besoins_cats, festival_name=nom_fest, festival_logo=logo_fest)
 
-                    for a in arts_scope:
-                        arts_infos[a] = {}
-                        
-                        # Contacts
-                        c_df = get_migrated_contacts(st.session_state.contacts_artistes.get(a), roles_art_map)
-                        contacts_text = ""
-                        if not c_df.empty:
-                            lines = []
-                            for _, row in c_df.iterrows():
-                                role = str(row.get("Rôle", "")).strip()
-                                nom = str(row.get("Nom", "")).strip()
-                                prenom = str(row.get("Prénom", "")).strip()
-                                tel = str(row.get("Tel", "")).strip()
-                                mail = str(row.get("Mail", "")).strip()
-                                talkie = str(row.get("Canal Talkie", "")).strip()
-                                
-                                if nom or prenom or tel or mail or talkie:
-                                    parts = []
-                                    if prenom or nom: parts.append(f"{prenom} {nom}".strip())
-                                    if tel: parts.append(tel)
-                                    if mail: parts.append(mail)
-                                    if talkie: parts.append(f"Talkie: {talkie}")
-                                    lines.append(f"{role} : " + " - ".join(parts))
-                            contacts_text = "\n".join(lines)
-                        arts_infos[a]["Contacts"] = contacts_text
-
-                        # Circuits
-                        if a in st.session_state.artist_circuits:
-                            c = st.session_state.artist_circuits[a]
-                            q_in, q_ear, q_ms, q_mm = c.get("inputs", 0), c.get("ear_stereo", 0), c.get("mon_stereo", 0), c.get("mon_mono", 0)
-                            q_sides = c.get("sides_monitors", False)
-                            
-                            df_circuits = pd.DataFrame({
-                                "Type de Circuit": ["Circuits d'entrées", "EAR MONITOR // Circuits stéréo", "MONITOR // circuits stéréo", "MONITOR // circuits mono", "SIDES MONITORS"],
-                                "Quantité / Statut": [q_in, q_ear, q_ms, q_mm, "OUI" if q_sides else "NON"]
-                            })
-                            arts_infos[a]["Circuits"] = df_circuits
-                        else:
-                            arts_infos[a]["Circuits"] = None
+                        bouton_export(
+                            "📥 Télécharger PDF Besoins",
+                            ("besoins", titre_besoin, m_bes, s_j_m, sel_grp_exp, arts_scope, data_pic, fiches_apporte, alim_scene, circuits_scope, notes_scope, contacts_scope, nom_fest, logo_fest),
+                            construire_besoins, "besoins.pdf"
+                        )
 
-                        # Alimentation
-                        df_alim_besoin = st.session_state.alim_elec[
-                            (st.session_state.alim_elec["Groupe"] == a) & 
-                            (st.session_state.alim_elec["Scène"].astype(str) == str(s_s_m))
-                        ]
-                        if m_bes == "Par Jour & Scène":
-                            df_alim_besoin = df_alim_besoin[df_alim_besoin["Jour"].astype(str) == str(s_j_m)]
-                        arts_infos[a]["Alim"] = df_alim_besoin[["Format", "Métier", "Emplacement"]] if not df_alim_besoin.empty else None
+                    with col_btn_ej:
+                        easyjob_mapping = mapping_scope
 
-                        # Notes
-                        arts_infos[a]["Notes"] = st.session_state.notes_artistes.get(a, "").strip()
+                        def construire_easyjob():
+                            return generer_xlsx_easyjob(data_pic, col_total, easyjob_mapping)
 
+                        bouton_export(
+                            "Export Easyjob",
+                            ("easyjob", data_pic, col_total, mapping_scope),
+                            construire_easyjob, "easyjob_export.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        )
 
-                    # 2. PRÉPARATION DES BESOINS MATÉRIELS (Par Catégorie)
-                    def calcul_pic(df_input, jour, scene):
-                        if sel_grp_exp != "Tous":
-                            plan = st.session_state.planning[(st.session_state.planning["Jour"].astype(str) == str(jour)) & (st.session_state.planning["Scène"].astype(str) == str(scene)) & (st.session_state.planning["Artiste"] == sel_grp_exp)]
-                        else:
-                            plan = st.session_state.planning[(st.session_state.planning["Jour"].astype(str) == str(jour)) & (st.session_state.planning["Scène"].astype(str) == str(scene))]
-                        arts = plan["Artiste"].tolist()
-                        if not arts or df_input.empty: return pd.DataFrame()
-                        mat = df_input.groupby(["Catégorie", "Marque", "Modèle", "Groupe"])["Quantité"].sum().unstack(fill_value=0)
-                        for a in arts: 
-                            if a not in mat.columns: mat[a] = 0
-                        res = pd.concat([mat[arts].iloc[:, i] + mat[arts].iloc[:, i+1] for i in range(len(arts)-1)], axis=1).max(axis=1) if len(arts) > 1 else mat[arts].iloc[:, 0]
-                        df_res = res.reset_index()
-                        df_res.columns = list(df_res.columns[:-1]) + ["Total"]
-                        return df_res
-
-                    besoins_cats = {}
-                    if m_bes == "Par Jour & Scène":
-                        data_pic = calcul_pic(df_base[df_base["Jour"].astype(str) == str(s_j_m)], s_j_m, s_s_m)
-                        if not data_pic.empty:
-                            for cat in data_pic["Catégorie"].unique():
-                                cols_dispo = [c for c in ["Marque", "Modèle", "Total"] if c in data_pic.columns]
-                                besoins_cats[cat] = data_pic[data_pic["Catégorie"] == cat][cols_dispo]
-                    else:
-                        all_days_res = []
-                        for j in df_base["Jour"].unique():
-                            res_j = calcul_pic(df_base[df_base["Jour"] == j], j, s_s_m)
-                            if not res_j.empty: all_days_res.append(res_j.set_index(["Catégorie", "Marque", "Modèle"]))
-                        if all_days_res:
-                            final = pd.concat(all_days_res, axis=1).max(axis=1).reset_index().rename(columns={0: "Max_Periode"})
-                            for cat in final["Catégorie"].unique():
-                                cols_dispo_glob = [c for c in ["Marque", "Modèle", "Max_Periode"] if c in final.columns]
-                                besoins_cats[cat] = final[final["Catégorie"] == cat][cols_dispo_glob]
-
-                    # Apports artistes
-                    df_apporte = st.session_state.fiches_tech[(st.session_state.fiches_tech["Scène"].astype(str) == str(s_s_m)) & (st.session_state.fiches_tech["Artiste_Apporte"] == True)]
-                    if m_bes == "Par Jour & Scène": df_apporte = df_apporte[df_apporte["Jour"].astype(str) == str(s_j_m)]
-                    if sel_grp_exp != "Tous": df_apporte = df_apporte[df_apporte["Groupe"] == sel_grp_exp]
-                    artistes_apporte = df_apporte["Groupe"].unique()
-                    for art in artistes_apporte:
-                        items_art = df_apporte[df_apporte["Groupe"] == art][["Catégorie", "Marque", "Modèle", "Quantité"]]
-                        if not items_art.empty:
-                            besoins_cats[f"FOURNI PAR L'ARTISTE : {art}"] = items_art
-
-                    # 3. GÉNÉRATION
-                    pdf_bytes_b = generer_pdf_besoins_custom(titre_besoin, arts_infos, besoins_cats)
-                    st.download_button("📥 Télécharger PDF Besoins", pdf_bytes_b, "besoins.pdf", "application/pdf", use_container_width=True)
-
-                with col_btn_ej:
-                    if st.button("Export Easyjob", use_container_width=True):
-                        df_base_ej = st.session_state.fiches_tech[(st.session_state.fiches_tech["Scène"].astype(str) == str(s_s_m)) & (st.session_state.fiches_tech["Artiste_Apporte"] == False)]
-                        if sel_grp_exp != "Tous": df_base_ej = df_base_ej[df_base_ej["Groupe"] == sel_grp_exp]
-
-                        def calcul_pic_ej(df_input, jour, scene):
-                            if sel_grp_exp != "Tous": plan = st.session_state.planning[(st.session_state.planning["Jour"].astype(str) == str(jour)) & (st.session_state.planning["Scène"].astype(str) == str(scene)) & (st.session_state.planning["Artiste"] == sel_grp_exp)]
-                            else: plan = st.session_state.planning[(st.session_state.planning["Jour"].astype(str) == str(jour)) & (st.session_state.planning["Scène"].astype(str) == str(scene))]
-                            arts = plan["Artiste"].tolist()
-                            if not arts or df_input.empty: return pd.DataFrame()
-                            mat = df_input.groupby(["Catégorie", "Marque", "Modèle", "Groupe"])["Quantité"].sum().unstack(fill_value=0)
-                            for a in arts: 
-                                if a not in mat.columns: mat[a] = 0
-                            res = pd.concat([mat[arts].iloc[:, i] + mat[arts].iloc[:, i+1] for i in range(len(arts)-1)], axis=1).max(axis=1) if len(arts) > 1 else mat[arts].iloc[:, 0]
-                            df_res = res.reset_index()
-                            df_res.columns = list(df_res.columns[:-1]) + ["Total"]
-                            return df_res
-
-                        export_data = []
-
-                        if m_bes == "Par Jour & Scène":
-                            data_pic = calcul_pic_ej(df_base_ej[df_base_ej["Jour"].astype(str) == str(s_j_m)], s_j_m, s_s_m)
-                            if not data_pic.empty:
-                                for _, row in data_pic.iterrows():
-                                    qty = row["Total"]
-                                    if qty > 0:
-                                        cat, marque, modele = row['Catégorie'], row['Marque'], row['Modèle']
-                                        item_name = f"{marque} {modele}".strip()
-                                        if st.session_state.easyjob_mapping.get(cat, {}).get(marque, {}).get(modele):
-                                            item_name = st.session_state.easyjob_mapping[cat][marque][modele]
-                                        export_data.append({"Quantity": qty, "Items": item_name})
-                        else:
-                            all_days_res = []
-                            for j in df_base_ej["Jour"].unique():
-                                 res_j = calcul_pic_ej(df_base_ej[df_base_ej["Jour"] == j], j, s_s_m)
-                                 if not res_j.empty: all_days_res.append(res_j.set_index(["Catégorie", "Marque", "Modèle"]))
-                            if all_days_res:
-                                 final = pd.concat(all_days_res, axis=1).max(axis=1).reset_index().rename(columns={0: "Max_Periode"})
-                                 for _, row in final.iterrows():
-                                     qty = row["Max_Periode"]
-                                     if qty > 0:
-                                        cat, marque, modele = row['Catégorie'], row['Marque'], row['Modèle']
-                                        item_name = f"{marque} {modele}".strip()
-                                        if st.session_state.easyjob_mapping.get(cat, {}).get(marque, {}).get(modele):
-                                            item_name = st.session_state.easyjob_mapping[cat][marque][modele]
-                                        export_data.append({"Quantity": qty, "Items": item_name})
-                        
-                        df_export = pd.DataFrame(export_data, columns=["Quantity", "Items"])
-                        output = io.BytesIO()
-                        with pd.ExcelWriter(output) as writer:
-                            df_export.to_excel(writer, index=False, sheet_name='Easyjob')
-                        excel_data = output.getvalue()
-                        st.download_button("📥 Télécharger Excel", excel_data, "easyjob_export.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-        st.divider()
-        st.subheader("🎛️ Export Patch IN / OUT")
-        with st.container(border=True):
-            if st.session_state.planning.empty:
-                st.info("Aucun artiste dans le planning pour générer un patch.")
-            else:
-                col_ep1, col_ep2, col_ep3, col_ep4 = st.columns(4)
-                with col_ep1:
-                    l_jours_p = sorted(st.session_state.planning["Jour"].dropna().astype(str).unique())
-                    s_j_patch = st.selectbox("Jour (Patch)", l_jours_p, key="export_j_patch")
-                with col_ep2:
-                    scenes_jour = st.session_state.planning[st.session_state.planning["Jour"].astype(str) == str(s_j_patch)]["Scène"].dropna().astype(str).unique()
-                    s_s_patch = st.selectbox("Scène (Patch)", scenes_jour, key="export_s_patch")
-                with col_ep3:
-                    artistes_patch = st.session_state.planning[(st.session_state.planning["Jour"].astype(str) == str(s_j_patch)) & (st.session_state.planning["Scène"].astype(str) == str(s_s_patch))]["Artiste"].unique()
-                    s_a_patch = st.selectbox("Groupe (Patch)", artistes_patch, key="export_a_patch")
-                with col_ep4:
-                    cb_patch_in = st.checkbox("PATCH IN", value=True)
-                    s_m_patch = None
-                    if cb_patch_in:
-                        s_m_patch = st.radio("Format IN", ["12N", "20H"], horizontal=True)
-                    cb_patch_out = st.checkbox("PATCH OUT", value=False)
-
-                dico_patch = {}
-                note_patch = st.session_state.notes_artistes.get(s_a_patch, "").strip()
-                if note_patch: dico_patch["--- INFORMATIONS / NOTES ---"] = note_patch
-                
-                if s_a_patch in st.session_state.artist_circuits:
-                    c_patch = st.session_state.artist_circuits[s_a_patch]
-                    q_in, q_ear, q_ms, q_mm = c_patch.get("inputs", 0), c_patch.get("ear_stereo", 0), c_patch.get("mon_stereo", 0), c_patch.get("mon_mono", 0)
-                    q_sides = c_patch.get("sides_monitors", False)
-                    
-                    df_circuits_patch = pd.DataFrame({
-                        "Type de Circuit": ["Circuits d'entrées", "EAR MONITOR // Circuits stéréo", "MONITOR // circuits stéréo", "MONITOR // circuits mono", "SIDES MONITORS"],
-                        "Quantité / Statut": [q_in, q_ear, q_ms, q_mm, "OUI" if q_sides else "NON"]
-                    })
-                    dico_patch["--- CONFIGURATION CIRCUITS ---"] = df_circuits_patch
-                
-                df_alim_patch = st.session_state.alim_elec[
-                    (st.session_state.alim_elec["Groupe"] == s_a_patch) & 
-                    (st.session_state.alim_elec["Scène"].astype(str) == str(s_s_patch)) & 
-                    (st.session_state.alim_elec["Jour"].astype(str) == str(s_j_patch))
-                ][["Format", "Métier", "Emplacement"]]
-                
-                if not df_alim_patch.empty: dico_patch["--- ALIMENTATION ELECTRIQUE ---"] = df_alim_patch
+            st.divider()
+            st.subheader("🎛️ Export Patch IN / OUT")
+            with st.container(border=True):
+                if st.session_state.planning.empty:
+                    st.info("Aucun artiste dans le planning pour générer un patch.")
+                else:
+                    col_ep1, col_ep2, col_ep3, col_ep4 = st.columns(4)
+                    with col_ep1:
+                        s_j_patch = st.selectbox("Jour (Patch)", l_jours, key="export_j_patch")
+                    with col_ep2:
+                        s_s_patch = st.selectbox("Scène (Patch)", idx_plan.scenes_du_jour(s_j_patch), key="export_s_patch")
+                    with col_ep3:
+                        artistes_patch = idx_plan.groupes(s_j_patch, s_s_patch)
+                        s_a_patch = st.selectbox("Groupe (Patch)", artistes_patch, key="export_a_patch")
+                    with col_ep4:
+                        cb_patch_in = st.checkbox("PATCH IN", value=True)
+                        s_m_patch = None
+                        if cb_patch_in:
+                            s_m_patch = st.radio("Format IN", ["12N", "20H"], horizontal=True)
+                        cb_patch_out = st.checkbox("PATCH OUT", value=False)
+
+                    circuits_patch = st.session_state.artist_circuits.get(s_a_patch)
+                    df_alim_patch = get_index("alim_elec", "Groupe").tranche(s_j_patch, s_s_patch)
+                    df_alim_patch = df_alim_patch[df_alim_patch["Groupe"] == s_a_patch]
                 
-                has_data = False
+                    has_data = False
+                    patch_in = patch_out = None
                 
-                if cb_patch_in and s_m_patch:
-                    if s_a_patch in st.session_state.patches_io and st.session_state.patches_io[s_a_patch].get(s_m_patch) is not None:
-                        dico_patch.update(st.session_state.patches_io[s_a_patch][s_m_patch])
-                        has_data = True
-                    else:
-                        st.warning(f"⚠️ Aucun Patch IN {s_m_patch} trouvé pour {s_a_patch}.")
+                    if cb_patch_in and s_m_patch:
+                        if s_a_patch in st.session_state.patches_io and st.session_state.patches_io[s_a_patch].get(s_m_patch) is not None:
+                            patch_in = projeter_tables(st.session_state.patches_io[s_a_patch][s_m_patch], s_m_patch)
+                            has_data = True
+                        else:
+                            st.warning(f"⚠️ Aucun Patch IN {s_m_patch} trouvé pour {s_a_patch}.")
 
-                if cb_patch_out:
-                    if s_a_patch in st.session_state.patches_out and st.session_state.patches_out[s_a_patch] is not None:
-                        dico_patch["--- PATCH OUT ---"] = st.session_state.patches_out[s_a_patch]
-                        has_data = True
+                    if cb_patch_out:
+                        if s_a_patch in st.session_state.patches_out and st.session_state.patches_out[s_a_patch] is not None:
+                            patch_out = st.session_state.patches_out[s_a_patch]
+                            has_data = True
+                        else:
+                            st.warning(f"⚠️ Aucun Patch OUT trouvé pour {s_a_patch}.")
+
+                    dico_patch = contenu_patch(st.session_state.notes_artistes.get(s_a_patch, ""), circuits_patch, df_alim_patch, patch_in, patch_out)
+                    if has_data or "--- CONFIGURATION CIRCUITS ---" in dico_patch:
+                        titre_patch = f"PATCH - {s_a_patch} ({s_j_patch} | {s_s_patch})"
+                        bouton_export(
+                            "📥 Télécharger PDF Patch", ("patch", titre_patch, dico_patch, nom_fest, logo_fest),
+                            lambda: generer_pdf_patch(titre_patch, dico_patch, festival_name=nom_fest, festival_logo=logo_fest), f"patch_{s_a_patch}.pdf"
+                        )
                     else:
-                        st.warning(f"⚠️ Aucun Patch OUT trouvé pour {s_a_patch}.")
+                        st.error("Aucune donnée de patch sélectionnée ou disponible à exporter.")
 
-                if has_data or "--- CONFIGURATION CIRCUITS ---" in dico_patch:
-                    titre_patch = f"PATCH - {s_a_patch} ({s_j_patch} | {s_s_patch})"
-                    pdf_bytes_p = generer_pdf_patch(titre_patch, dico_patch)
-                    st.download_button("📥 Télécharger PDF Patch", pdf_bytes_p, f"patch_{s_a_patch}.pdf", "application/pdf", use_container_width=True)
+            st.divider()
+            st.subheader("🗂️ Export groupé (ZIP)")
+            with st.container(border=True):
+                if st.session_state.planning.empty:
+                    st.info("Aucun artiste dans le planning.")
                 else:
-                    st.error("Aucune donnée de patch sélectionnée ou disponible à exporter.")
+                    col_lot1, col_lot2 = st.columns(2)
+                    m_lot = col_lot1.radio("Périmètre", ["Jour", "Scène", "Festival"], horizontal=True, key="m_lot")
+                    s_lot = None
+                    if m_lot == "Jour": s_lot = col_lot2.selectbox("Jour (Lot)", l_jours, key="s_lot_j")
+                    elif m_lot == "Scène": s_lot = col_lot2.selectbox("Scène (Lot)", l_scenes, key="s_lot_s")
+
+                    jour_lot, scene_lot = (s_lot if m_lot == "Jour" else None), (s_lot if m_lot == "Scène" else None)
+                    # Documents listés seulement à la génération ; l'empreinte du périmètre suffit à savoir si l'archive est à jour
+                    cle_zip = cle_perimetre(st.session_state, jour_lot, scene_lot, get_catalogue().version)
+                    st.caption("Plannings, besoins (PDF + EasyJob) et patchs de chaque artiste.")
+
+                    if st.button("⚙️ Générer l'archive", use_container_width=True):
+                        docs_lot = lister_documents(st.session_state, get_besoins_cache(), jour=jour_lot, scene=scene_lot,
+                                                    index=idx_plan, mapping=get_catalogue().mapping)
+                        barre = st.progress(0.0, text="Rendu des documents...")
+                        purger_exports()
+                        chemin_zip = exporter_zip(
+                            docs_lot, pool=get_pool_export(),
+                            progression=lambda n, total: barre.progress(n / total, text=f"Rendu des documents... {n}/{total}")
+                        )
+                        st.session_state.export_lot = (cle_zip, chemin_zip, len(docs_lot))
+
+                    lot_pret = st.session_state.get("export_lot")
+                    if lot_pret and lot_pret[0] == cle_zip and os.path.exists(lot_pret[1]):
+                        chemin_zip = lot_pret[1]
+                        st.caption(f"Archive prête : {lot_pret[2]} documents.")
+                        def lire_zip(chemin=chemin_zip):
+                            with open(chemin, "rb") as f:
+                                return f.read()
+                        st.download_button(
+                            "📥 Télécharger l'archive (ZIP)",
+                            data=lire_zip,
+                            file_name=f"export_{nom_fichier(s_lot or 'festival')}.zip",
+                            mime="application/zip",
+                            use_container_width=True
+                        )
 
 # ==========================================
 # ONGLET 2 : GESTION FESTIVAL
 # ==========================================
 with main_tabs[1]:
-    sub_tabs_fest = st.tabs(["Gestion des artistes / Planning", "Contacts"])
+    sub_tabs_fest = st.tabs(["Gestion des artistes / Planning", "Contacts"], key="onglet_fest", on_change="rerun")
     
     # --- SOUS-ONGLET 1 : GESTION PLANNING ---
     with sub_tabs_fest[0]:
-        # --- BLOC 1 : AJOUTER UN ARTISTE ---
-        with st.expander("➕ Ajouter un Artiste", expanded=True):
-            c1, c2, c3 = st.columns(3)
-            sc = c1.text_input("Scène", "MainStage")
-            jo = c2.date_input("Date de passage", datetime.date.today())
-            ar = c3.text_input("Nom Artiste")
+        if main_tabs[1].open and sub_tabs_fest[0].open:
+            # --- BLOC 1 : AJOUTER UN ARTISTE ---
+            with st.expander("➕ Ajouter un Artiste", expanded=True):
+                c1, c2, c3 = st.columns(3)
+                sc = c1.text_input("Scène", "MainStage")
+                jo = c2.date_input("Date de passage", datetime.date.today())
+                ar = c3.text_input("Nom Artiste")
             
-            st.write("⏱️ **Horaires des phases**")
-            r2_1, r2_2, r2_3 = st.columns(3)
-            with r2_1:
-                st.markdown("**Load IN**")
-                c_d, c_f, c_dur = st.columns(3)
-                li_d = c_d.selectbox("Début", time_options, key="li_d")
-                li_f = c_f.selectbox("Fin", time_options, key="li_f")
-                li_dur = c_dur.number_input("Durée (m)", min_value=0, step=5, key="li_dur")
-            with r2_2:
-                st.markdown("**Installation Off Stage**")
-                c_d, c_f, c_dur = st.columns(3)
-                ioff_d = c_d.selectbox("Début", time_options, key="ioff_d")
-                ioff_f = c_f.selectbox("Fin", time_options, key="ioff_f")
-                ioff_dur = c_dur.number_input("Durée (m)", min_value=0, step=5, key="ioff_dur")
-            with r2_3:
-                st.markdown("**Installation On Stage**")
-                c_d, c_f, c_dur = st.columns(3)
-                ion_d = c_d.selectbox("Début", time_options, key="ion_d")
-                ion_f = c_f.selectbox("Fin", time_options, key="ion_f")
-                ion_dur = c_dur.number_input("Durée (m)", min_value=0, step=5, key="ion_dur")
-
-            r3_1, r3_2, r3_3 = st.columns(3)
-            with r3_1:
-                st.markdown("**Balances**")
-                c_d, c_f, c_dur = st.columns(3)
-                bal_d = c_d.selectbox("Début", time_options, key="bal_d")
-                bal_f = c_f.selectbox("Fin", time_options, key="bal_f")
-                bal_dur = c_dur.number_input("Durée (m)", min_value=0, step=5, key="bal_dur")
-            with r3_2:
-                st.markdown("**Change Over**")
-                c_d, c_f, c_dur = st.columns(3)
-                co_d = c_d.selectbox("Début", time_options, key="co_d")
-                co_f = c_f.selectbox("Fin", time_options, key="co_f")
-                co_dur = c_dur.number_input("Durée (m)", min_value=0, step=5, key="co_dur")
-            with r3_3:
-                st.markdown("**Show**")
-                c_d, c_f, c_dur = st.columns(3)
-                sh_d = c_d.selectbox("Début", time_options, key="sh_d")
-                sh_f = c_f.selectbox("Fin", time_options, key="sh_f")
-                sh_dur = c_dur.number_input("Durée (m)", min_value=0, step=5, key="sh_dur")
-
-            pdfs = st.file_uploader("Fiches Techniques (PDF)", accept_multiple_files=True, key=f"upl_{st.session_state.uploader_key}")
+                st.write("⏱️ **Horaires des phases**")
+                r2_1, r2_2, r2_3 = st.columns(3)
+                with r2_1:
+                    st.markdown("**Load IN**")
+                    c_d, c_f, c_dur = st.columns(3)
+                    li_d = c_d.selectbox("Début", time_options, key="li_d")
+                    li_f = c_f.selectbox("Fin", time_options, key="li_f")
+                    li_dur = c_dur.number_input("Durée (m)", min_value=0, step=5, key="li_dur")
+                with r2_2:
+                    st.markdown("**Installation Off Stage**")
+                    c_d, c_f, c_dur = st.columns(3)
+                    ioff_d = c_d.selectbox("Début", time_options, key="ioff_d")
+                    ioff_f = c_f.selectbox("Fin", time_options, key="ioff_f")
+                    ioff_dur = c_dur.number_input("Durée (m)", min_value=0, step=5, key="ioff_dur")
+                with r2_3:
+                    st.markdown("**Installation On Stage**")
+                    c_d, c_f, c_dur = st.columns(3)
+                    ion_d = c_d.selectbox("Début", time_options, key="ion_d")
+                    ion_f = c_f.selectbox("Fin", time_options, key="ion_f")
+                    ion_dur = c_dur.number_input("Durée (m)", min_value=0, step=5, key="ion_dur")
+
+                r3_1, r3_2, r3_3 = st.columns(3)
+                with r3_1:
+                    st.markdown("**Balances**")
+                    c_d, c_f, c_dur = st.columns(3)
+                    bal_d = c_d.selectbox("Début", time_options, key="bal_d")
+                    bal_f = c_f.selectbox("Fin", time_options, key="bal_f")
+                    bal_dur = c_dur.number_input("Durée (m)", min_value=0, step=5, key="bal_dur")
+                with r3_2:
+                    st.markdown("**Change Over**")
+                    c_d, c_f, c_dur = st.columns(3)
+                    co_d = c_d.selectbox("Début", time_options, key="co_d")
+                    co_f = c_f.selectbox("Fin", time_options, key="co_f")
+                    co_dur = c_dur.number_input("Durée (m)", min_value=0, step=5, key="co_dur")
+                with r3_3:
+                    st.markdown("**Show**")
+                    c_d, c_f, c_dur = st.columns(3)
+                    sh_d = c_d.selectbox("Début", time_options, key="sh_d")
+                    sh_f = c_f.selectbox("Fin", time_options, key="sh_f")
+                    sh_dur = c_dur.number_input("Durée (m)", min_value=0, step=5, key="sh_dur")
+
+                pdfs = st.file_uploader("Fiches Techniques (PDF)", accept_multiple_files=True, key=f"upl_{st.session_state.uploader_key}")
             
-            if st.button("Valider Artiste", type="primary"):
-                if ar:
-                    li_d, li_f = compute_times(li_d, li_f, li_dur)
-                    ioff_d, ioff_f = compute_times(ioff_d, ioff_f, ioff_dur)
-                    ion_d, ion_f = compute_times(ion_d, ion_f, ion_dur)
-                    bal_d, bal_f = compute_times(bal_d, bal_f, bal_dur)
-                    co_d, co_f = compute_times(co_d, co_f, co_dur)
-                    sh_d, sh_f = compute_times(sh_d, sh_f, sh_dur)
-
-                    new_row = pd.DataFrame([{
-                        "Scène": sc, "Jour": str(jo), "Artiste": ar, 
-                        "Load IN Début": li_d, "Load IN Fin": li_f,
-                        "Inst Off Début": ioff_d, "Inst Off Fin": ioff_f,
-                        "Inst On Début": ion_d, "Inst On Fin": ion_f,
-                        "Balance Début": bal_d, "Balance Fin": bal_f,
-                        "Change Over Début": co_d, "Change Over Fin": co_f,
-                        "Show Début": sh_d, "Show Fin": sh_f
-                    }])
-                    st.session_state.planning = pd.concat([st.session_state.planning, new_row], ignore_index=True)
-                    if ar not in st.session_state.riders_stockage: st.session_state.riders_stockage[ar] = {}
-                    if pdfs:
-                        for f in pdfs: st.session_state.riders_stockage[ar][f.name] = f.read()
-                    st.session_state.uploader_key += 1
-                    st.rerun()
-
-        # --- BLOC 2 : PLANNING GLOBAL ---
-        with st.expander("📋 Planning Global (Modifiable)", expanded=False):
-            if not st.session_state.planning.empty:
-                df_visu = st.session_state.planning.copy()
-                df_visu.insert(0, "Rider", df_visu["Artiste"].apply(lambda x: "✅" if st.session_state.riders_stockage.get(x) else "❌"))
-                
-                edited_df = st.data_editor(df_visu, use_container_width=True, num_rows="dynamic", key="main_editor", hide_index=True)
+                if st.button("Valider Artiste", type="primary"):
+                    if ar:
+                        debut_j = st.session_state.debut_journee
+                        saisies = {
+                            "Load IN": (li_d, li_f, li_dur), "Inst Off Stage": (ioff_d, ioff_f, ioff_dur),
+                            "Inst On Stage": (ion_d, ion_f, ion_dur), "Balance": (bal_d, bal_f, bal_dur),
+                            "Change Over": (co_d, co_f, co_dur), "Show": (sh_d, sh_f, sh_dur)
+                        }
+                        horaires = {}
+                        for p_name, c_deb, c_fin, _ in PHASES:
+                            d, f, dur = saisies[p_name]
+                            horaires[c_deb], horaires[c_fin] = fin_par_duree(minute(d, debut_j), minute(f, debut_j), dur)
+
+                        new_row = pd.DataFrame([{"Scène": sc, "Jour": str(jo), "Artiste": ar, **horaires}])
+                        st.session_state.planning = typer("planning", pd.concat([st.session_state.planning, new_row], ignore_index=True), debut_j)
+                        if ar not in st.session_state.riders_stockage: st.session_state.riders_stockage[ar] = {}
+                        if pdfs:
+                            for f in pdfs: st.session_state.riders_stockage[ar][f.name] = rider_store.ajouter_flux(f)
+                        st.session_state.uploader_key += 1
+                        st.rerun()
+
+            # --- BLOC 2 : PLANNING GLOBAL ---
+            with st.expander("📋 Planning Global (Modifiable)", expanded=False):
+                if not st.session_state.planning.empty:
+                    df_visu = vers_editeur(st.session_state.planning, st.session_state.debut_journee).copy()
+                    df_visu.insert(0, "Rider", df_visu["Artiste"].apply(lambda x: "✅" if st.session_state.riders_stockage.get(x) else "❌"))
+                    alertes = get_conflits().par_ligne()
+                    df_visu.insert(1, "Conflits", alertes.reindex(range(len(df_visu))).fillna("").to_numpy())
+                    if not alertes.empty:
+                        st.warning(f"⚠️ {len(alertes)} ligne(s) en conflit d'occupation de scène (voir colonne « Conflits »).")
                 
-                if not edited_df.equals(df_visu):
-                    df_to_save = edited_df.drop(columns=["Rider"])
-                    df_to_save = df_to_save.dropna(how="all").reset_index(drop=True)
-                    df_to_save["Artiste"] = df_to_save["Artiste"].fillna("À définir")
-                    st.session_state.planning = df_to_save
-                    
-                    artistes_actifs = st.session_state.planning["Artiste"].unique()
-                    keys_to_delete = [k for k in st.session_state.riders_stockage.keys() if k not in artistes_actifs]
-                    for k in keys_to_delete: del st.session_state.riders_stockage[k]
-                    
-                    st.rerun()
-
-        # --- BLOC 3 : GESTION PDF ---
-        with st.expander("📁 Gestion des Fichiers PDF", expanded=False):
-            if st.session_state.riders_stockage:
-                keys_list = list(st.session_state.riders_stockage.keys())
-                if keys_list:
-                    cg1, cg2 = st.columns(2)
-                    with cg1:
-                        choix_art_pdf = st.selectbox("Choisir Artiste pour gérer ses PDF :", keys_list)
-                        fichiers = st.session_state.riders_stockage.get(choix_art_pdf, {})
-                        for fname in list(fichiers.keys()):
-                            cf1, cf2 = st.columns([4, 1])
-                            cf1.write(f"📄 {fname}")
-                            if cf2.button("🗑️", key=f"del_pdf_{fname}"):
-                                del st.session_state.riders_stockage[choix_art_pdf][fname]
-                                st.rerun()
-                    with cg2:
-                        nouveaux_pdf = st.file_uploader("Ajouter des fichiers", accept_multiple_files=True, key="add_pdf_extra")
-                        if st.button("Enregistrer les nouveaux PDF"):
-                            if nouveaux_pdf:
-                                for f in nouveaux_pdf: st.session_state.riders_stockage[choix_art_pdf][f.name] = f.read()
+                    st.data_editor(df_visu, use_container_width=True, num_rows="dynamic", key="main_editor", hide_index=True, disabled=["Rider", "Conflits"],
+                                   on_change=editer_planning, args=("main_editor",))
+
+            # --- BLOC 2 BIS : ORDONNANCEUR ---
+            with st.expander("🧮 Ordonnanceur automatique (Jour & Scène)", expanded=False):
+                if not st.session_state.planning.empty:
+                    idx_plan = get_index("planning")
+                    debut_j = st.session_state.debut_journee
+                    co_1, co_2 = st.columns(2)
+                    j_ordo = co_1.selectbox("Jour", idx_plan.jours, key="ordo_j")
+                    s_ordo = co_2.selectbox("Scène", idx_plan.scenes_du_jour(j_ordo), key="ordo_s")
+                    co_3, co_4, co_5, co_6 = st.columns(4)
+                    acces_ordo = co_3.selectbox("Accès plateau", time_options[1:], index=time_options.index("09:00") - 1, key="ordo_acces")
+                    portes_ordo = co_4.selectbox("Ouverture des portes", time_options[1:], index=time_options.index("18:00") - 1, key="ordo_portes")
+                    cf_ordo = co_5.selectbox("Couvre-feu", time_options[1:], index=time_options.index("02:00") - 1, key="ordo_cf")
+                    co_min_ordo = co_6.number_input("Change over minimum (m)", min_value=0, step=5, value=15, key="ordo_co")
+                    ordre_fixe = st.checkbox("Conserver l'ordre de passage actuel", value=False, key="ordo_ordre")
+                    st.caption("Durées en minutes, dans l'ordre de passage souhaité. « Show fixe » (HH:MM) impose l'heure de début d'un show.")
+
+                    pos_ordo = idx_plan.positions(j_ordo, s_ordo)
+                    df_durees = durees_planning(idx_plan.tranche(j_ordo, s_ordo), debut_j)
+                    df_durees["Show fixe"] = ""
+                    durees_ed = st.data_editor(df_durees, use_container_width=True, hide_index=True, disabled=["Artiste"], key=f"ordo_ed_{j_ordo}_{s_ordo}")
+
+                    if st.button("🧮 Calculer le planning", key="ordo_calc"):
+                        durees_calc = durees_ed.copy()
+                        durees_calc["Show fixe"] = [minute(v, debut_j) for v in durees_calc["Show fixe"].fillna("")]
+                        try:
+                            horaires = ordonnancer(
+                                durees_calc, minute(portes_ordo, debut_j), minute(cf_ordo, debut_j),
+                                acces=minute(acces_ordo, debut_j), co_min=co_min_ordo, ordre_impose=ordre_fixe
+                            )
+                            st.session_state.ordo_proposition = (j_ordo, s_ordo, st.session_state.planning, horaires)
+                        except Infaisable as e:
+                            st.session_state.ordo_proposition = None
+                            st.error(f"❌ {e}")
+
+                    prop = st.session_state.get("ordo_proposition")
+                    if prop and prop[:2] == (j_ordo, s_ordo) and prop[2] is st.session_state.planning:
+                        st.dataframe(build_planning_grid(prop[3], debut_j), use_container_width=True, hide_index=True)
+                        if st.button("✅ Appliquer au planning", type="primary", key="ordo_appliquer"):
+                            st.session_state.planning = typer("planning", appliquer(st.session_state.planning, pos_ordo, prop[3]), debut_j)
+                            st.session_state.ordo_proposition = None
                             st.rerun()
+                else:
+                    st.info("Ajoutez des artistes pour utiliser l'ordonnanceur.")
+
+            # --- BLOC 3 : GESTION PDF ---
+            with st.expander("📁 Gestion des Fichiers PDF", expanded=False):
+                if st.session_state.riders_stockage:
+                    keys_list = list(st.session_state.riders_stockage.keys())
+                    if keys_list:
+                        cg1, cg2 = st.columns(2)
+                        with cg1:
+                            choix_art_pdf = st.selectbox("Choisir Artiste pour gérer ses PDF :", keys_list)
+                            fichiers = st.session_state.riders_stockage.get(choix_art_pdf, {})
+                            for fname in list(fichiers.keys()):
+                                cf1, cf2 = st.columns([4, 1])
+                                cf1.write(f"📄 {fname}")
+                                if cf2.button("🗑️", key=f"del_pdf_{fname}"):
+                                    del st.session_state.riders_stockage[choix_art_pdf][fname]
+                                    st.rerun()
+                        with cg2:
+                            nouveaux_pdf = st.file_uploader("Ajouter des fichiers", accept_multiple_files=True, key="add_pdf_extra")
+                            if st.button("Enregistrer les nouveaux PDF"):
+                                if nouveaux_pdf:
+                                    for f in nouveaux_pdf: st.session_state.riders_stockage[choix_art_pdf][f.name] = rider_store.ajouter_flux(f)
+                                st.rerun()
 
-        # --- BLOC 4 : PLANNING QUOTIDIEN ---
-        with st.expander("📅 Planning Quotidien (Visuel Vertical)", expanded=True):
-            if not st.session_state.planning.empty:
-                l_jours_g = sorted(st.session_state.planning["Jour"].dropna().astype(str).unique())
-                cg_1, cg_2 = st.columns(2)
-                s_j_g = cg_1.selectbox("Sélectionner le Jour", l_jours_g)
-                l_scenes_g = sorted(st.session_state.planning[st.session_state.planning["Jour"].astype(str) == str(s_j_g)]["Scène"].dropna().astype(str).unique())
-                s_s_g = cg_2.selectbox("Sélectionner la Scène", l_scenes_g)
+            # --- BLOC 4 : PLANNING QUOTIDIEN ---
+            with st.expander("📅 Planning Quotidien (Visuel Vertical)", expanded=True):
+                if not st.session_state.planning.empty:
+                    idx_plan = get_index("planning")
+                    cg_1, cg_2 = st.columns(2)
+                    s_j_g = cg_1.selectbox("Sélectionner le Jour", idx_plan.jours)
+                    s_s_g = cg_2.selectbox("Sélectionner la Scène", idx_plan.scenes_du_jour(s_j_g))
                 
-                df_g = st.session_state.planning[(st.session_state.planning["Jour"].astype(str) == str(s_j_g)) & (st.session_state.planning["Scène"].astype(str) == str(s_s_g))]
+                    df_g = idx_plan.tranche(s_j_g, s_s_g)
                 
-                gantt_data = []
-                phases = [
-                    ("Load IN", "Load IN Début", "Load IN Fin"),
-                    ("Inst Off Stage", "Inst Off Début", "Inst Off Fin"),
-                    ("Inst On Stage", "Inst On Début", "Inst On Fin"),
-                    ("Balance", "Balance Début", "Balance Fin"),
-                    ("Change Over", "Change Over Début", "Change Over Fin"),
-                    ("Show", "Show Début", "Show Fin")
-                ]
+                    debut_j = st.session_state.debut_journee
+                    df_gantt = phases_longues(df_g, debut_j).sort_values(by=["_ligne", "_ordre"])
                 
-                for _, row in df_g.iterrows():
-                    art = row["Artiste"]
-                    for phase_name, c_deb, c_fin in phases:
-                        deb = row.get(c_deb, "-- none --")
-                        fin = row.get(c_fin, "-- none --")
-                        if deb != "-- none --" and fin != "-- none --":
-                            start_h = time_to_hours(deb)
-                            end_h = time_to_hours(fin)
-                            if end_h < start_h: end_h += 24
-                            dur_h = end_h - start_h
-                            gantt_data.append(dict(
-                                Artiste=art, Phase=phase_name, Start_hours=start_h, Duration_hours=dur_h, 
-                                Start_str=deb, End_str=fin
-                            ))
-                
-                if gantt_data:
-                    if px is not None and MATPLOTLIB_AVAILABLE:
-                        import numpy as np
-                        df_gantt = pd.DataFrame(gantt_data)
-                        
-                        color_map = {
-                            "Load IN": "#4a90e2", "Inst Off Stage": "#f39c12", 
-                            "Inst On Stage": "#e67e22", "Balance": "#8e44ad", 
-                            "Change Over": "#27ae60", "Show": "#e74c3c"
-                        }
+                    if not df_gantt.empty:
+                        if PLOTLY_AVAILABLE:
+                            with demarrage.mesure_imports("plotly.express"):
+                                import plotly.express as px
+                            # Heures depuis minuit de la journée : une phase après minuit continue vers le bas (24, 25...)
+                            df_gantt["Start_hours"] = (df_gantt["Début"] + debut_j) / 60
+                            df_gantt["Duration_hours"] = (df_gantt["Fin"] - df_gantt["Début"]) / 60
+                            df_gantt["Start_str"] = minutes_vers_texte(df_gantt["Début"], debut_j)
+                            df_gantt["End_str"] = minutes_vers_texte(df_gantt["Fin"], debut_j)
+                            color_map = dict(zip(df_gantt["Phase"], df_gantt["Couleur"]))
+                            conflits_g = get_conflits().conflits(s_j_g, s_s_g)
+                            en_conflit = pd.MultiIndex.from_arrays([
+                                np.concatenate([conflits_g["_ligne"].to_numpy(), conflits_g["_ligne 2"].to_numpy()]).astype(np.int64),
+                                np.concatenate([conflits_g["Phase"].to_numpy(), conflits_g["Phase 2"].to_numpy()]).astype(object)
+                            ])
+                            lignes_g = idx_plan.positions(s_j_g, s_s_g)[df_gantt["_ligne"].to_numpy()]
+                            df_gantt["Conflit"] = pd.MultiIndex.from_arrays([lignes_g.astype(np.int64), df_gantt["Phase"].to_numpy().astype(object)]).isin(en_conflit)
                         
-                        fig = px.bar(
-                            df_gantt, x="Artiste", y="Duration_hours", base="Start_hours", color="Phase",
-                            color_discrete_map=color_map,
-                            hover_data={"Start_str": True, "End_str": True, "Duration_hours": False, "Start_hours": False},
-                            text="Phase", title=f"Planning Vertical {s_s_g} - {s_j_g}"
-                        )
+                            fig = px.bar(
+                                df_gantt, x="Artiste", y="Duration_hours", base="Start_hours", color="Phase",
+                                color_discrete_map=color_map,
+                                hover_data={"Start_str": True, "End_str": True, "Duration_hours": False, "Start_hours": False},
+                                text="Phase", title=f"Planning Vertical {s_s_g} - {s_j_g}"
+                            )
                         
-                        y_ticks_ui = np.arange(0, 25, 0.25)
-                        tick_texts_ui = [f"{int(h):02d}:{int(round((h - int(h)) * 60)):02d}" for h in y_ticks_ui]
+                            h_min = np.floor(df_gantt["Start_hours"].min())
+                            h_max = max(np.ceil((df_gantt["Start_hours"] + df_gantt["Duration_hours"]).max()), h_min + 1)
+                            y_ticks_ui = np.arange(h_min, h_max + 0.25, 0.25)
+                            tick_texts_ui = minutes_vers_texte(pd.Series(np.round(y_ticks_ui * 60).astype(int)), 0).tolist()
                         
-                        fig.update_yaxes(
-                            autorange="reversed",
-                            tickmode="array",
-                            tickvals=y_ticks_ui,
-                            ticktext=tick_texts_ui,
-                            title="Heure"
-                        )
-                        fig.update_layout(barmode="overlay")
-                        st.plotly_chart(fig, use_container_width=True)
+                            fig.update_yaxes(
+                                autorange="reversed",
+                                tickmode="array",
+                                tickvals=y_ticks_ui,
+                                ticktext=tick_texts_ui,
+                                title="Heure"
+                            )
+                            fig.update_layout(barmode="overlay")
+                            if df_gantt["Conflit"].any():
+                                # Phases en conflit : contour rouge épais
+                                for trace in fig.data:
+                                    sous = df_gantt[df_gantt["Phase"] == trace.name]["Conflit"].to_numpy()
+                                    trace.marker.line.color = np.where(sous, "red", "white").tolist()
+                                    trace.marker.line.width = np.where(sous, 4, 1).tolist()
+                                st.warning("⚠️ Chevauchements sur scène : " + " ; ".join(
+                                    f"{r['Artiste']} {r['Phase']} ↔ {r['Artiste 2']} {r['Phase 2']}" for _, r in conflits_g.iterrows()
+                                ))
+                            st.plotly_chart(fig, use_container_width=True)
+                        else:
+                            st.error("⚠️ La bibliothèque 'plotly' est manquante.")
                     else:
-                        st.error("⚠️ Les bibliothèques 'plotly', 'matplotlib' ou 'numpy' sont manquantes.")
+                        st.info("Aucune plage horaire valide renseignée pour cette date et cette scène.")
                 else:
-                    st.info("Aucune plage horaire valide renseignée pour cette date et cette scène.")
-            else:
-                st.info("Ajoutez des artistes et leurs horaires pour générer le planning quotidien.")
+                    st.info("Ajoutez des artistes et leurs horaires pour générer le planning quotidien.")
+
+            # --- BLOC 5 : TIMELINE FESTIVAL ---
+            with st.expander("🗺️ Timeline Festival (toutes scènes)", expanded=False):
+                if not st.session_state.planning.empty:
+                    jours_tl = get_index("planning").jours
+                    choix_tl = st.selectbox("Jour", ["Tous les jours"] + jours_tl, key="tl_jour")
+                    fig_tl = get_timeline(None if choix_tl == "Tous les jours" else choix_tl)
+                    if fig_tl is not None:
+                        st.plotly_chart(fig_tl, use_container_width=True)
+                    elif not PLOTLY_AVAILABLE:
+                        st.error("⚠️ La bibliothèque 'plotly' est manquante.")
+                    else:
+                        st.info("Aucune plage horaire renseignée.")
+                else:
+                    st.info("Ajoutez des artistes et leurs horaires pour générer la timeline.")
 
     # --- SOUS-ONGLET 2 : CONTACTS ---
     with sub_tabs_fest[1]:
-        # --- BLOC FESTIVAL ---
-        with st.expander("Contact Festival", expanded=False):
-            roles_fest_map = {"dir_tech": "Direction technique", "regie_gen": "Régie générale"}
-            df_fest_data = get_migrated_contacts(st.session_state.contacts_festival, roles_fest_map).reset_index(drop=True)
+        if main_tabs[1].open and sub_tabs_fest[1].open:
+            # --- BLOC FESTIVAL ---
+            with st.expander("Contact Festival", expanded=False):
+                roles_fest_map = {"dir_tech": "Direction technique", "regie_gen": "Régie générale"}
+                df_fest_data = get_migrated_contacts(st.session_state.contacts_festival, roles_fest_map).reset_index(drop=True)
             
-            edited_fest = st.data_editor(
-                df_fest_data,
-                use_container_width=True, hide_index=True, num_rows="dynamic",
-                column_config={
-                    "Rôle": st.column_config.TextColumn("Rôle (Saisie libre)"),
-                    "Nom": st.column_config.TextColumn("Nom"),
-                    "Prénom": st.column_config.TextColumn("Prénom"),
-                    "Tel": st.column_config.TextColumn("Tel"),
-                    "Mail": st.column_config.TextColumn("Mail"),
-                    "Canal Talkie": st.column_config.TextColumn("Canal Talkie")
-                },
-                key="fest_ed"
-            )
-            if not edited_fest.equals(df_fest_data):
-                st.session_state.contacts_festival = edited_fest
-                st.rerun()
-
-        # --- BLOC SCENES ---
-        scenes = st.session_state.planning["Scène"].unique() if not st.session_state.planning.empty else []
-        for s in scenes:
-            with st.expander(f"Contact : {s}", expanded=False):
-                roles_scene_map = {"SM": "Stage Manager", "FOH": "Regie SON FOH", "MON": "Regie SON MON", "LUM": "Regie LUM", "VID": "Regie VIDEO"}
-                df_scene_data = get_migrated_contacts(st.session_state.contacts_scenes.get(s, {}), roles_scene_map).reset_index(drop=True)
-                
-                edited_scene = st.data_editor(
-                    df_scene_data,
+                st.data_editor(
+                    df_fest_data,
                     use_container_width=True, hide_index=True, num_rows="dynamic",
                     column_config={
                         "Rôle": st.column_config.TextColumn("Rôle (Saisie libre)"),
@@ -1268,28 +920,18 @@ with main_tabs[1]:
                         "Mail": st.column_config.TextColumn("Mail"),
                         "Canal Talkie": st.column_config.TextColumn("Canal Talkie")
                     },
-                    key=f"sc_ed_{s}"
+                    key="fest_ed", on_change=editer_contacts, args=("fest_ed", "contacts_festival", None, roles_fest_map)
                 )
-                if not edited_scene.equals(df_scene_data):
-                    st.session_state.contacts_scenes[s] = edited_scene
-                    st.rerun()
-
-        st.divider()
-        st.subheader("Contact Artistes")
-        if not st.session_state.planning.empty:
-            c_j, c_s = st.columns(2)
-            j_sel = c_j.selectbox("Jour", sorted(st.session_state.planning["Jour"].dropna().astype(str).unique()), key="c_jour")
-            s_sel = c_s.selectbox("Scène", st.session_state.planning[st.session_state.planning["Jour"].astype(str) == str(j_sel)]["Scène"].dropna().astype(str).unique(), key="c_scene")
-            
-            artistes_jour = st.session_state.planning[(st.session_state.planning["Jour"].astype(str) == str(j_sel)) & (st.session_state.planning["Scène"].astype(str) == str(s_sel))]["Artiste"].unique()
-            
-            for a in artistes_jour:
-                with st.expander(f"Contact : {a}", expanded=False):
-                    roles_art_map = {"RG": "Régie générale", "RT": "Régie technique", "FOH": "Regie SON FOH", "MON": "Regie SON MON", "LUM": "Regie LUM", "VID": "Regie VIDEO"}
-                    df_art_data = get_migrated_contacts(st.session_state.contacts_artistes.get(a, {}), roles_art_map).reset_index(drop=True)
-                    
-                    edited_art = st.data_editor(
-                        df_art_data,
+
+            # --- BLOC SCENES ---
+            scenes = st.session_state.planning["Scène"].unique() if not st.session_state.planning.empty else []
+            for s in scenes:
+                with st.expander(f"Contact : {s}", expanded=False):
+                    roles_scene_map = {"SM": "Stage Manager", "FOH": "Regie SON FOH", "MON": "Regie SON MON", "LUM": "Regie LUM", "VID": "Regie VIDEO"}
+                    df_scene_data = get_migrated_contacts(st.session_state.contacts_scenes.get(s, {}), roles_scene_map).reset_index(drop=True)
+                
+                    st.data_editor(
+                        df_scene_data,
                         use_container_width=True, hide_index=True, num_rows="dynamic",
                         column_config={
                             "Rôle": st.column_config.TextColumn("Rôle (Saisie libre)"),
@@ -1299,533 +941,467 @@ with main_tabs[1]:
                             "Mail": st.column_config.TextColumn("Mail"),
                             "Canal Talkie": st.column_config.TextColumn("Canal Talkie")
                         },
-                        key=f"art_ed_{a}"
+                        key=f"sc_ed_{s}", on_change=editer_contacts, args=(f"sc_ed_{s}", "contacts_scenes", s, roles_scene_map)
                     )
-                    if not edited_art.equals(df_art_data):
-                        st.session_state.contacts_artistes[a] = edited_art
-                        st.rerun()
-        else:
-            st.info("Ajoutez des artistes dans le planning pour renseigner leurs contacts.")
+
+            st.divider()
+            st.subheader("Contact Artistes")
+            if not st.session_state.planning.empty:
+                c_j, c_s = st.columns(2)
+                idx_plan = get_index("planning")
+                j_sel = c_j.selectbox("Jour", idx_plan.jours, key="c_jour")
+                s_sel = c_s.selectbox("Scène", idx_plan.scenes_du_jour(j_sel), key="c_scene")
+            
+                artistes_jour = idx_plan.groupes(j_sel, s_sel)
+            
+                for a in artistes_jour:
+                    with st.expander(f"Contact : {a}", expanded=False):
+                        roles_art_map = {"RG": "Régie générale", "RT": "Régie technique", "FOH": "Regie SON FOH", "MON": "Regie SON MON", "LUM": "Regie LUM", "VID": "Regie VIDEO"}
+                        df_art_data = get_migrated_contacts(st.session_state.contacts_artistes.get(a, {}), roles_art_map).reset_index(drop=True)
+                    
+                        st.data_editor(
+                            df_art_data,
+                            use_container_width=True, hide_index=True, num_rows="dynamic",
+                            column_config={
+                                "Rôle": st.column_config.TextColumn("Rôle (Saisie libre)"),
+                                "Nom": st.column_config.TextColumn("Nom"),
+                                "Prénom": st.column_config.TextColumn("Prénom"),
+                                "Tel": st.column_config.TextColumn("Tel"),
+                                "Mail": st.column_config.TextColumn("Mail"),
+                                "Canal Talkie": st.column_config.TextColumn("Canal Talkie")
+                            },
+                            key=f"art_ed_{a}", on_change=editer_contacts, args=(f"art_ed_{a}", "contacts_artistes", a, roles_art_map)
+                        )
+            else:
+                st.info("Ajoutez des artistes dans le planning pour renseigner leurs contacts.")
 
 # ==========================================
 # ONGLET 3 : TECHNIQUE
 # ==========================================
 with main_tabs[2]:
-    sub_tabs_tech = st.tabs(["Saisie du matériel", "Création Patch IN", "Création Patch OUT"])
+    sub_tabs_tech = st.tabs(["Saisie du matériel", "Création Patch IN", "Création Patch OUT"], key="onglet_tech", on_change="rerun")
     
     # --- SOUS-ONGLET 1 : SAISIE MATERIEL ---
     with sub_tabs_tech[0]:
-        if not st.session_state.planning.empty:
-            f1, f2, f3 = st.columns(3)
-            with f1: sel_j = st.selectbox("📅 Jour", sorted(st.session_state.planning["Jour"].dropna().astype(str).unique()))
-            with f2:
-                scenes = st.session_state.planning[st.session_state.planning["Jour"].astype(str) == str(sel_j)]["Scène"].dropna().astype(str).unique()
-                sel_s = st.selectbox("🏗️ Scène", scenes)
-            with f3:
-                artistes = st.session_state.planning[(st.session_state.planning["Jour"].astype(str) == str(sel_j)) & (st.session_state.planning["Scène"].astype(str) == str(sel_s))]["Artiste"].unique()
-                sel_a = st.selectbox("🎸 Groupe", artistes)
+        if main_tabs[2].open and sub_tabs_tech[0].open:
+            if not st.session_state.planning.empty:
+                f1, f2, f3 = st.columns(3)
+                idx_plan = get_index("planning")
+                with f1: sel_j = st.selectbox("📅 Jour", idx_plan.jours)
+                with f2:
+                    sel_s = st.selectbox("🏗️ Scène", idx_plan.scenes_du_jour(sel_j))
+                with f3:
+                    artistes = idx_plan.groupes(sel_j, sel_s)
+                    sel_a = st.selectbox("🎸 Groupe", artistes)
                 
-                if sel_a and sel_a in st.session_state.riders_stockage:
-                    riders_groupe = list(st.session_state.riders_stockage[sel_a].keys())
-                    if riders_groupe:
-                        sel_file = st.selectbox("📂 Voir Rider(s)", ["-- Choisir un fichier --"] + riders_groupe, key=f"view_{sel_a}")
-                        if sel_file != "-- Choisir un fichier --":
-                            pdf_data = st.session_state.riders_stockage[sel_a][sel_file]
-                            st.download_button(
-                                label=f"📥 Télécharger {sel_file}",
-                                data=pdf_data,
-                                file_name=sel_file,
-                                mime="application/pdf",
-                                key=f"dl_r1_{sel_a}_{sel_file}"
-                            )
-
-            if sel_a:
-                st.divider()
+                    if sel_a and sel_a in st.session_state.riders_stockage:
+                        riders_groupe = list(st.session_state.riders_stockage[sel_a].keys())
+                        if riders_groupe:
+                            sel_file = st.selectbox("📂 Voir Rider(s)", ["-- Choisir un fichier --"] + riders_groupe, key=f"view_{sel_a}")
+                            if sel_file != "-- Choisir un fichier --":
+                                bouton_rider(sel_a, sel_file, key=f"dl_r1_{sel_a}_{sel_file}")
+
+                if sel_a:
+                    st.divider()
                 
-                with st.expander(f"⚙️ Configuration circuits et ⚡ Alimentation électrique : {sel_a}", expanded=False):
-                    col_circ, col_alim = st.columns(2)
+                    with st.expander(f"⚙️ Configuration circuits et ⚡ Alimentation électrique : {sel_a}", expanded=False):
+                        col_circ, col_alim = st.columns(2)
                     
-                    with col_circ:
-                        st.markdown(f"**⚙️ Configuration circuits**")
-                        if sel_a not in st.session_state.artist_circuits:
-                            st.session_state.artist_circuits[sel_a] = {"inputs": 0, "ear_stereo": 0, "mon_stereo": 0, "mon_mono": 0, "sides_monitors": False}
+                        with col_circ:
+                            st.markdown(f"**⚙️ Configuration circuits**")
+                            if sel_a not in st.session_state.artist_circuits:
+                                st.session_state.artist_circuits[sel_a] = {"inputs": 0, "ear_stereo": 0, "mon_stereo": 0, "mon_mono": 0, "sides_monitors": False}
                         
-                        c_circ1, c_circ2 = st.columns(2)
-                        with c_circ1:
-                            st.session_state.artist_circuits[sel_a]["inputs"] = st.number_input("Circuits d'entrées", min_value=0, value=int(st.session_state.artist_circuits[sel_a].get("inputs", 0)), key=f"in_{sel_a}")
-                            st.session_state.artist_circuits[sel_a]["mon_stereo"] = st.number_input("MONITOR // stéréo", min_value=0, value=int(st.session_state.artist_circuits[sel_a].get("mon_stereo", 0)), key=f"ms_{sel_a}")
-                        with c_circ2:
-                            st.session_state.artist_circuits[sel_a]["ear_stereo"] = st.number_input("EAR MONITOR // stéréo", min_value=0, value=int(st.session_state.artist_circuits[sel_a].get("ear_stereo", 0)), key=f"ear_{sel_a}")
-                            st.session_state.artist_circuits[sel_a]["mon_mono"] = st.number_input("MONITOR // mono", min_value=0, value=int(st.session_state.artist_circuits[sel_a].get("mon_mono", 0)), key=f"mm_{sel_a}")
+                            c_circ1, c_circ2 = st.columns(2)
+                            with c_circ1:
+                                st.session_state.artist_circuits[sel_a]["inputs"] = st.number_input("Circuits d'entrées", min_value=0, value=int(st.session_state.artist_circuits[sel_a].get("inputs", 0)), key=f"in_{sel_a}")
+                                st.session_state.artist_circuits[sel_a]["mon_stereo"] = st.number_input("MONITOR // stéréo", min_value=0, value=int(st.session_state.artist_circuits[sel_a].get("mon_stereo", 0)), key=f"ms_{sel_a}")
+                            with c_circ2:
+                                st.session_state.artist_circuits[sel_a]["ear_stereo"] = st.number_input("EAR MONITOR // stéréo", min_value=0, value=int(st.session_state.artist_circuits[sel_a].get("ear_stereo", 0)), key=f"ear_{sel_a}")
+                                st.session_state.artist_circuits[sel_a]["mon_mono"] = st.number_input("MONITOR // mono", min_value=0, value=int(st.session_state.artist_circuits[sel_a].get("mon_mono", 0)), key=f"mm_{sel_a}")
                         
-                        st.session_state.artist_circuits[sel_a]["sides_monitors"] = st.checkbox("Sides Monitors", value=bool(st.session_state.artist_circuits[sel_a].get("sides_monitors", False)), key=f"sides_{sel_a}")
-
-                    with col_alim:
-                        st.markdown(f"**⚡ Alimentation électrique**")
-                        df_alim_art = st.session_state.alim_elec[
-                            (st.session_state.alim_elec["Groupe"] == sel_a) &
-                            (st.session_state.alim_elec["Scène"].astype(str) == str(sel_s)) &
-                            (st.session_state.alim_elec["Jour"].astype(str) == str(sel_j))
-                        ].reset_index(drop=True)
-                        
-                        df_alim_sub = df_alim_art[["Format", "Métier", "Emplacement"]]
-                        
-                        edited_alim = st.data_editor(
-                            df_alim_sub,
-                            column_config={
-                                "Format": st.column_config.SelectboxColumn("Format", options=["PC16", "P17 32M", "P17 32T", "P17 63T", "P17 125T"], required=True),
-                                "Métier": st.column_config.TextColumn("Métier", required=True),
-                                "Emplacement": st.column_config.TextColumn("Emplacement", required=True)
-                            },
-                            num_rows="dynamic",
-                            use_container_width=True,
-                            hide_index=True,
-                            key=f"ed_alim_{sel_a}_{sel_s}_{sel_j}"
-                        )
+                            st.session_state.artist_circuits[sel_a]["sides_monitors"] = st.checkbox("Sides Monitors", value=bool(st.session_state.artist_circuits[sel_a].get("sides_monitors", False)), key=f"sides_{sel_a}")
+
+                        with col_alim:
+                            st.markdown(f"**⚡ Alimentation électrique**")
+                            df_alim_art = st.session_state.alim_elec.iloc[lignes_alim(sel_j, sel_s, sel_a)].reset_index(drop=True)
+                            df_alim_sub = vers_editeur(df_alim_art[["Format", "Métier", "Emplacement"]])
+                            key_alim = f"ed_alim_{sel_a}_{sel_s}_{sel_j}"
                         
-                        if not edited_alim.equals(df_alim_sub):
-                            mask_alim = (
-                                (st.session_state.alim_elec["Groupe"] == sel_a) &
-                                (st.session_state.alim_elec["Scène"].astype(str) == str(sel_s)) &
-                                (st.session_state.alim_elec["Jour"].astype(str) == str(sel_j))
+                            st.data_editor(
+                                df_alim_sub,
+                                column_config={
+                                    "Format": st.column_config.SelectboxColumn("Format", options=["PC16", "P17 32M", "P17 32T", "P17 63T", "P17 125T"], required=True),
+                                    "Métier": st.column_config.TextColumn("Métier", required=True),
+                                    "Emplacement": st.column_config.TextColumn("Emplacement", required=True)
+                                },
+                                num_rows="dynamic",
+                                use_container_width=True,
+                                hide_index=True,
+                                key=key_alim,
+                                on_change=editer_alim, args=(key_alim, sel_j, sel_s, sel_a)
                             )
-                            st.session_state.alim_elec = st.session_state.alim_elec[~mask_alim]
-                            
-                            if not edited_alim.empty:
-                                new_alim = edited_alim.copy()
-                                new_alim["Groupe"] = sel_a
-                                new_alim["Scène"] = sel_s
-                                new_alim["Jour"] = sel_j
-                                st.session_state.alim_elec = pd.concat([st.session_state.alim_elec, new_alim], ignore_index=True)
-                            st.rerun()
 
-                st.divider()
-                with st.expander(f"📝 Informations complémentaires / Matériel apporté : {sel_a}", expanded=False):
-                    note_val = st.session_state.notes_artistes.get(sel_a, "")
-                    new_note = st.text_area("Précisez ici si le groupe fournit ses micros, du câblage spécifique, etc.", value=note_val, key=f"note_area_{sel_a}")
-                    st.session_state.notes_artistes[sel_a] = new_note
-
-                st.divider()
-                with st.expander(f"📥 Saisie Matériel : {sel_a}", expanded=True):
-                    CATALOGUE = st.session_state.custom_catalog
-                    if CATALOGUE:
-                        st.write("🔍 **Recherche rapide (Catalogue)**")
-                        all_items = []
-                        for cat, marques in CATALOGUE.items():
-                            for marq, modeles in marques.items():
-                                for mod in modeles:
-                                    if not str(mod).startswith("//") and not str(mod).startswith("🔹"):
-                                        all_items.append(f"{mod} ({marq} - {cat})")
-                        
-                        c_rech, c_qte_r, c_app_r, c_btn_r = st.columns([3, 1, 1, 1])
-                        recherche = c_rech.selectbox("Modèle (Recherche)", ["-- Sélectionner --"] + sorted(all_items))
-                        qte_r = c_qte_r.number_input("Qté", 1, 500, 1, key="qte_r")
-                        app_r = c_app_r.checkbox("Artiste Apporte", key="app_r")
+                    st.divider()
+                    with st.expander(f"📝 Informations complémentaires / Matériel apporté : {sel_a}", expanded=False):
+                        note_val = st.session_state.notes_artistes.get(sel_a, "")
+                        new_note = st.text_area("Précisez ici si le groupe fournit ses micros, du câblage spécifique, etc.", value=note_val, key=f"note_area_{sel_a}")
+                        st.session_state.notes_artistes[sel_a] = new_note
+
+                    st.divider()
+                    with st.expander(f"📥 Saisie Matériel : {sel_a}", expanded=True):
+                        CATALOGUE = get_catalogue().catalogue
+                        if CATALOGUE:
+                            st.write("🔍 **Recherche rapide (Catalogue)**")
+                            index_cat = get_index_catalogue()
+                            texte_r = st.text_input("Rechercher", key="rech_txt", placeholder="Modèle, marque ou catégorie (ex. sm58, beta shure)", label_visibility="collapsed")
+                            # Seules les meilleures correspondances partent vers le navigateur
+                            ids_r = index_cat.chercher(texte_r, NB_RESULTATS_RECHERCHE)
+                            if texte_r.strip() and not ids_r:
+                                st.caption("Aucune référence ne correspond.")
+
+                            c_rech, c_qte_r, c_app_r, c_btn_r = st.columns([3, 1, 1, 1])
+                            recherche = c_rech.selectbox("Modèle (Recherche)", ids_r, format_func=index_cat.libelle, key="rech_res",
+                                                         placeholder="-- Sélectionner --", disabled=not ids_r)
+                            qte_r = c_qte_r.number_input("Qté", 1, 500, 1, key="qte_r")
+                            app_r = c_app_r.checkbox("Artiste Apporte", key="app_r")
                         
-                        if c_btn_r.button("⚡ Ajouter", use_container_width=True):
-                            if recherche != "-- Sélectionner --":
-                                mod_part = recherche.split(" (")[0]
-                                rest = recherche.split(" (")[1].replace(")", "")
-                                marq_part = rest.split(" - ")[0]
-                                cat_part = rest.split(" - ")[1]
-                                mask = (st.session_state.fiches_tech["Groupe"] == sel_a) & (st.session_state.fiches_tech["Modèle"] == mod_part) & (st.session_state.fiches_tech["Marque"] == marq_part) & (st.session_state.fiches_tech["Artiste_Apporte"] == app_r)
-                                if not st.session_state.fiches_tech[mask].empty:
-                                    st.session_state.fiches_tech.loc[mask, "Quantité"] += qte_r
-                                else:
-                                    new_item = pd.DataFrame([{"Scène": sel_s, "Jour": sel_j, "Groupe": sel_a, "Catégorie": cat_part, "Marque": marq_part, "Modèle": mod_part, "Quantité": qte_r, "Artiste_Apporte": app_r}])
-                                    st.session_state.fiches_tech = pd.concat([st.session_state.fiches_tech, new_item], ignore_index=True)
-                                st.rerun()
-                        st.divider()
+                            if c_btn_r.button("⚡ Ajouter", use_container_width=True):
+                                article_r = index_cat.fiche(recherche) if recherche else None
+                                if article_r is not None:
+                                    cat_part, marq_part, mod_part = article_r
+                                    mask = (st.session_state.fiches_tech["Groupe"] == sel_a) & (st.session_state.fiches_tech["Modèle"] == mod_part) & (st.session_state.fiches_tech["Marque"] == marq_part) & (st.session_state.fiches_tech["Artiste_Apporte"] == app_r)
+                                    if not st.session_state.fiches_tech[mask].empty:
+                                        st.session_state.fiches_tech.loc[mask, "Quantité"] += int(qte_r)
+                                    else:
+                                        new_item = pd.DataFrame([{"Scène": sel_s, "Jour": sel_j, "Groupe": sel_a, "Catégorie": cat_part, "Marque": marq_part, "Modèle": mod_part, "Quantité": qte_r, "Artiste_Apporte": app_r}])
+                                        st.session_state.fiches_tech = typer("fiches_tech", pd.concat([st.session_state.fiches_tech, new_item], ignore_index=True))
+                                    st.rerun()
+                            st.divider()
                     
-                    st.write("⚙️ **Saisie par Catégorie & Marque**")
+                        st.write("⚙️ **Saisie par Catégorie & Marque**")
                     
-                    c_cat, c_mar, c_mod, c_qte, c_app = st.columns([2, 2, 2, 1, 1])
-                    liste_categories = list(CATALOGUE.keys()) if CATALOGUE else ["-- Chargez un catalogue --"]
-                    v_cat = c_cat.selectbox("Catégorie", liste_categories)
-                    liste_marques = []
-                    if CATALOGUE and v_cat in CATALOGUE: liste_marques = list(CATALOGUE[v_cat].keys())
-                    else: liste_marques = ["-- Chargez un catalogue --"]
-                    v_mar = c_mar.selectbox("Marque", liste_marques)
-                    v_mod = ""
-                    if CATALOGUE and v_cat in CATALOGUE and v_mar in CATALOGUE[v_cat]:
-                        raw_modeles = CATALOGUE[v_cat][v_mar]
-                        display_modeles = [f"🔹 {str(m).replace('//','').strip()} 🔹" if str(m).startswith("//") else m for m in raw_modeles]
-                        v_mod = c_mod.selectbox("Modèle", display_modeles)
-                    else:
-                         v_mod = c_mod.text_input("Modèle", "")
-                    v_qte = c_qte.number_input("Qté", 1, 500, 1, key="qte_classique")
-                    v_app = c_app.checkbox("Artiste Apporte", key="app_classique")
-                    if st.button("Ajouter au Patch"):
-                        if isinstance(v_mod, str) and (v_mod.startswith("🔹") or v_mod.startswith("//")): 
-                            st.error("⛔ Impossible d'ajouter un titre de section.")
+                        c_cat, c_mar, c_mod, c_qte, c_app = st.columns([2, 2, 2, 1, 1])
+                        liste_categories = list(CATALOGUE.keys()) if CATALOGUE else ["-- Chargez un catalogue --"]
+                        v_cat = c_cat.selectbox("Catégorie", liste_categories)
+                        liste_marques = []
+                        if CATALOGUE and v_cat in CATALOGUE: liste_marques = list(CATALOGUE[v_cat].keys())
+                        else: liste_marques = ["-- Chargez un catalogue --"]
+                        v_mar = c_mar.selectbox("Marque", liste_marques)
+                        v_mod = ""
+                        if CATALOGUE and v_cat in CATALOGUE and v_mar in CATALOGUE[v_cat]:
+                            raw_modeles = CATALOGUE[v_cat][v_mar]
+                            display_modeles = [f"🔹 {str(m).replace('//','').strip()} 🔹" if str(m).startswith("//") else m for m in raw_modeles]
+                            v_mod = c_mod.selectbox("Modèle", display_modeles)
                         else:
-                            mask = (st.session_state.fiches_tech["Groupe"] == sel_a) & (st.session_state.fiches_tech["Modèle"] == v_mod) & (st.session_state.fiches_tech["Marque"] == v_mar) & (st.session_state.fiches_tech["Artiste_Apporte"] == v_app)
-                            if not st.session_state.fiches_tech[mask].empty:
-                                st.session_state.fiches_tech.loc[mask, "Quantité"] += v_qte
+                             v_mod = c_mod.text_input("Modèle", "")
+                        v_qte = c_qte.number_input("Qté", 1, 500, 1, key="qte_classique")
+                        v_app = c_app.checkbox("Artiste Apporte", key="app_classique")
+                        if st.button("Ajouter au Patch"):
+                            if isinstance(v_mod, str) and (v_mod.startswith("🔹") or v_mod.startswith("//")): 
+                                st.error("⛔ Impossible d'ajouter un titre de section.")
                             else:
-                                new_item = pd.DataFrame([{"Scène": sel_s, "Jour": sel_j, "Groupe": sel_a, "Catégorie": v_cat, "Marque": v_mar, "Modèle": v_mod, "Quantité": v_qte, "Artiste_Apporte": v_app}])
-                                st.session_state.fiches_tech = pd.concat([st.session_state.fiches_tech, new_item], ignore_index=True)
-                            st.rerun()
+                                mask = (st.session_state.fiches_tech["Groupe"] == sel_a) & (st.session_state.fiches_tech["Modèle"] == v_mod) & (st.session_state.fiches_tech["Marque"] == v_mar) & (st.session_state.fiches_tech["Artiste_Apporte"] == v_app)
+                                if not st.session_state.fiches_tech[mask].empty:
+                                    st.session_state.fiches_tech.loc[mask, "Quantité"] += int(v_qte)
+                                else:
+                                    new_item = pd.DataFrame([{"Scène": sel_s, "Jour": sel_j, "Groupe": sel_a, "Catégorie": v_cat, "Marque": v_mar, "Modèle": v_mod, "Quantité": v_qte, "Artiste_Apporte": v_app}])
+                                    st.session_state.fiches_tech = typer("fiches_tech", pd.concat([st.session_state.fiches_tech, new_item], ignore_index=True))
+                                st.rerun()
 
-                st.divider()
-                col_patch, col_besoin = st.columns(2)
-                with col_patch:
-                    st.subheader(f"📋 Items pour {sel_a}")
-                    df_patch_art = st.session_state.fiches_tech[st.session_state.fiches_tech["Groupe"] == sel_a].sort_values(by=["Catégorie", "Marque"]).reset_index(drop=True)
-                    
-                    edited_patch = st.data_editor(
-                        df_patch_art, use_container_width=True, num_rows="dynamic", key=f"ed_patch_{sel_a}", hide_index=True,
-                        column_config={"Scène": None, "Jour": None, "Groupe": None}
-                    )
+                    st.divider()
+                    col_patch, col_besoin = st.columns(2)
+                    with col_patch:
+                        st.subheader(f"📋 Items pour {sel_a}")
+                        df_patch_art = vers_editeur(st.session_state.fiches_tech.iloc[lignes_fiches(sel_a)]).reset_index(drop=True)
+                        key_fiche = f"ed_patch_{sel_a}"
                     
-                    if not edited_patch.equals(df_patch_art):
-                        mask_fiches = (st.session_state.fiches_tech["Groupe"] == sel_a)
-                        other_fiches = st.session_state.fiches_tech[~mask_fiches]
-                        
-                        if not edited_patch.empty:
-                            edited_patch["Scène"] = sel_s
-                            edited_patch["Jour"] = sel_j
-                            edited_patch["Groupe"] = sel_a
-                            
-                        st.session_state.fiches_tech = pd.concat([other_fiches, edited_patch], ignore_index=True)
-                        st.rerun()
+                        st.data_editor(
+                            df_patch_art, use_container_width=True, num_rows="dynamic", key=key_fiche, hide_index=True,
+                            column_config={"Scène": None, "Jour": None, "Groupe": None},
+                            on_change=editer_fiches, args=(key_fiche, sel_j, sel_s, sel_a)
+                        )
 
-                with col_besoin:
-                    st.subheader(f"📊 Besoin {sel_s} - {sel_j}")
-                    plan_trié = st.session_state.planning[(st.session_state.planning["Jour"].astype(str) == str(sel_j)) & (st.session_state.planning["Scène"].astype(str) == str(sel_s))]
-                    liste_art = plan_trié["Artiste"].tolist()
-                    df_b = st.session_state.fiches_tech[(st.session_state.fiches_tech["Scène"].astype(str) == str(sel_s)) & (st.session_state.fiches_tech["Jour"].astype(str) == str(sel_j)) & (st.session_state.fiches_tech["Artiste_Apporte"] == False)]
-                    if not df_b.empty:
-                         matrice = df_b.groupby(["Catégorie", "Marque", "Modèle", "Groupe"])["Quantité"].sum().unstack(fill_value=0)
-                         for a in liste_art: 
-                             if a not in matrice.columns: matrice[a] = 0
-                         matrice = matrice[liste_art]
-                         res = pd.concat([matrice.iloc[:, i] + matrice.iloc[:, i+1] for i in range(len(liste_art)-1)], axis=1).max(axis=1) if len(liste_art) > 1 else matrice.iloc[:, 0]
-                         df_res = res.reset_index()
-                         df_res.columns = list(df_res.columns[:-1]) + ["Total"]
-                         st.dataframe(df_res, use_container_width=True, hide_index=True)
+                    with col_besoin:
+                        st.subheader(f"📊 Besoin {sel_s} - {sel_j}")
+                        df_res = get_besoins_cache().pics(sel_j, sel_s)
+                        if not df_res.empty:
+                             st.dataframe(df_res, use_container_width=True, hide_index=True)
 
     # --- SOUS-ONGLET 2 : CREATION PATCH IN ---
     with sub_tabs_tech[1]:
-        st.subheader("📋 Patch IN")
+        if main_tabs[2].open and sub_tabs_tech[1].open:
+            st.subheader("📋 Patch IN")
         
-        if not st.session_state.planning.empty:
-            f1_p, f2_p, f3_p = st.columns(3)
-            with f1_p: sel_j_p = st.selectbox("📅 Jour ", sorted(st.session_state.planning["Jour"].dropna().astype(str).unique()), key="jour_patch")
-            with f2_p:
-                scenes_p = st.session_state.planning[st.session_state.planning["Jour"].astype(str) == str(sel_j_p)]["Scène"].dropna().astype(str).unique()
-                sel_s_p = st.selectbox("🏗️ Scène ", scenes_p, key="scene_patch")
-            with f3_p:
-                artistes_p = st.session_state.planning[(st.session_state.planning["Jour"].astype(str) == str(sel_j_p)) & (st.session_state.planning["Scène"].astype(str) == str(sel_s_p))]["Artiste"].unique()
-                sel_a_p = st.selectbox("🎸 Groupe ", artistes_p, key="art_patch")
-
-                if sel_a_p and sel_a_p in st.session_state.riders_stockage:
-                    riders_groupe_p = list(st.session_state.riders_stockage[sel_a_p].keys())
-                    if riders_groupe_p:
-                        sel_file_p = st.selectbox("📂 Voir Rider(s)", ["-- Choisir un fichier --"] + riders_groupe_p, key=f"view_p_{sel_a_p}")
-                        if sel_file_p != "-- Choisir un fichier --":
-                            pdf_data_p = st.session_state.riders_stockage[sel_a_p][sel_file_p]
-                            st.download_button(
-                                label=f"📥 Télécharger {sel_file_p}",
-                                data=pdf_data_p,
-                                file_name=sel_file_p,
-                                mime="application/pdf",
-                                key=f"dl_r2_{sel_a_p}_{sel_file_p}"
-                            )
+            if not st.session_state.planning.empty:
+                f1_p, f2_p, f3_p = st.columns(3)
+                idx_plan = get_index("planning")
+                with f1_p: sel_j_p = st.selectbox("📅 Jour ", idx_plan.jours, key="jour_patch")
+                with f2_p:
+                    sel_s_p = st.selectbox("🏗️ Scène ", idx_plan.scenes_du_jour(sel_j_p), key="scene_patch")
+                with f3_p:
+                    artistes_p = idx_plan.groupes(sel_j_p, sel_s_p)
+                    sel_a_p = st.selectbox("🎸 Groupe ", artistes_p, key="art_patch")
+
+                    if sel_a_p and sel_a_p in st.session_state.riders_stockage:
+                        riders_groupe_p = list(st.session_state.riders_stockage[sel_a_p].keys())
+                        if riders_groupe_p:
+                            sel_file_p = st.selectbox("📂 Voir Rider(s)", ["-- Choisir un fichier --"] + riders_groupe_p, key=f"view_p_{sel_a_p}")
+                            if sel_file_p != "-- Choisir un fichier --":
+                                bouton_rider(sel_a_p, sel_file_p, key=f"dl_r2_{sel_a_p}_{sel_file_p}")
+
+                if sel_a_p:
+                    plan_patch = idx_plan.tranche(sel_j_p, sel_s_p)
+                    liste_art_patch = plan_patch["Artiste"].tolist()
+
+                    def get_circ(art, key): return int(st.session_state.artist_circuits.get(art, {}).get(key, 0))
+                    def get_sides(art): return bool(st.session_state.artist_circuits.get(art, {}).get("sides_monitors", False))
+
+                    # Pic de la scène sur la même fenêtre de groupes consécutifs que l'onglet Besoins
+                    fenetre_p = int(st.session_state.fenetre_besoins)
+                    max_inputs, max_ear, max_mon_s, max_mon_m = 0, 0, 0, 0
+                    if liste_art_patch:
+                        circuits_p = ["inputs", "ear_stereo", "mon_stereo", "mon_mono"]
+                        matrice_circ = np.array([[get_circ(a, c) for a in liste_art_patch] for c in circuits_p], dtype=np.int64)
+                        pics_circ = pics_fenetre(matrice_circ, [len(liste_art_patch)] * len(circuits_p), fenetre_p)
+                        max_inputs, max_ear, max_mon_s, max_mon_m = (int(v) for v in pics_circ)
+
+                    st.divider()
+                    st.subheader(f"🎛️ Besoins spécifiques au groupe : {sel_a_p}")
+                    col_grp1, col_grp2, col_grp3, col_grp4, col_grp5 = st.columns(5)
+                    with col_grp1: st.metric("Circuits Entrées", get_circ(sel_a_p, "inputs"))
+                    with col_grp2: st.metric("EAR Stéréo", get_circ(sel_a_p, "ear_stereo"))
+                    with col_grp3: st.metric("MON Stéréo", get_circ(sel_a_p, "mon_stereo"))
+                    with col_grp4: st.metric("MON Mono", get_circ(sel_a_p, "mon_mono"))
+                    with col_grp5: st.metric("SIDES Monitors", "OUI" if get_sides(sel_a_p) else "NON")
+
+                    with st.expander(f"🏗️ Infrastructure de la scène {sel_s_p} (boîtiers, MASTER patch)", expanded=False):
+                        # Sans déclaration : 9 boîtiers par format (plus si un artiste en demande davantage), MASTER 40/60
+                        infra_s = infrastructure(st.session_state.infra_scenes, sel_s_p)
+                        infra_aff = {m: nb_boitiers(st.session_state.infra_scenes, sel_s_p, m, max_inputs) for m in ("12N", "20H")}
+                        infra_aff["masters"] = sorted(int(t) for t in infra_s["masters"])
+                        c_inf1, c_inf2, c_inf3 = st.columns(3)
+                        n_12n = c_inf1.number_input("Boîtiers B12M/F (12N)", 0, 99, infra_aff["12N"], key=f"infra_12N_{sel_s_p}")
+                        n_20h = c_inf2.number_input("Boîtiers B20 (20H)", 0, 99, infra_aff["20H"], key=f"infra_20H_{sel_s_p}")
+                        masters = c_inf3.multiselect("MASTER patch (entrées)", sorted(set(TAILLES_MASTER) | set(infra_aff["masters"])), default=infra_aff["masters"], key=f"infra_master_{sel_s_p}")
+                        nouvelle_infra = {"12N": int(n_12n), "20H": int(n_20h), "masters": sorted(int(t) for t in masters)}
+                        if nouvelle_infra != infra_aff:
+                            st.session_state.infra_scenes[sel_s_p] = nouvelle_infra
+                            st.rerun()
+                        st.caption(f"Besoin maximal de la scène (fenêtre de {fenetre_p} artiste(s) consécutif(s)) : {max_inputs} entrées.")
 
-            if sel_a_p:
-                plan_patch = st.session_state.planning[(st.session_state.planning["Jour"].astype(str) == str(sel_j_p)) & (st.session_state.planning["Scène"].astype(str) == str(sel_s_p))]
-                liste_art_patch = plan_patch["Artiste"].tolist()
-
-                def get_circ(art, key): return int(st.session_state.artist_circuits.get(art, {}).get(key, 0))
-                def get_sides(art): return bool(st.session_state.artist_circuits.get(art, {}).get("sides_monitors", False))
-
-                max_inputs, max_ear, max_mon_s, max_mon_m = 0, 0, 0, 0
-
-                if len(liste_art_patch) == 1:
-                    a1 = liste_art_patch[0]
-                    max_inputs = get_circ(a1, "inputs")
-                    max_ear = get_circ(a1, "ear_stereo")
-                    max_mon_s = get_circ(a1, "mon_stereo")
-                    max_mon_m = get_circ(a1, "mon_mono")
-                elif len(liste_art_patch) > 1:
-                    for i in range(len(liste_art_patch) - 1):
-                        a1, a2 = liste_art_patch[i], liste_art_patch[i+1]
-                        max_inputs = max(max_inputs, get_circ(a1, "inputs") + get_circ(a2, "inputs"))
-                        max_ear = max(max_ear, get_circ(a1, "ear_stereo") + get_circ(a2, "ear_stereo"))
-                        max_mon_s = max(max_mon_s, get_circ(a1, "mon_stereo") + get_circ(a2, "mon_stereo"))
-                        max_mon_m = max(max_mon_m, get_circ(a1, "mon_mono") + get_circ(a2, "mon_mono"))
-
-                st.divider()
-                st.subheader(f"🎛️ Besoins spécifiques au groupe : {sel_a_p}")
-                col_grp1, col_grp2, col_grp3, col_grp4, col_grp5 = st.columns(5)
-                with col_grp1: st.metric("Circuits Entrées", get_circ(sel_a_p, "inputs"))
-                with col_grp2: st.metric("EAR Stéréo", get_circ(sel_a_p, "ear_stereo"))
-                with col_grp3: st.metric("MON Stéréo", get_circ(sel_a_p, "mon_stereo"))
-                with col_grp4: st.metric("MON Mono", get_circ(sel_a_p, "mon_mono"))
-                with col_grp5: st.metric("SIDES Monitors", "OUI" if get_sides(sel_a_p) else "NON")
-
-                st.divider()
-                nb_inputs_groupe = get_circ(sel_a_p, "inputs")
+                    st.divider()
+                    nb_inputs_groupe = get_circ(sel_a_p, "inputs")
                 
-                if nb_inputs_groupe > 0:
-                    col_mode1, col_mode2 = st.columns([1, 3])
-                    with col_mode1: mode_patch = st.radio("Saisie :", ["PATCH 12N", "PATCH 20H"], horizontal=True)
+                    if nb_inputs_groupe > 0:
+                        col_mode1, col_mode2 = st.columns([1, 3])
+                        with col_mode1: mode_patch = st.radio("Saisie :", ["PATCH 12N", "PATCH 20H"], horizontal=True)
+                        mode_key = "12N" if mode_patch == "PATCH 12N" else "20H"
+                        step, prefix_box = FORMATS_PATCH[mode_key]
+                        num_tabs = (nb_inputs_groupe // step) + (1 if nb_inputs_groupe % step > 0 else 0)
+
+                        if sel_a_p not in st.session_state.patches_io: st.session_state.patches_io[sel_a_p] = {"12N": None, "20H": None, "nb_inputs": 0}
+                        curr_state = st.session_state.patches_io[sel_a_p]
                     
-                    step = 12 if mode_patch == "PATCH 12N" else 20
-                    prefix_box = "B12M/F" if mode_patch == "PATCH 12N" else "B20"
-                    num_tabs = (nb_inputs_groupe // step) + (1 if nb_inputs_groupe % step > 0 else 0)
+                        if curr_state["nb_inputs"] != nb_inputs_groupe:
+                            curr_state["12N"], curr_state["20H"] = None, None
+                            curr_state["nb_inputs"] = nb_inputs_groupe
 
-                    if sel_a_p not in st.session_state.patches_io: st.session_state.patches_io[sel_a_p] = {"12N": None, "20H": None, "nb_inputs": 0}
-                    curr_state = st.session_state.patches_io[sel_a_p]
-                    
-                    if curr_state["nb_inputs"] != nb_inputs_groupe:
-                        curr_state["12N"], curr_state["20H"] = None, None
-                        curr_state["nb_inputs"] = nb_inputs_groupe
-                        
-                    mode_key = "12N" if mode_patch == "PATCH 12N" else "20H"
-
-                    color_map = {1: "🟤", 2: "🔴", 3: "🟠", 4: "🟡", 5: "🟢", 6: "🔵", 7: "🟣", 8: "⚪", 9: "🍏"}
-                    def clean_input(val):
-                        if pd.isna(val) or not isinstance(val, str): return val
-                        res = val
-                        for e in color_map.values(): res = res.replace(f" {e}", "").replace(e, "").strip()
-                        return res
-
-                    if curr_state.get(mode_key + "_src") is None:
-                        if curr_state.get(mode_key) is not None:
-                            curr_state[mode_key + "_src"] = {k: v.copy() for k, v in curr_state[mode_key].items()}
-                            for t_name, df in curr_state[mode_key + "_src"].items():
-                                if "Input" in df.columns:
-                                    df["Input"] = df["Input"].apply(lambda x: clean_input(x) if pd.notna(x) else x)
-                        else:
+                        infra_p = infrastructure(st.session_state.infra_scenes, sel_s_p)
+                        taille_m = taille_master(infra_p, max_inputs) if mode_key == "20H" else None
+
+                        # Une table canonique par tableau (n° de boîtier / d'input) ; libellés et couleurs calculés à l'affichage
+                        if curr_state.get(mode_key) is None:
                             tables = {}
-                            if mode_patch == "PATCH 20H" and max_inputs <= 60:
-                                tables["MASTER"] = pd.DataFrame({
-                                    "Input": [None]*nb_inputs_groupe, "Micro / DI": [None]*nb_inputs_groupe,
-                                    "Source": [""]*nb_inputs_groupe, "Stand": [None]*nb_inputs_groupe, "48V": [False]*nb_inputs_groupe
-                                })
+                            if taille_m is not None:
+                                tables["MASTER"] = table_patch_vide(nb_inputs_groupe, boitiers=False)
                             for i in range(1, num_tabs + 1):
-                                tables[f"DEPART_{i}"] = pd.DataFrame({
-                                    "Boîtier": [None]*step, "Input": [None]*step, "Micro / DI": [None]*step,
-                                    "Source": [""]*step, "Stand": [None]*step, "48V": [False]*step
-                                })
-                            curr_state[mode_key + "_src"] = tables
-                            curr_state[mode_key] = {k: v.copy() for k, v in tables.items()}
-
-                    tables_src = curr_state[mode_key + "_src"]
-                    tables_out = curr_state[mode_key]
-
-                    df_mat = st.session_state.fiches_tech[st.session_state.fiches_tech["Groupe"] == sel_a_p]
-                    excl_micros = ["EAR MONITOR", "PIEDS MICROS", "MONITOR", "PRATICABLE & CADRE ROULETTE", "REGIE", "MULTI"]
-                    
-                    micros_instances = []
-                    df_micros = df_mat[~df_mat["Catégorie"].isin(excl_micros)]
-                    for _, row in df_micros.iterrows():
-                        qty = int(row["Quantité"])
-                        for i in range(1, qty + 1): micros_instances.append(f"{row['Modèle']} #{i}")
-                    
-                    liste_micros = [None] + sorted(micros_instances)
-                    liste_stands = [None] + df_mat[df_mat["Catégorie"] == "PIEDS MICROS"]["Modèle"].unique().tolist()
-                    all_boxes = [None] + [f"{prefix_box} {j} {color_map[j]}" for j in range(1, 10)]
-
-                    used_inputs_master = set(tables_src["MASTER"]["Input"].dropna().tolist()) if "MASTER" in tables_src else set()
-                    used_inputs_departs, used_boxes_departs = {}, {}
-                    used_micros_all = set()
-                    
-                    if "MASTER" in tables_src: used_micros_all.update(tables_src["MASTER"]["Micro / DI"].dropna().tolist())
-                    
-                    for i in range(1, num_tabs + 1):
-                        t_name = f"DEPART_{i}"
-                        used_inputs_departs[t_name] = set(clean_input(x) for x in tables_src[t_name]["Input"].dropna().tolist())
-                        used_boxes_departs[t_name] = set(tables_src[t_name]["Boîtier"].dropna().tolist())
-                        used_micros_all.update(tables_src[t_name]["Micro / DI"].dropna().tolist())
-
-                    if "MASTER" in tables_src:
-                        label_master = "MASTER PATCH 40" if max_inputs <= 40 else "MASTER PATCH 60"
-                        st.subheader(f"🛠️ {label_master}")
-                        
-                        all_master_inputs = [f"INPUT {j}" for j in range(1, nb_inputs_groupe + 1)]
-                        used_in_any_depart = set().union(*used_inputs_departs.values()) if used_inputs_departs else set()
-                        avail_master_inputs = [None] + [x for x in all_master_inputs if x not in used_in_any_depart]
-                        
-                        current_micros_master = tables_src["MASTER"]["Micro / DI"].dropna().tolist()
-                        avail_micros_master = [m for m in liste_micros if m not in used_micros_all or m in current_micros_master]
-
-                        with st.expander(f"{label_master} ({nb_inputs_groupe} Lignes limitées par max circuits entrées)", expanded=True):
-                            df_master_in = tables_src["MASTER"].reset_index(drop=True)
-                            edited_master = st.data_editor(
-                                df_master_in,
-                                column_config={
-                                    "Input": st.column_config.SelectboxColumn("Input", options=avail_master_inputs),
-                                    "Micro / DI": st.column_config.SelectboxColumn("Micro / DI", options=avail_micros_master),
-                                    "Stand": st.column_config.SelectboxColumn("Stand", options=liste_stands),
-                                    "48V": st.column_config.CheckboxColumn("48V")
-                                },
-                                hide_index=True, use_container_width=True, key=f"ed_master_{mode_key}_{sel_a_p}"
-                            )
-                            if not edited_master.equals(df_master_in):
-                                tables_src["MASTER"] = edited_master.copy()
-                                tables_out["MASTER"] = edited_master.copy()
-                                st.rerun()
+                                tables[f"DEPART_{i}"] = table_patch_vide(step)
+                            curr_state[mode_key] = tables
+                        tables_patch = curr_state[mode_key]
+
+                        # Réserves d'inputs, micros, pieds et boîtiers : relues en entier seulement si la fiche
+                        # matériel ou les tables ont changé hors de cet onglet (restauration, nouveau format)
+                        df_mat = st.session_state.fiches_tech[st.session_state.fiches_tech["Groupe"] == sel_a_p]
+                        nb_boxes = nb_boitiers(st.session_state.infra_scenes, sel_s_p, mode_key, max_inputs)
+                        alloc = st.session_state.allocateurs_patch.get((sel_a_p, mode_key))
+                        if alloc is None or alloc.signature != signature_patch(df_mat, nb_inputs_groupe, step, nb_boxes) or not alloc.a_jour(tables_patch):
+                            alloc = PatchAllocator.depuis_fiche(df_mat, nb_inputs_groupe, step, nb_boxes).charger(tables_patch)
+                            st.session_state.allocateurs_patch[(sel_a_p, mode_key)] = alloc
+
+                        # Patch automatique : micros / DI de la fiche dans l'ordre, boîtiers et couleurs dans l'ordre
+                        c_auto1, c_auto2 = st.columns([1, 3])
+                        cible_auto = "DEPART"
+                        if "MASTER" in tables_patch:
+                            cible_auto = c_auto2.radio("Patcher dans", ["DEPART", "MASTER"], horizontal=True, key=f"cible_auto_{mode_key}_{sel_a_p}",
+                                                       format_func=lambda c: "Boîtiers (DEPART)" if c == "DEPART" else "MASTER")
+                        nb_sources = len(alloc.reserves["micros"].libelles)
+                        if nb_sources > nb_inputs_groupe:
+                            c_auto2.warning(f"⚠️ {nb_sources} micros / DI dans la fiche pour {nb_inputs_groupe} inputs : les derniers ne seront pas patchés.")
+                        if c_auto1.button("⚡ Patch automatique", key=f"auto_{mode_key}_{sel_a_p}", help=f"Remplace le {mode_patch} actuel à partir de la fiche matériel"):
+                            curr_state[mode_key] = patch_automatique(df_mat, nb_inputs_groupe, step, nb_boxes, len(tables_patch["MASTER"]) if "MASTER" in tables_patch else None, cible_auto)
+                            # Les éditions en attente des tableaux ne doivent pas se réappliquer sur le nouveau patch
+                            for t_name in curr_state[mode_key]:
+                                st.session_state.pop(f"ed_master_{mode_key}_{sel_a_p}" if t_name == "MASTER" else f"ed_{t_name}_{mode_key}_{sel_a_p}", None)
+                            st.rerun()
 
-                    for i in range(1, num_tabs + 1):
-                        t_name = f"DEPART_{i}"
-                        start_idx = (i-1)*step + 1
-                        end_idx = min(i*step, nb_inputs_groupe)
+                        col_input = lambda options: st.column_config.SelectboxColumn("Input", options=options, format_func=libelle_input)
+                        if "MASTER" in tables_patch:
+                            label_master = f"MASTER PATCH {taille_m}" if taille_m else "MASTER PATCH"
+                            st.subheader(f"🛠️ {label_master}")
                         
-                        st.subheader(f"📤 DEPART {i} ({start_idx} --> {end_idx})")
+                            with st.expander(f"{label_master} ({nb_inputs_groupe} Lignes limitées par max circuits entrées)", expanded=True):
+                                df_master_in = tables_patch["MASTER"]
+                                key_master = f"ed_master_{mode_key}_{sel_a_p}"
+                                st.data_editor(
+                                    df_master_in,
+                                    column_config={
+                                        "Input": col_input(alloc.options("MASTER", "Input")),
+                                        "Micro / DI": st.column_config.SelectboxColumn("Micro / DI", options=alloc.options("MASTER", "Micro / DI")),
+                                        "Stand": st.column_config.SelectboxColumn("Stand", options=alloc.options("MASTER", "Stand")),
+                                        "48V": st.column_config.CheckboxColumn("48V")
+                                    },
+                                    hide_index=True, use_container_width=True, key=key_master,
+                                    on_change=editer_patch_in, args=(key_master, sel_a_p, mode_key, "MASTER")
+                                )
+
+                        if num_tabs > nb_boxes:
+                            st.warning(f"⚠️ {num_tabs} DEPART pour {nb_boxes} boîtiers {prefix_box} déclarés sur {sel_s_p} : complétez l'infrastructure de la scène.")
+                        col_boitier = lambda options: st.column_config.SelectboxColumn("Boîtier", options=options, format_func=lambda j: libelle_boitier(prefix_box, j))
+                        for i in range(1, num_tabs + 1):
+                            t_name = f"DEPART_{i}"
+                            start_idx = (i-1)*step + 1
+                            end_idx = min(i*step, nb_inputs_groupe)
                         
-                        used_in_other_departs = set().union(*[used_boxes_departs[k] for k in used_boxes_departs if k != t_name])
-                        avail_boxes = [x for x in all_boxes if x not in used_in_other_departs]
+                            st.subheader(f"📤 DEPART {i} ({start_idx} --> {end_idx})")
                         
-                        all_depart_inputs = [f"INPUT {j}" for j in range(start_idx, i*step + 1) if j <= nb_inputs_groupe]
-                        avail_inputs_base = [x for x in all_depart_inputs if x not in used_inputs_master]
-
-                        current_inputs_in_table = [x for x in tables_src[t_name]["Input"].dropna().unique()]
-                        options_inputs = list(dict.fromkeys([None] + avail_inputs_base + current_inputs_in_table))
-                        
-                        current_micros_dep = tables_src[t_name]["Micro / DI"].dropna().tolist()
-                        avail_micros_dep = [m for m in liste_micros if m not in used_micros_all or m in current_micros_dep]
-
-                        with st.expander(f"Tableau DEPART {i}", expanded=True):
-                            df_dep_in = tables_src[t_name].reset_index(drop=True)
-                            edited_dep = st.data_editor(
-                                df_dep_in,
-                                column_config={
-                                    "Boîtier": st.column_config.SelectboxColumn("Boîtier", options=avail_boxes),
-                                    "Input": st.column_config.SelectboxColumn("Input", options=options_inputs),
-                                    "Micro / DI": st.column_config.SelectboxColumn("Micro / DI", options=avail_micros_dep),
-                                    "Stand": st.column_config.SelectboxColumn("Stand", options=liste_stands),
-                                    "48V": st.column_config.CheckboxColumn("48V")
-                                },
-                                hide_index=True, use_container_width=True, key=f"ed_{t_name}_{mode_key}_{sel_a_p}"
-                            )
-                            
-                            if not edited_dep.equals(df_dep_in):
-                                tables_src[t_name] = edited_dep.copy()
-                                tables_out[t_name] = edited_dep.copy()
-                                
-                                for idx in tables_out[t_name].index:
-                                    box_val = tables_out[t_name].at[idx, "Boîtier"]
-                                    p_val = ""
-                                    if pd.notna(box_val) and isinstance(box_val, str):
-                                        for emoji in color_map.values():
-                                            if emoji in box_val:
-                                                p_val = emoji
-                                                break
-                                                
-                                    input_val = tables_out[t_name].at[idx, "Input"]
-                                    if pd.notna(input_val) and isinstance(input_val, str):
-                                        base_input = clean_input(input_val)
-                                        tables_out[t_name].at[idx, "Input"] = f"{base_input} {p_val}" if p_val else base_input
-                                        
-                                st.rerun()
+                            with st.expander(f"Tableau DEPART {i}", expanded=True):
+                                df_dep_in = tables_patch[t_name]
+                                key_dep = f"ed_{t_name}_{mode_key}_{sel_a_p}"
+                                st.data_editor(
+                                    df_dep_in,
+                                    column_config={
+                                        "Boîtier": col_boitier(alloc.options(t_name, "Boîtier")),
+                                        "Input": col_input(alloc.options(t_name, "Input", alloc.domaine_depart(i))),
+                                        "Micro / DI": st.column_config.SelectboxColumn("Micro / DI", options=alloc.options(t_name, "Micro / DI")),
+                                        "Stand": st.column_config.SelectboxColumn("Stand", options=alloc.options(t_name, "Stand")),
+                                        "48V": st.column_config.CheckboxColumn("48V")
+                                    },
+                                    hide_index=True, use_container_width=True, key=key_dep,
+                                    on_change=editer_patch_in, args=(key_dep, sel_a_p, mode_key, t_name)
+                                )
+                    else: 
+                        st.info("ℹ️ Veuillez renseigner le nombre de circuits d'entrées de l'artiste dans 'Saisie du matériel' pour générer le Patch.")
                 else: 
-                    st.info("ℹ️ Veuillez renseigner le nombre de circuits d'entrées de l'artiste dans 'Saisie du matériel' pour générer le Patch.")
-            else: 
-                st.info("⚠️ Ajoutez d'abord des artistes dans le planning et renseignez leurs circuits pour gérer le patch.")
+                    st.info("⚠️ Ajoutez d'abord des artistes dans le planning et renseignez leurs circuits pour gérer le patch.")
 
     # --- SOUS-ONGLET 3 : CREATION PATCH OUT ---
     with sub_tabs_tech[2]:
-        st.subheader("📋 Patch OUT")
+        if main_tabs[2].open and sub_tabs_tech[2].open:
+            st.subheader("📋 Patch OUT")
         
-        if not st.session_state.planning.empty:
-            f1_o, f2_o, f3_o = st.columns(3)
-            with f1_o: sel_j_o = st.selectbox("📅 Jour", sorted(st.session_state.planning["Jour"].dropna().astype(str).unique()), key="jour_patch_out")
-            with f2_o:
-                scenes_o = st.session_state.planning[st.session_state.planning["Jour"].astype(str) == str(sel_j_o)]["Scène"].dropna().astype(str).unique()
-                sel_s_o = st.selectbox("🏗️ Scène", scenes_o, key="scene_patch_out")
-            with f3_o:
-                artistes_o = st.session_state.planning[(st.session_state.planning["Jour"].astype(str) == str(sel_j_o)) & (st.session_state.planning["Scène"].astype(str) == str(sel_s_o))]["Artiste"].unique()
-                sel_a_o = st.selectbox("🎸 Groupe", artistes_o, key="art_patch_out")
-
-                if sel_a_o and sel_a_o in st.session_state.riders_stockage:
-                    riders_groupe_o = list(st.session_state.riders_stockage[sel_a_o].keys())
-                    if riders_groupe_o:
-                        sel_file_o = st.selectbox("📂 Voir Rider(s)", ["-- Choisir un fichier --"] + riders_groupe_o, key=f"view_o_{sel_a_o}")
-                        if sel_file_o != "-- Choisir un fichier --":
-                            pdf_data_o = st.session_state.riders_stockage[sel_a_o][sel_file_o]
-                            st.download_button(
-                                label=f"📥 Télécharger {sel_file_o}",
-                                data=pdf_data_o,
-                                file_name=sel_file_o,
-                                mime="application/pdf",
-                                key=f"dl_r3_{sel_a_o}_{sel_file_o}"
-                            )
-
-            if sel_a_o:
-                def get_circ(art, key): return int(st.session_state.artist_circuits.get(art, {}).get(key, 0))
-                def get_sides(art): return bool(st.session_state.artist_circuits.get(art, {}).get("sides_monitors", False))
-
-                st.divider()
-                st.subheader(f"🎛️ Besoins spécifiques au groupe : {sel_a_o}")
-                col_grp1, col_grp2, col_grp3, col_grp4, col_grp5 = st.columns(5)
-                with col_grp1: st.metric("Circuits Entrées", get_circ(sel_a_o, "inputs"))
-                with col_grp2: st.metric("EAR Stéréo", get_circ(sel_a_o, "ear_stereo"))
-                with col_grp3: st.metric("MON Stéréo", get_circ(sel_a_o, "mon_stereo"))
-                with col_grp4: st.metric("MON Mono", get_circ(sel_a_o, "mon_mono"))
-                with col_grp5: st.metric("SIDES Monitors", "OUI" if get_sides(sel_a_o) else "NON")
-
-                st.divider()
-
-                nb_ear_st = get_circ(sel_a_o, "ear_stereo")
-                nb_mon_st = get_circ(sel_a_o, "mon_stereo")
-                nb_mon_mo = get_circ(sel_a_o, "mon_mono")
-                has_sides = get_sides(sel_a_o)
+            if not st.session_state.planning.empty:
+                f1_o, f2_o, f3_o = st.columns(3)
+                idx_plan = get_index("planning")
+                with f1_o: sel_j_o = st.selectbox("📅 Jour", idx_plan.jours, key="jour_patch_out")
+                with f2_o:
+                    sel_s_o = st.selectbox("🏗️ Scène", idx_plan.scenes_du_jour(sel_j_o), key="scene_patch_out")
+                with f3_o:
+                    artistes_o = idx_plan.groupes(sel_j_o, sel_s_o)
+                    sel_a_o = st.selectbox("🎸 Groupe", artistes_o, key="art_patch_out")
+
+                    if sel_a_o and sel_a_o in st.session_state.riders_stockage:
+                        riders_groupe_o = list(st.session_state.riders_stockage[sel_a_o].keys())
+                        if riders_groupe_o:
+                            sel_file_o = st.selectbox("📂 Voir Rider(s)", ["-- Choisir un fichier --"] + riders_groupe_o, key=f"view_o_{sel_a_o}")
+                            if sel_file_o != "-- Choisir un fichier --":
+                                bouton_rider(sel_a_o, sel_file_o, key=f"dl_r3_{sel_a_o}_{sel_file_o}")
+
+                if sel_a_o:
+                    def get_circ(art, key): return int(st.session_state.artist_circuits.get(art, {}).get(key, 0))
+                    def get_sides(art): return bool(st.session_state.artist_circuits.get(art, {}).get("sides_monitors", False))
+
+                    st.divider()
+                    st.subheader(f"🎛️ Besoins spécifiques au groupe : {sel_a_o}")
+                    col_grp1, col_grp2, col_grp3, col_grp4, col_grp5 = st.columns(5)
+                    with col_grp1: st.metric("Circuits Entrées", get_circ(sel_a_o, "inputs"))
+                    with col_grp2: st.metric("EAR Stéréo", get_circ(sel_a_o, "ear_stereo"))
+                    with col_grp3: st.metric("MON Stéréo", get_circ(sel_a_o, "mon_stereo"))
+                    with col_grp4: st.metric("MON Mono", get_circ(sel_a_o, "mon_mono"))
+                    with col_grp5: st.metric("SIDES Monitors", "OUI" if get_sides(sel_a_o) else "NON")
+
+                    st.divider()
+
+                    nb_ear_st = get_circ(sel_a_o, "ear_stereo")
+                    nb_mon_st = get_circ(sel_a_o, "mon_stereo")
+                    nb_mon_mo = get_circ(sel_a_o, "mon_mono")
+                    has_sides = get_sides(sel_a_o)
                 
-                # Formule pour les lignes du Patch OUT (Sides Monitors ajoutent 2 lignes)
-                nb_rows_out = (nb_ear_st * 2) + (nb_mon_st * 2) + nb_mon_mo + (2 if has_sides else 0)
+                    # Formule pour les lignes du Patch OUT (Sides Monitors ajoutent 2 lignes)
+                    nb_rows_out = (nb_ear_st * 2) + (nb_mon_st * 2) + nb_mon_mo + (2 if has_sides else 0)
 
-                if nb_rows_out > 0:
-                    if sel_a_o not in st.session_state.patches_out:
-                        st.session_state.patches_out[sel_a_o] = None
+                    if nb_rows_out > 0:
+                        if sel_a_o not in st.session_state.patches_out:
+                            st.session_state.patches_out[sel_a_o] = None
                     
-                    df_mat_o = st.session_state.fiches_tech[st.session_state.fiches_tech["Groupe"] == sel_a_o]
-                    gear_out_df = df_mat_o[df_mat_o["Catégorie"].isin(["MONITOR", "EAR MONITOR"])]
+                        df_mat_o = st.session_state.fiches_tech[st.session_state.fiches_tech["Groupe"] == sel_a_o]
+                        gear_out_df = df_mat_o[df_mat_o["Catégorie"].isin(["MONITOR", "EAR MONITOR"])]
                     
-                    out_instances = []
-                    for _, row in gear_out_df.iterrows():
-                        qty = int(row["Quantité"])
-                        for i in range(1, qty + 1): out_instances.append(f"{row['Modèle']} #{i}")
+                        out_instances = []
+                        for _, row in gear_out_df.iterrows():
+                            qty = int(row["Quantité"])
+                            for i in range(1, qty + 1): out_instances.append(f"{row['Modèle']} #{i}")
                     
-                    # On garde la liste pour les suggestions (Saisie libre reste en dur ici au cas où)
-                    liste_ampli_ear = [None] + sorted(out_instances) + ["-- Saisie libre 1 --", "-- Saisie libre 2 --", "-- Saisie libre 3 --", "-- Autre --"]
+                        # On garde la liste pour les suggestions (Saisie libre reste en dur ici au cas où)
+                        liste_ampli_ear = [None] + sorted(out_instances) + ["-- Saisie libre 1 --", "-- Saisie libre 2 --", "-- Saisie libre 3 --", "-- Autre --"]
                     
-                    if st.session_state.patches_out[sel_a_o] is None or len(st.session_state.patches_out[sel_a_o]) != nb_rows_out:
-                        st.session_state.patches_out[sel_a_o] = pd.DataFrame({
-                            "Mix / Aux": [""] * nb_rows_out,
-                            "Sortie Console / Stage": [""] * nb_rows_out,
-                            "Ampli / Ear": [None] * nb_rows_out,
-                            "Entrée A": [False] * nb_rows_out,
-                            "Entrée B": [False] * nb_rows_out,
-                            "Entrée C": [False] * nb_rows_out,
-                            "Entrée D": [False] * nb_rows_out,
-                            "Sortie": [""] * nb_rows_out,
-                            "Désignation": [""] * nb_rows_out
-                        })
+                        if st.session_state.patches_out[sel_a_o] is None or len(st.session_state.patches_out[sel_a_o]) != nb_rows_out:
+                            st.session_state.patches_out[sel_a_o] = pd.DataFrame({
+                                "Mix / Aux": [""] * nb_rows_out,
+                                "Sortie Console / Stage": [""] * nb_rows_out,
+                                "Ampli / Ear": [None] * nb_rows_out,
+                                "Entrée A": [False] * nb_rows_out,
+                                "Entrée B": [False] * nb_rows_out,
+                                "Entrée C": [False] * nb_rows_out,
+                                "Entrée D": [False] * nb_rows_out,
+                                "Sortie": [""] * nb_rows_out,
+                                "Désignation": [""] * nb_rows_out
+                            })
                         
-                    with st.expander(f"Tableau PATCH OUT ({nb_rows_out} lignes générées)", expanded=True):
-                        df_patch_out_in = st.session_state.patches_out[sel_a_o].reset_index(drop=True)
-                        edited_out = st.data_editor(
-                            df_patch_out_in,
-                            column_config={
-                                "Mix / Aux": st.column_config.TextColumn("Mix / Aux"),
-                                "Sortie Console / Stage": st.column_config.TextColumn("Sortie Console / Stage"),
-                                "Ampli / Ear": st.column_config.SelectboxColumn("Ampli / Ear", options=liste_ampli_ear),
-                                "Entrée A": st.column_config.CheckboxColumn("A"),
-                                "Entrée B": st.column_config.CheckboxColumn("B"),
-                                "Entrée C": st.column_config.CheckboxColumn("C"),
-                                "Entrée D": st.column_config.CheckboxColumn("D"),
-                                "Sortie": st.column_config.TextColumn("Sortie"),
-                                "Désignation": st.column_config.TextColumn("Désignation")
-                            },
-                            hide_index=True, use_container_width=True, key=f"ed_patch_out_{sel_a_o}"
-                        )
-                        if not edited_out.equals(df_patch_out_in):
-                            st.session_state.patches_out[sel_a_o] = edited_out
-                            st.rerun()
+                        with st.expander(f"Tableau PATCH OUT ({nb_rows_out} lignes générées)", expanded=True):
+                            df_patch_out_in = st.session_state.patches_out[sel_a_o].reset_index(drop=True)
+                            st.data_editor(
+                                df_patch_out_in,
+                                column_config={
+                                    "Mix / Aux": st.column_config.TextColumn("Mix / Aux"),
+                                    "Sortie Console / Stage": st.column_config.TextColumn("Sortie Console / Stage"),
+                                    "Ampli / Ear": st.column_config.SelectboxColumn("Ampli / Ear", options=liste_ampli_ear),
+                                    "Entrée A": st.column_config.CheckboxColumn("A"),
+                                    "Entrée B": st.column_config.CheckboxColumn("B"),
+                                    "Entrée C": st.column_config.CheckboxColumn("C"),
+                                    "Entrée D": st.column_config.CheckboxColumn("D"),
+                                    "Sortie": st.column_config.TextColumn("Sortie"),
+                                    "Désignation": st.column_config.TextColumn("Désignation")
+                                },
+                                hide_index=True, use_container_width=True, key=f"ed_patch_out_{sel_a_o}",
+                                on_change=editer_patch_out, args=(f"ed_patch_out_{sel_a_o}", sel_a_o)
+                            )
+                    else:
+                        st.info("ℹ️ Veuillez renseigner le nombre de circuits de retours (EAR / MON / Sides) dans 'Saisie du matériel' pour générer le Patch OUT.")
                 else:
-                    st.info("ℹ️ Veuillez renseigner le nombre de circuits de retours (EAR / MON / Sides) dans 'Saisie du matériel' pour générer le Patch OUT.")
-            else:
-                st.info("⚠️ Ajoutez d'abord des artistes dans le planning et renseignez leurs circuits.")
+                    st.info("⚠️ Ajoutez d'abord des artistes dans le planning et renseignez leurs circuits.")
+
+# --- AMÉLIORATION : POP-UP TIMER (JAVASCRIPT) ---
+# Injecté en fin de script : l'iframe ne retarde plus le premier affichage
+st.components.v1.html(
+    """
+    <script>
+    setInterval(function(){
+        alert("💾 RAPPEL : Pensez à sauvegarder votre projet dans l'onglet 'Admin' !");
+    }, 600000);
+    </script>
+    """,
+    height=0,
+    width=0
+)
+demarrage.jalon("Script complet", T0_SCRIPT)
@@ -0,0 +1,94 @@
+"""Rendu des tableaux PDF sur de gros volumes (5k-20k lignes).
+
+    python benchmarks/bench_tables.py [nb_lignes ...]
+
+Compare la préparation des cellules ligne à ligne (ancien rendu par iterrows) à la
+préparation vectorisée de regie.pdf, puis mesure le rendu complet du document.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from regie.pdf import EMOJI_COLORS, FestivalPDF, cellules_patch, cellules_tableau  # noqa: E402
+
+
+def tableau_besoins(n, rng):
+    return pd.DataFrame({
+        "Catégorie": rng.choice(["MICROS FILAIRE", "DI", "RECEPTEURS HF", "Pieds\nMicro"], n),
+        "Marque": rng.choice(["Shure", "Sennheiser", "Neumann", "Radial"], n),
+        "Modèle": rng.choice(["SM58", "e906", "KM184", "JDI", "Beta 91A"], n),
+        "Total": rng.integers(1, 12, n),
+    })
+
+
+def tableau_patch(n, rng):
+    return pd.DataFrame({
+        "Boîte": rng.choice(["🔴 B1", "🟢 B2", "🔵 B3", "⚪ B4"], n),
+        "Input": np.arange(1, n + 1),
+        "Source": rng.choice(["Kick In", "Snare Top", "Gtr Ampli", "Voix Lead"], n),
+        "Micro": rng.choice(["Beta 91A", "SM57", "e906", "KM184"], n),
+        "48V": rng.choice([True, False], n),
+        "Pied": rng.choice(["Petit", "Grand", "Clamp"], n),
+    })
+
+
+def ancien_tableau(df):
+    lignes = []
+    for _, row in df.iterrows():
+        lignes.append([str(item).replace('\n', ' ').encode('latin-1', 'replace').decode('latin-1') for item in row])
+    return lignes
+
+
+def ancien_patch(df):
+    lignes = []
+    for _, row in df.iterrows():
+        row_color = (255, 255, 255)
+        row_texts = []
+        for item in row:
+            if isinstance(item, bool): val = "[ X ]" if item else "[   ]"
+            elif str(item).strip() == "True": val = "[ X ]"
+            elif str(item).strip() == "False": val = "[   ]"
+            else: val = str(item) if pd.notna(item) else ""
+            for emoji, color in EMOJI_COLORS.items():
+                if emoji in val:
+                    row_color = color
+                    val = val.replace(emoji, "").strip()
+            row_texts.append(val.replace('\n', ' ').encode('latin-1', 'replace').decode('latin-1'))
+        lignes.append((row_color, row_texts))
+    return lignes
+
+
+def chrono(f, *args):
+    t = time.perf_counter()
+    f(*args)
+    return time.perf_counter() - t
+
+
+def rendu(dessiner, df):
+    pdf = FestivalPDF(orientation="L", unit="mm", format="A4", festival_name="Bench")
+    pdf.add_page()
+    getattr(pdf, dessiner)(df)
+    return bytes(pdf.output())
+
+
+def main(tailles):
+    rng = np.random.default_rng(0)
+    print(f"{'lignes':>7} {'tableau':>8} {'iterrows':>9} {'vecto':>8} {'rendu':>8}")
+    for n in tailles:
+        for nom, df, ancien, nouveau, dessiner in [
+            ("besoins", tableau_besoins(n, rng), ancien_tableau, cellules_tableau, "dessiner_tableau"),
+            ("patch", tableau_patch(n, rng), ancien_patch, cellules_patch, "dessiner_tableau_patch"),
+        ]:
+            t_ancien = chrono(ancien, df)
+            t_vecto = chrono(nouveau, df)
+            t_rendu = chrono(rendu, dessiner, df)
+            print(f"{n:>7} {nom:>8} {t_ancien:>8.3f}s {t_vecto:>7.3f}s {t_rendu:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [5000, 10000, 20000])
@@ -0,0 +1 @@
+# Logique métier de Regie-Festival, importable sans session Streamlit.
@@ -0,0 +1,230 @@
+import numpy as np
+import pandas as pd
+
+
+CLES_ITEM = ["Catégorie", "Marque", "Modèle"]
+COLS_BESOINS = ["Jour", "Scène"] + CLES_ITEM + ["Total"]
+
+
+# --- MOTEUR DE PICS DE BESOINS (FENETRE GLISSANTE SUR L'ORDRE DE PASSAGE) ---
+def pics_fenetre(matrice, nb_artistes, fenetre=2):
+    """Max des sommes glissantes de `fenetre` colonnes consécutives, ligne par ligne.
+
+    `matrice` est (items, positions) dans l'ordre de passage, complétée de zéros au-delà
+    de `nb_artistes[i]` ; une journée plus courte que la fenêtre somme tous ses artistes.
+    """
+    nb_items, nb_pos = matrice.shape
+    if nb_items == 0:
+        return np.zeros(0, dtype=matrice.dtype)
+    nb_artistes = np.asarray(nb_artistes, dtype=np.int64)
+    largeur = np.minimum(max(int(fenetre), 1), nb_artistes)
+
+    cumul = np.zeros((nb_items, nb_pos + 1), dtype=matrice.dtype)
+    np.cumsum(matrice, axis=1, out=cumul[:, 1:])
+    debut = np.arange(nb_pos)[None, :]
+    fin = np.minimum(debut + largeur[:, None], nb_pos)
+    sommes = np.take_along_axis(cumul, fin, axis=1) - cumul[:, :nb_pos]
+
+    valides = debut <= (nb_artistes - largeur)[:, None]
+    plancher = np.iinfo(sommes.dtype).min if sommes.dtype.kind == "i" else -np.inf
+    return np.where(valides, sommes, plancher).max(axis=1)
+
+
+def _quantites(serie):
+    q = pd.to_numeric(serie, errors="coerce").fillna(0)
+    if (q % 1 == 0).all():
+        return q.to_numpy(dtype=np.int64)
+    return q.to_numpy(dtype=np.float64)
+
+
+def _plan_positions(planning):
+    plan = pd.DataFrame({
+        "Jour": planning["Jour"].astype(str),
+        "Scène": planning["Scène"].astype(str),
+        "Groupe": planning["Artiste"],
+    })
+    return plan.assign(_pos=plan.groupby(["Jour", "Scène"], sort=False).cumcount())
+
+
+def _matrice_items(fiches, plan):
+    """Matrice (items, positions) de toutes les journées présentes dans `plan`.
+
+    Les lignes sont triées par (Jour, Scène, Catégorie, Marque, Modèle) : chaque journée
+    occupe donc un bloc contigu. Retourne (items, matrice, nb_artistes) ou None.
+    """
+    if fiches.empty or plan.empty:
+        return None
+    nb_par_jour = plan.groupby(["Jour", "Scène"], sort=False).size().rename("_nb")
+    lignes = pd.DataFrame({
+        "Jour": fiches["Jour"].astype(str),
+        "Scène": fiches["Scène"].astype(str),
+        "Catégorie": fiches["Catégorie"],
+        "Marque": fiches["Marque"],
+        "Modèle": fiches["Modèle"],
+        "Groupe": fiches["Groupe"],
+        "_q": _quantites(fiches["Quantité"]),
+    })
+    lignes = lignes.dropna(subset=CLES_ITEM)
+    # Un artiste programmé deux fois sur la même journée occupe deux positions
+    lignes = lignes.merge(plan, on=["Jour", "Scène", "Groupe"], how="inner")
+    if lignes.empty:
+        return None
+    lignes = lignes.join(nb_par_jour, on=["Jour", "Scène"])
+
+    groupes = lignes.groupby(["Jour", "Scène"] + CLES_ITEM, sort=True)
+    codes = groupes.ngroup().to_numpy()
+    items = groupes.size().index.to_frame(index=False)
+    nb_pos = int(lignes["_nb"].max())
+    matrice = np.zeros((len(items), nb_pos), dtype=lignes["_q"].dtype)
+    np.add.at(matrice, (codes, lignes["_pos"].to_numpy()), lignes["_q"].to_numpy())
+
+    nb_artistes = np.zeros(len(items), dtype=np.int64)
+    nb_artistes[codes] = lignes["_nb"].to_numpy()
+    return items, matrice, nb_artistes
+
+
+def calcul_besoins(fiches_tech, planning, fenetre=2, groupe=None):
+    """Besoins de pic pour chaque (Jour, Scène) en une passe.
+
+    Le matériel fourni par l'artiste est ignoré. L'ordre de passage est celui des lignes
+    de `planning` ; `groupe` restreint le calcul à un seul artiste.
+    Retourne un DataFrame long : Jour, Scène, Catégorie, Marque, Modèle, Total.
+    """
+    if fiches_tech.empty or planning.empty:
+        return pd.DataFrame(columns=COLS_BESOINS)
+
+    fiches = fiches_tech[~fiches_tech["Artiste_Apporte"]]
+    if groupe is not None:
+        planning = planning[planning["Artiste"] == groupe]
+        fiches = fiches[fiches["Groupe"] == groupe]
+    plan = _plan_positions(planning)
+
+    calcul = _matrice_items(fiches, plan)
+    if calcul is None:
+        return pd.DataFrame(columns=COLS_BESOINS)
+    res, matrice, nb_artistes = calcul
+    res["Total"] = pics_fenetre(matrice, nb_artistes, fenetre)
+    return res
+
+
+def besoins_jour_scene(besoins, jour, scene):
+    sel = besoins[(besoins["Jour"] == str(jour)) & (besoins["Scène"] == str(scene))]
+    return sel[CLES_ITEM + ["Total"]].reset_index(drop=True)
+
+
+def besoins_periode(besoins, scene):
+    """Maximum sur tous les jours des pics d'une scène (« Total Période »)."""
+    sel = besoins[besoins["Scène"] == str(scene)]
+    if sel.empty:
+        return pd.DataFrame(columns=CLES_ITEM + ["Max_Periode"])
+    return sel.groupby(CLES_ITEM, sort=True)["Total"].max().reset_index().rename(columns={"Total": "Max_Periode"})
+
+
+# --- CACHE INCREMENTAL PAR (JOUR, SCENE) ---
+def _signatures(fiches_tech, planning):
+    """Empreinte de chaque (Jour, Scène) : lignes matériel concernées + ordre de passage."""
+    sig = {}
+    if not planning.empty:
+        plan = _plan_positions(planning)
+        for cle, artistes in plan.groupby(["Jour", "Scène"], sort=False)["Groupe"]:
+            sig[cle] = [tuple(artistes), 0, 0]
+    if not fiches_tech.empty and sig:
+        fiches = fiches_tech[~fiches_tech["Artiste_Apporte"]]
+        if not fiches.empty:
+            cols = ["Groupe"] + CLES_ITEM + ["Quantité"]
+            h = pd.util.hash_pandas_object(fiches[cols].astype(str), index=False).to_numpy()
+            codes, cles = pd.MultiIndex.from_arrays([fiches["Jour"].astype(str), fiches["Scène"].astype(str)]).factorize()
+            # Somme modulo 2**64 des hash de lignes : insensible à l'ordre des lignes
+            sommes = np.zeros(len(cles), dtype=np.uint64)
+            np.add.at(sommes, codes, h)
+            nbs = np.bincount(codes, minlength=len(cles))
+            for cle, somme, nb in zip(cles, sommes, nbs):
+                if cle in sig:
+                    sig[cle][1:] = [int(somme), int(nb)]
+    return {cle: tuple(v) for cle, v in sig.items()}
+
+
+class BesoinsCache:
+    """Matrices item x artiste et pics par (Jour, Scène), recalculés seulement pour les journées modifiées.
+
+    `actualiser` compare l'empreinte de chaque journée à celle en cache : ajouter un item
+    pour un artiste ne recalcule que la journée (Jour, Scène) de cet artiste.
+    """
+
+    def __init__(self):
+        self.fenetre = None
+        self._journees = {}
+
+    def actualiser(self, fiches_tech, planning, fenetre=2):
+        if fenetre != self.fenetre:
+            self._journees.clear()
+            self.fenetre = fenetre
+        signatures = _signatures(fiches_tech, planning)
+        for cle in [c for c in self._journees if c not in signatures]:
+            del self._journees[cle]
+        sales = [c for c, sig in signatures.items() if self._journees.get(c, {}).get("signature") != sig]
+        if not sales:
+            return []
+
+        plan = _plan_positions(planning)
+        cles_plan = pd.MultiIndex.from_frame(plan[["Jour", "Scène"]])
+        plan = plan[cles_plan.isin(sales)]
+        fiches = fiches_tech[~fiches_tech["Artiste_Apporte"]]
+        cles_fiches = pd.MultiIndex.from_arrays([fiches["Jour"].astype(str), fiches["Scène"].astype(str)])
+        calcul = _matrice_items(fiches[cles_fiches.isin(sales)], plan)
+
+        blocs = {}
+        if calcul is not None:
+            items, matrice, nb_artistes = calcul
+            pics = pics_fenetre(matrice, nb_artistes, fenetre)
+            bornes = items.groupby(["Jour", "Scène"], sort=False).indices
+            for cle, idx in bornes.items():
+                blocs[cle] = (items.iloc[idx][CLES_ITEM].reset_index(drop=True), matrice[idx], pics[idx])
+
+        for cle in sales:
+            ordre = signatures[cle][0]
+            items, matrice, pics = blocs.get(cle, (pd.DataFrame(columns=CLES_ITEM), np.zeros((0, len(ordre)), dtype=np.int64), np.zeros(0, dtype=np.int64)))
+            self._journees[cle] = {
+                "signature": signatures[cle],
+                "ordre": list(ordre),
+                "items": items,
+                "matrice": matrice[:, :len(ordre)],
+                "pics": pics,
+            }
+        return sales
+
+    def invalider(self, jour=None, scene=None):
+        for cle in list(self._journees):
+            if (jour is None or cle[0] == str(jour)) and (scene is None or cle[1] == str(scene)):
+                del self._journees[cle]
+
+    def matrice(self, jour, scene):
+        """Quantités par item (lignes) et par artiste dans l'ordre de passage (colonnes)."""
+        j = self._journees.get((str(jour), str(scene)))
+        if j is None:
+            return pd.DataFrame()
+        mat = pd.DataFrame(j["matrice"], columns=j["ordre"])
+        return pd.concat([j["items"], mat], axis=1).set_index(CLES_ITEM)
+
+    def pics(self, jour, scene, groupe=None):
+        j = self._journees.get((str(jour), str(scene)))
+        if j is None or j["items"].empty:
+            return pd.DataFrame(columns=CLES_ITEM + ["Total"])
+        res = j["items"].copy()
+        if groupe is None:
+            res["Total"] = j["pics"]
+            return res
+        positions = [i for i, a in enumerate(j["ordre"]) if a == groupe]
+        if not positions:
+            return pd.DataFrame(columns=CLES_ITEM + ["Total"])
+        sous = j["matrice"][:, positions]
+        res["Total"] = pics_fenetre(sous, np.full(len(res), len(positions)), self.fenetre)
+        return res[sous.any(axis=1)].reset_index(drop=True)
+
+    def periode(self, scene, groupe=None):
+        """Maximum des pics journaliers en cache pour une scène (« Total Période »)."""
+        jours = [self.pics(j, s, groupe) for (j, s) in self._journees if s == str(scene)]
+        jours = [d for d in jours if not d.empty]
+        if not jours:
+            return pd.DataFrame(columns=CLES_ITEM + ["Max_Periode"])
+        return pd.concat(jours).groupby(CLES_ITEM, sort=True)["Total"].max().reset_index().rename(columns={"Total": "Max_Periode"})
@@ -0,0 +1,106 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# --- EMPREINTE DU CONTENU (CLE DE CACHE) ---
+def _maj_empreinte(h, obj):
+    if obj is None:
+        h.update(b"\x00N")
+    elif isinstance(obj, pd.DataFrame):
+        h.update(b"\x00D")
+        h.update(repr([str(c) for c in obj.columns]).encode())
+        h.update(str(len(obj)).encode())
+        if len(obj) and len(obj.columns):
+            try:
+                h.update(pd.util.hash_pandas_object(obj, index=False).values.tobytes())
+            except TypeError:
+                h.update(obj.astype(str).to_csv(index=False).encode())
+    elif isinstance(obj, pd.Series):
+        h.update(b"\x00S")
+        h.update(str(obj.name).encode())
+        try:
+            h.update(pd.util.hash_pandas_object(obj, index=False).values.tobytes())
+        except TypeError:
+            h.update(obj.astype(str).to_csv(index=False).encode())
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        h.update(b"\x00B")
+        h.update(str(len(obj)).encode())
+        h.update(bytes(obj))
+    elif isinstance(obj, dict):
+        h.update(b"\x00M")
+        for k in sorted(obj, key=str):
+            _maj_empreinte(h, k)
+            _maj_empreinte(h, obj[k])
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"\x00L")
+        for v in obj:
+            _maj_empreinte(h, v)
+    else:
+        h.update(b"\x00V")
+        h.update(repr(obj).encode())
+
+
+def empreinte(*parts):
+    """Hash stable des entrées d'un document (DataFrames, octets, dicts, scalaires)."""
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        _maj_empreinte(h, p)
+    return h.hexdigest()
+
+
+# --- CACHE LRU DES DOCUMENTS EXPORTES ---
+class ExportCache:
+    """Documents déjà générés, indexés par empreinte, évincés en LRU au-delà de max_octets."""
+
+    def __init__(self, max_octets=64 * 1024 * 1024):
+        self.max_octets = max_octets
+        self._docs = OrderedDict()
+        self._taille = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, cle):
+        with self._lock:
+            return cle in self._docs
+
+    def __len__(self):
+        with self._lock:
+            return len(self._docs)
+
+    @property
+    def taille(self):
+        return self._taille
+
+    def get(self, cle):
+        with self._lock:
+            data = self._docs.get(cle)
+            if data is not None:
+                self._docs.move_to_end(cle)
+            return data
+
+    def put(self, cle, data):
+        if data is None or len(data) > self.max_octets:
+            return
+        with self._lock:
+            ancien = self._docs.pop(cle, None)
+            if ancien is not None:
+                self._taille -= len(ancien)
+            self._docs[cle] = data
+            self._taille += len(data)
+            while self._taille > self.max_octets and self._docs:
+                _, evince = self._docs.popitem(last=False)
+                self._taille -= len(evince)
+
+    def obtenir(self, cle, construire):
+        data = self.get(cle)
+        if data is None:
+            data = construire()
+            self.put(cle, data)
+        return data
+
+    def vider(self):
+        with self._lock:
+            self._docs.clear()
+            self._taille = 0
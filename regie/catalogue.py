@@ -0,0 +1,234 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from regie.demarrage import mesure_imports
+
+
+# --- IMPORT DU CATALOGUE MATÉRIEL (EXCEL) ---
+# Une feuille par catégorie ; chaque colonne est une marque (entête) listant ses modèles, et
+# une colonne "<marque>_EASYJOB" donne, ligne à ligne, le nom de l'article EasyJob du modèle.
+# Le classeur est lu en streaming (openpyxl read-only, valeurs seules) ; chaque feuille est
+# nettoyée d'un bloc : colonnes de marques mises bout à bout, miroirs alignés sur la même
+# grille, puis regroupement par marque. Le résultat est gardé sur disque sous le SHA-256 du
+# fichier : un classeur déjà importé est rechargé sans être relu.
+SUFFIXE_EASYJOB = "_EASYJOB"
+# Changer la version invalide les imports déjà en cache (règles de nettoyage modifiées)
+VERSION_IMPORT = 1
+RACINE_CACHE = os.environ.get("REGIE_CATALOGUES_DIR", os.path.join(os.path.expanduser("~"), ".regie-festival", "catalogues"))
+
+
+def _nettoyer(valeurs):
+    """Textes nettoyés (strip) ; <NA> pour les cellules vides, blanches ou "nan"."""
+    txt = pd.Series(valeurs, dtype=object).astype("string").str.strip()
+    return txt.where(txt.ne("") & txt.str.lower().ne("nan"))
+
+
+def feuille_catalogue(entetes, lignes):
+    """(modèles par marque, article EasyJob par marque et modèle) d'une feuille.
+
+    `entetes` : première ligne de la feuille ; `lignes` : les suivantes (séquences de valeurs).
+    Sans article EasyJob renseigné, l'article est « marque modèle ». Les colonnes sans entête
+    sont ignorées ; deux colonnes de même marque sont fusionnées.
+    """
+    entetes = ["" if e is None else str(e).strip() for e in entetes]
+    grille = pd.DataFrame(list(lignes), dtype=object)
+    largeur = max(len(entetes), grille.shape[1])
+    entetes += [""] * (largeur - len(entetes))
+    # Colonne vide en dernière position : miroir des marques qui n'en ont pas
+    grille = grille.reindex(columns=range(largeur + 1)).to_numpy(dtype=object)
+
+    cols = [k for k, e in enumerate(entetes) if e and not e.endswith(SUFFIXE_EASYJOB)]
+    marques = [entetes[k] for k in cols]
+    mapping = {m: {} for m in marques}
+    if not cols or len(grille) == 0:
+        return {}, mapping
+    miroirs = {e[:-len(SUFFIXE_EASYJOB)]: k for k, e in enumerate(entetes) if e.endswith(SUFFIXE_EASYJOB)}
+    cols_miroir = [miroirs.get(m, largeur) for m in marques]
+
+    # Colonnes bout à bout (marque par marque, lignes dans l'ordre) : un seul nettoyage par feuille
+    n = len(grille)
+    marque = np.repeat(np.asarray(marques, dtype=object), n)
+    modele = _nettoyer(grille[:, cols].T.ravel())
+    article = _nettoyer(grille[:, cols_miroir].T.ravel())
+    ok = modele.notna().to_numpy()
+    marque, modele, article = marque[ok], modele[ok], article[ok]
+    article = article.fillna(pd.Series(marque, index=modele.index) + " " + modele)
+
+    catalogue = {}
+    for m, idx in pd.Series(marque).groupby(pd.Categorical(marque, categories=list(dict.fromkeys(marques))), observed=True).indices.items():
+        catalogue[m] = modele.iloc[idx].tolist()
+        mapping[m] = dict(zip(catalogue[m], article.iloc[idx].tolist()))
+    return catalogue, mapping
+
+
+def lire_feuilles(data):
+    """(nom, entêtes, lignes) de chaque feuille ; lignes lues au fil de l'eau pour les .xlsx."""
+    if data[:4] == b"PK\x03\x04":
+        with mesure_imports("openpyxl"):
+            import openpyxl
+        classeur = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        try:
+            for feuille in classeur.worksheets:
+                lignes = feuille.iter_rows(values_only=True)
+                yield feuille.title, next(lignes, ()), lignes
+        finally:
+            classeur.close()
+    else:
+        # Ancien format .xls : lu par pandas (xlrd), même nettoyage ensuite
+        for nom, df in pd.read_excel(io.BytesIO(data), sheet_name=None, header=None, dtype=object).items():
+            valeurs = df.to_numpy(dtype=object)
+            yield nom, (list(valeurs[0]) if len(valeurs) else []), valeurs[1:]
+
+
+def analyser_classeur(data):
+    """(custom_catalog, easyjob_mapping) : catégorie (feuille) -> marque -> modèles / articles EasyJob."""
+    catalogue, mapping = {}, {}
+    for nom, entetes, lignes in lire_feuilles(data):
+        catalogue[nom], mapping[nom] = feuille_catalogue(entetes, lignes)
+    return catalogue, mapping
+
+
+def importer_catalogue(data, racine=RACINE_CACHE):
+    """Comme analyser_classeur, avec un cache disque par SHA-256 du classeur ; retourne aussi
+    un booléen vrai si le résultat vient du cache."""
+    sha = hashlib.sha256(data).hexdigest()
+    chemin = os.path.join(racine, f"{sha}.v{VERSION_IMPORT}.json")
+    try:
+        with open(chemin, encoding="utf-8") as f:
+            res = json.load(f)
+        return res["catalogue"], res["mapping"], True
+    except (OSError, ValueError, KeyError):
+        pass
+    catalogue, mapping = analyser_classeur(data)
+    try:
+        os.makedirs(racine, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=racine, suffix=".part")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"catalogue": catalogue, "mapping": mapping}, f, ensure_ascii=False)
+        os.replace(tmp, chemin)
+    except OSError:
+        # Cache indisponible (disque en lecture seule...) : l'import reste valable
+        pass
+    return catalogue, mapping, False
+
+
+# --- REGISTRE PARTAGÉ (UN CATALOGUE PAR SERVEUR, VERSIONNÉ) ---
+# Une version est désignée par le SHA-256 du classeur importé (ou de son contenu pour un
+# catalogue repris d'un ancien projet) et rangée dans versions/<version>.json ; courant.json
+# désigne la version en service. Le registre est partagé par toutes les sessions du processus :
+# chaque version n'est lue et indexée qu'une fois, les projets n'enregistrent que sa référence.
+VersionCatalogue = namedtuple("VersionCatalogue", ["version", "nom", "date", "catalogue", "mapping"])
+CATALOGUE_VIDE = VersionCatalogue(None, "", None, {}, {})
+
+
+class RegistreCatalogues:
+    def __init__(self, racine=RACINE_CACHE):
+        self.racine = racine
+        self._verrou = threading.Lock()
+        self._versions = {}
+        self._index = {}
+        self._courant = (None, None)
+
+    def _chemin(self, version):
+        if len(version) != 64 or any(c not in "0123456789abcdef" for c in version):
+            raise ValueError(f"Version de catalogue invalide : {version!r}")
+        return os.path.join(self.racine, "versions", f"{version}.json")
+
+    def _ecrire(self, chemin, contenu):
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(chemin), suffix=".part")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(contenu, f, ensure_ascii=False)
+        os.replace(tmp, chemin)
+
+    def _enregistrer(self, version, nom, catalogue, mapping):
+        chemin = self._chemin(version)
+        with self._verrou:
+            if not os.path.exists(chemin):
+                self._ecrire(chemin, {"nom": nom, "date": time.time(), "catalogue": catalogue, "mapping": mapping})
+        return version
+
+    def publier(self, data, nom=""):
+        """Importe un classeur (voir importer_catalogue), le met en service et retourne sa version."""
+        catalogue, mapping, _ = importer_catalogue(data, self.racine)
+        version = self._enregistrer(hashlib.sha256(data).hexdigest(), nom, catalogue, mapping)
+        self.activer(version)
+        return version
+
+    def ajouter_contenu(self, catalogue, mapping, nom=""):
+        """Enregistre un catalogue déjà analysé (ancien projet) sans le mettre en service ; retourne sa version."""
+        empreinte = hashlib.sha256(json.dumps([catalogue, mapping], ensure_ascii=False).encode("utf-8")).hexdigest()
+        return self._enregistrer(empreinte, nom, catalogue, mapping)
+
+    def activer(self, version):
+        """Met `version` en service pour toutes les sessions (None : aucun catalogue)."""
+        if version is not None and self.version(version) is None:
+            raise ValueError(f"Version de catalogue inconnue : {version}")
+        with self._verrou:
+            self._ecrire(os.path.join(self.racine, "courant.json"), {"version": version})
+
+    def courant(self):
+        """Version en service ; courant.json n'est relu que s'il a changé (autres processus compris)."""
+        chemin = os.path.join(self.racine, "courant.json")
+        try:
+            st = os.stat(chemin)
+        except OSError:
+            return None
+        # Fichier remplacé à chaque activation (os.replace) : nouvel inode
+        cle = (st.st_ino, st.st_mtime_ns)
+        if self._courant[0] != cle:
+            try:
+                with open(chemin, encoding="utf-8") as f:
+                    self._courant = (cle, json.load(f).get("version"))
+            except (OSError, ValueError):
+                return self._courant[1]
+        return self._courant[1]
+
+    def version(self, version):
+        """VersionCatalogue de `version` (CATALOGUE_VIDE pour None), None si elle est inconnue ici."""
+        if version is None:
+            return CATALOGUE_VIDE
+        v = self._versions.get(version)
+        if v is None:
+            try:
+                with open(self._chemin(version), encoding="utf-8") as f:
+                    contenu = json.load(f)
+            except (OSError, ValueError):
+                return None
+            v = VersionCatalogue(version, contenu.get("nom", ""), contenu.get("date"), contenu["catalogue"], contenu["mapping"])
+            with self._verrou:
+                v = self._versions.setdefault(version, v)
+        return v
+
+    def index(self, version):
+        """Index de recherche (regie.recherche) d'une version, construit une fois pour toutes les sessions."""
+        from regie.recherche import IndexCatalogue
+        ix = self._index.get(version)
+        if ix is None:
+            v = self.version(version) or CATALOGUE_VIDE
+            with self._verrou:
+                ix = self._index.setdefault(version, IndexCatalogue(v.catalogue))
+        return ix
+
+    def version_projet(self, etat):
+        """Version de catalogue d'un projet normalisé (voir normaliser_etat) ; le catalogue embarqué
+        par une ancienne sauvegarde est enregistré au passage. La version peut être inconnue ici."""
+        if etat.get("custom_catalog"):
+            return self.ajouter_contenu(etat["custom_catalog"], etat.get("easyjob_mapping") or {}, "Ancien projet")
+        return etat.get("catalogue_version")
+
+    def historique(self):
+        """Versions connues, de la plus récente à la plus ancienne."""
+        dossier = os.path.join(self.racine, "versions")
+        noms = [n[:-5] for n in os.listdir(dossier) if n.endswith(".json")] if os.path.isdir(dossier) else []
+        versions = [v for v in (self.version(n) for n in noms) if v is not None]
+        return sorted(versions, key=lambda v: v.date or 0, reverse=True)
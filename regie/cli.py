@@ -0,0 +1,92 @@
+import argparse
+import datetime
+import os
+import sys
+import time
+
+from regie.besoins import BesoinsCache
+from regie.catalogue import RACINE_CACHE, RegistreCatalogues
+from regie.lot import exporter_dossier, lister_documents, nouveau_pool
+from regie.projet import ProjetArchive, charger_pickle_legacy, est_archive_projet, normaliser_etat
+
+
+# --- EXPORT EN LIGNE DE COMMANDE (SANS STREAMLIT) ---
+#   python -m regie projet.regie sortie/ [--jour J] [--scene S] [--processus N] [--date 2026-07-01T08:00]
+# Génère tous les documents d'un projet enregistré (plannings, besoins PDF + EasyJob, patchs)
+# dans un dossier, en parallèle, comme l'export groupé de l'application. Avec --date (ou
+# SOURCE_DATE_EPOCH), deux générations du même projet produisent des fichiers identiques.
+def charger_projet(chemin, pickle_autorise=False):
+    """Etat normalisé (voir normaliser_etat) d'un fichier projet ; les riders ne sont pas lus."""
+    with open(chemin, "rb") as f:
+        tete = f.read(4)
+    if est_archive_projet(tete):
+        archive = ProjetArchive(chemin)
+        try:
+            data = archive.charger(riders=False)
+        finally:
+            archive.close()
+    elif pickle_autorise:
+        with open(chemin, "rb") as f:
+            data = charger_pickle_legacy(f.read())
+    else:
+        raise ValueError("Ancien format (.pkl) : relancer avec --pickle, uniquement pour vos propres sauvegardes.")
+    return normaliser_etat(data)
+
+
+def _epoch(texte):
+    date = datetime.datetime.fromisoformat(texte)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return str(int(date.timestamp()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m regie", description="Génère tous les documents d'un projet Regie-Festival dans un dossier.")
+    parser.add_argument("projet", help="fichier projet (.regie)")
+    parser.add_argument("sortie", help="dossier de sortie (créé si besoin)")
+    parser.add_argument("--jour", help="limiter l'export à un jour")
+    parser.add_argument("--scene", help="limiter l'export à une scène")
+    parser.add_argument("--processus", type=int, default=None, help="nombre de processus de rendu (défaut : nombre de CPU)")
+    parser.add_argument("--date", type=_epoch, help="date de génération imprimée (ISO 8601, UTC par défaut) : sorties reproductibles")
+    parser.add_argument("--pickle", action="store_true", help="accepter un ancien projet .pkl (pickle exécute du code)")
+    args = parser.parse_args(argv)
+
+    if args.date:
+        # Hérité par les processus de rendu (fpdf, matplotlib et le classeur EasyJob le lisent)
+        os.environ["SOURCE_DATE_EPOCH"] = args.date
+    try:
+        etat = charger_projet(args.projet, args.pickle)
+    except (OSError, ValueError) as e:
+        print(f"Erreur lors du chargement : {e}", file=sys.stderr)
+        return 2
+
+    # Catalogue : celui embarqué par les anciennes sauvegardes, sinon la version référencée dans le registre local
+    mapping = etat["easyjob_mapping"]
+    if not mapping and etat["catalogue_version"]:
+        version = RegistreCatalogues().version(etat["catalogue_version"])
+        if version is None:
+            print(f"Catalogue {etat['catalogue_version'][:8]} absent de {RACINE_CACHE} : EasyJob sans correspondances.", file=sys.stderr)
+        else:
+            mapping = version.mapping
+
+    t0 = time.perf_counter()
+    besoins = BesoinsCache()
+    besoins.actualiser(etat["fiches_tech"], etat["planning"], int(etat["fenetre_besoins"]))
+    docs = lister_documents(etat, besoins, jour=args.jour, scene=args.scene, mapping=mapping)
+    if not docs:
+        print("Aucun document à générer.", file=sys.stderr)
+        return 0
+
+    def progression(faits, total):
+        if sys.stderr.isatty():
+            print(f"\r{faits}/{total}", end="" if faits < total else "\n", file=sys.stderr, flush=True)
+
+    pool = nouveau_pool(max(1, min(args.processus or os.cpu_count() or 1, len(docs))))
+    try:
+        erreurs = exporter_dossier(docs, args.sortie, pool=pool, progression=progression)
+    finally:
+        pool.shutdown()
+    print(f"{len(docs) - len(erreurs)}/{len(docs)} documents écrits dans {args.sortie} ({time.perf_counter() - t0:.1f} s)")
+    for erreur in erreurs:
+        print(erreur, file=sys.stderr)
+    return 1 if erreurs else 0
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+from regie.horaires import COLS_PHASES, DEBUT_JOURNEE, JOUR, minutes_vers_texte, phases_longues
+
+
+# --- DÉTECTION DES CHEVAUCHEMENTS SUR SCÈNE (BALAYAGE TRIÉ) ---
+# Chaque phase renseignée devient un intervalle [Début, Fin) en minutes. Dans chaque journée
+# (Jour, Scène), les intervalles sont triés par début : un intervalle ne chevauche que ceux qui
+# le suivent et commencent avant sa fin, trouvés par recherche dichotomique. Coût O(n log n + k)
+# pour k conflits, sans comparaison de toutes les paires.
+# L'installation off stage se fait hors plateau et n'entre pas en conflit.
+PHASES_SCENE = ["Load IN", "Inst On Stage", "Balance", "Change Over", "Show"]
+COLS_CONFLITS = ["Jour", "Scène", "Artiste", "Phase", "Début", "Fin", "Artiste 2", "Phase 2", "Début 2", "Fin 2"]
+_PAS = 4 * JOUR  # Fin < 2 jours : les clés (journée, début) de deux journées ne se recouvrent pas
+
+
+def chevauchements(groupes, debuts, fins, lignes):
+    """Paires (i, j) d'intervalles qui se chevauchent dans un même groupe, entre lignes différentes.
+
+    `groupes` (entiers), `debuts`, `fins` et `lignes` sont des tableaux de même longueur ;
+    retourne deux tableaux d'indices dans ces tableaux.
+    """
+    if len(debuts) < 2:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    groupes = np.asarray(groupes, dtype=np.int64)
+    cles = groupes * _PAS + np.asarray(debuts, dtype=np.int64)
+    ordre = np.argsort(cles, kind="stable")
+    cles_triees = cles[ordre]
+    bornes = groupes[ordre] * _PAS + np.asarray(fins, dtype=np.int64)[ordre]
+    # Suivants dans le même groupe qui commencent strictement avant la fin (bord à bord = pas de conflit)
+    fin_voisins = np.searchsorted(cles_triees, bornes, side="left")
+    rang = np.arange(len(ordre))
+    nb = np.maximum(fin_voisins - rang - 1, 0)
+    if not nb.any():
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    a = np.repeat(rang, nb)
+    decalage = np.arange(nb.sum()) - np.repeat(np.cumsum(nb) - nb, nb)
+    b = a + 1 + decalage
+    a, b = ordre[a], ordre[b]
+    lignes = np.asarray(lignes)
+    autres = lignes[a] != lignes[b]
+    return a[autres], b[autres]
+
+
+def intervalles(df, debut=DEBUT_JOURNEE):
+    """Phases occupant la scène, une ligne par intervalle (voir phases_longues)."""
+    ev = phases_longues(df, debut)
+    return ev[ev["Phase"].isin(PHASES_SCENE) & (ev["Fin"] > ev["Début"])].reset_index(drop=True)
+
+
+def _paires(ev, groupes):
+    a, b = chevauchements(groupes, ev["Début"].to_numpy(), ev["Fin"].to_numpy(), ev["_ligne"].to_numpy())
+    g, d = ev.iloc[a].reset_index(drop=True), ev.iloc[b].reset_index(drop=True)
+    return pd.DataFrame({
+        "_groupe": np.asarray(groupes)[a],
+        "_ligne": g["_ligne"].to_numpy(), "_ligne 2": d["_ligne"].to_numpy(),
+        "Artiste": g["Artiste"].to_numpy(), "Phase": g["Phase"].to_numpy(),
+        "Début": g["Début"].to_numpy(), "Fin": g["Fin"].to_numpy(),
+        "Artiste 2": d["Artiste"].to_numpy(), "Phase 2": d["Phase"].to_numpy(),
+        "Début 2": d["Début"].to_numpy(), "Fin 2": d["Fin"].to_numpy(),
+    })
+
+
+# --- CACHE INCREMENTAL PAR (JOUR, SCENE) ---
+class ConflitsCache:
+    """Conflits de chaque journée (Jour, Scène), recalculés seulement pour les journées modifiées.
+
+    L'empreinte d'une journée est la suite des hash de ses lignes (Artiste + horaires) : une
+    édition du planning ne relance le balayage que sur les journées dont une ligne a changé.
+    Les positions des lignes sont relatives à la journée et ramenées à la table à la lecture.
+    """
+
+    def __init__(self):
+        self.debut = None
+        self._journees = {}
+        self._index = None
+
+    def actualiser(self, planning, index, debut=DEBUT_JOURNEE):
+        """`index` est l'IndexJourScene de `planning` ; retourne les journées recalculées."""
+        if debut != self.debut:
+            self._journees.clear()
+            self.debut = debut
+        self._index = index
+        cles = [(j, s) for j in index.jours for s in index.scenes_du_jour(j)]
+        if planning.empty:
+            self._journees.clear()
+            return []
+        cols = [c for c in ["Artiste"] + COLS_PHASES if c in planning.columns]
+        h = pd.util.hash_pandas_object(planning[cols], index=False).to_numpy()
+        signatures = {cle: h[index.positions(*cle)].tobytes() for cle in cles}
+        for cle in [c for c in self._journees if c not in signatures]:
+            del self._journees[cle]
+        sales = [c for c in cles if self._journees.get(c, {}).get("signature") != signatures[c]]
+        if not sales:
+            return []
+
+        positions = [index.positions(*cle) for cle in sales]
+        sous = planning.iloc[np.concatenate(positions)]
+        ev = intervalles(sous, debut)
+        # Groupe de chaque intervalle = rang de sa journée dans `sales`, ligne = position locale
+        rang_ligne = np.repeat(np.arange(len(sales)), [len(p) for p in positions])
+        locale = np.concatenate([np.arange(len(p)) for p in positions])
+        lignes = ev["_ligne"].to_numpy(dtype=np.intp)
+        groupes = rang_ligne[lignes]
+        ev["_ligne"] = locale[lignes]
+        paires = _paires(ev, groupes)
+        par_groupe = paires.groupby("_groupe", sort=False).indices if not paires.empty else {}
+
+        vide = paires.iloc[0:0].drop(columns="_groupe")
+        for k, cle in enumerate(sales):
+            idx = par_groupe.get(k)
+            self._journees[cle] = {
+                "signature": signatures[cle],
+                "paires": vide if idx is None else paires.iloc[idx].drop(columns="_groupe").reset_index(drop=True),
+            }
+        return sales
+
+    def conflits(self, jour=None, scene=None):
+        """Chevauchements (minutes) d'un jour, d'une scène ou de tout le festival, avec les positions des deux lignes dans le planning."""
+        blocs = []
+        for (j, s), res in self._journees.items():
+            if res["paires"].empty or (jour is not None and j != str(jour)) or (scene is not None and s != str(scene)):
+                continue
+            pos = self._index.positions(j, s)
+            bloc = res["paires"].assign(Jour=j, Scène=s)
+            bloc["_ligne"] = pos[bloc["_ligne"].to_numpy()]
+            bloc["_ligne 2"] = pos[bloc["_ligne 2"].to_numpy()]
+            blocs.append(bloc)
+        if not blocs:
+            return pd.DataFrame(columns=COLS_CONFLITS + ["_ligne", "_ligne 2"])
+        return pd.concat(blocs, ignore_index=True)[COLS_CONFLITS + ["_ligne", "_ligne 2"]]
+
+    def par_ligne(self, jour=None, scene=None):
+        """Texte d'alerte par position de ligne du planning (les deux côtés de chaque conflit)."""
+        c = self.conflits(jour, scene)
+        if c.empty:
+            return pd.Series(dtype=object)
+        plage = lambda deb, fin: minutes_vers_texte(deb, self.debut) + "-" + minutes_vers_texte(fin, self.debut)
+        cote_a = c["Phase"] + " ↔ " + c["Artiste 2"].astype(str) + " " + c["Phase 2"] + " " + plage(c["Début 2"], c["Fin 2"])
+        cote_b = c["Phase 2"] + " ↔ " + c["Artiste"].astype(str) + " " + c["Phase"] + " " + plage(c["Début"], c["Fin"])
+        alertes = pd.Series(np.concatenate([cote_a.to_numpy(), cote_b.to_numpy()]),
+                            index=np.concatenate([c["_ligne"].to_numpy(), c["_ligne 2"].to_numpy()]))
+        return alertes.groupby(level=0).agg(" | ".join)
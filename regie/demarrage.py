@@ -0,0 +1,94 @@
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# --- RAPPORT DE DÉMARRAGE ---
+# Les bibliothèques lourdes (matplotlib, plotly, fpdf, pypdf) ne sont importées qu'au premier
+# usage. Pour savoir ce que coûte réellement un démarrage à froid, chaque import d'un module
+# pas encore chargé est chronométré (coût cumulé, sous-modules compris, attribué à l'import le
+# plus externe), ainsi que les jalons du script (premier affichage, script complet).
+# Le crochet d'import n'est en place que dans les blocs `mesure_imports` (imports du script,
+# chargeurs différés) et il est retiré à la sortie du bloc, même si un import échoue.
+# Les mesures sont propres au processus serveur : elles survivent aux reruns et aux sessions.
+# pandas n'est pas importé ici pour que son coût soit mesuré comme les autres.
+IMPORTS = {}
+JALONS = {}
+_import_original = builtins.__import__
+_local = threading.local()
+_verrou = threading.Lock()
+_blocs = 0
+
+
+def disponible(nom):
+    """Vrai si le module peut être importé, sans l'importer."""
+    try:
+        return importlib.util.find_spec(nom) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def _import_chrono(nom, globals=None, locals=None, fromlist=(), level=0):
+    if level or nom in sys.modules or getattr(_local, "profondeur", 0):
+        return _import_original(nom, globals, locals, fromlist, level)
+    _local.profondeur = 1
+    t0 = time.perf_counter()
+    try:
+        return _import_original(nom, globals, locals, fromlist, level)
+    finally:
+        _local.profondeur = 0
+        duree = time.perf_counter() - t0
+        with _verrou:
+            IMPORTS.setdefault(nom, (duree, time.time()))
+
+
+@contextmanager
+def mesure_imports(*modules):
+    """Chronomètre les imports faits dans le bloc ; sans effet si les `modules` cités sont déjà chargés.
+
+    Les blocs de plusieurs sessions peuvent se chevaucher : le crochet reste en place jusqu'à la
+    sortie du dernier.
+    """
+    global _blocs
+    if modules and all(m in sys.modules for m in modules):
+        yield
+        return
+    with _verrou:
+        _blocs += 1
+        builtins.__import__ = _import_chrono
+    try:
+        yield
+    finally:
+        with _verrou:
+            _blocs -= 1
+            if not _blocs:
+                builtins.__import__ = _import_original
+
+
+def jalon(nom, t0):
+    """Enregistre le temps écoulé depuis `t0` (perf_counter) : premier passage et dernier passage."""
+    duree = time.perf_counter() - t0
+    with _verrou:
+        premier = JALONS.get(nom, (duree, duree))[0]
+        JALONS[nom] = (premier, duree)
+
+
+def rapport_imports():
+    """Imports chronométrés, du plus coûteux au moins coûteux."""
+    import pandas as pd
+    if not IMPORTS:
+        return pd.DataFrame(columns=["Module", "Durée (s)", "Chargé à"])
+    res = pd.DataFrame([(m, d, t) for m, (d, t) in IMPORTS.items()], columns=["Module", "Durée (s)", "Chargé à"])
+    res["Durée (s)"] = res["Durée (s)"].round(3)
+    res["Chargé à"] = pd.to_datetime(res["Chargé à"], unit="s").dt.strftime("%H:%M:%S")
+    return res.sort_values("Durée (s)", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def rapport_jalons():
+    """Jalons du script : premier passage du processus (à froid) et dernier passage."""
+    import pandas as pd
+    return pd.DataFrame([(n, round(p, 3), round(d, 3)) for n, (p, d) in JALONS.items()],
+                        columns=["Jalon", "À froid (s)", "Dernier (s)"])
@@ -0,0 +1,152 @@
+import datetime
+import io
+import os
+import re
+import zipfile
+
+import pandas as pd
+
+
+# --- CONTENU DES DOCUMENTS EXPORTÉS (PATCH / BESOINS) ---
+# Fonctions pures : elles ne reçoivent que des DataFrames et des dicts, si bien qu'elles
+# tournent aussi bien dans le script Streamlit que dans un processus de l'export groupé.
+ROLES_ARTISTE = {"RG": "Régie générale", "RT": "Régie technique", "FOH": "Regie SON FOH", "MON": "Regie SON MON", "LUM": "Regie LUM", "VID": "Regie VIDEO"}
+
+
+# --- HELPER CONTACTS MIGRATION ---
+def get_migrated_contacts(contact_data, default_roles_map):
+    if isinstance(contact_data, pd.DataFrame):
+        if "Canal Talkie" not in contact_data.columns:
+            contact_data["Canal Talkie"] = ""
+        return contact_data
+    records = []
+    if isinstance(contact_data, dict) and contact_data:
+        for code, data in contact_data.items():
+            if isinstance(data, dict):
+                records.append({
+                    "Rôle": default_roles_map.get(code, code),
+                    "Nom": data.get("Nom", ""),
+                    "Prénom": data.get("Prénom", ""),
+                    "Tel": data.get("Tel", ""),
+                    "Mail": data.get("Mail", ""),
+                    "Canal Talkie": ""
+                })
+    return pd.DataFrame(records, columns=["Rôle", "Nom", "Prénom", "Tel", "Mail", "Canal Talkie"])
+
+
+def texte_contacts(contact_data):
+    c_df = get_migrated_contacts(contact_data, ROLES_ARTISTE)
+    lines = []
+    for _, row in c_df.iterrows():
+        role = str(row.get("Rôle", "")).strip()
+        nom = str(row.get("Nom", "")).strip()
+        prenom = str(row.get("Prénom", "")).strip()
+        tel = str(row.get("Tel", "")).strip()
+        mail = str(row.get("Mail", "")).strip()
+        talkie = str(row.get("Canal Talkie", "")).strip()
+
+        if nom or prenom or tel or mail or talkie:
+            parts = []
+            if prenom or nom: parts.append(f"{prenom} {nom}".strip())
+            if tel: parts.append(tel)
+            if mail: parts.append(mail)
+            if talkie: parts.append(f"Talkie: {talkie}")
+            lines.append(f"{role} : " + " - ".join(parts))
+    return "\n".join(lines)
+
+
+def tableau_circuits(c):
+    q_in, q_ear, q_ms, q_mm = c.get("inputs", 0), c.get("ear_stereo", 0), c.get("mon_stereo", 0), c.get("mon_mono", 0)
+    q_sides = c.get("sides_monitors", False)
+    return pd.DataFrame({
+        "Type de Circuit": ["Circuits d'entrées", "EAR MONITOR // Circuits stéréo", "MONITOR // circuits stéréo", "MONITOR // circuits mono", "SIDES MONITORS"],
+        "Quantité / Statut": [q_in, q_ear, q_ms, q_mm, "OUI" if q_sides else "NON"]
+    })
+
+
+def contenu_besoins(arts_scope, data_pic, col_total, fiches_apporte, alim_scene, circuits, notes, contacts, jour=None, groupe=None):
+    """Sections du PDF besoins : (infos techniques par artiste, tableaux matériel par catégorie).
+
+    `jour` restreint l'alimentation et les apports artistes à une journée ; `groupe` à un artiste.
+    """
+    # 1. PRÉPARATION DES INFOS TECHNIQUES (Par Artiste)
+    arts_infos = {}
+    for a in arts_scope:
+        arts_infos[a] = {}
+        arts_infos[a]["Contacts"] = texte_contacts(contacts.get(a))
+        arts_infos[a]["Circuits"] = tableau_circuits(circuits[a]) if a in circuits else None
+
+        df_alim_besoin = alim_scene[alim_scene["Groupe"] == a]
+        if jour is not None:
+            df_alim_besoin = df_alim_besoin[df_alim_besoin["Jour"].astype(str) == str(jour)]
+        arts_infos[a]["Alim"] = df_alim_besoin[["Format", "Métier", "Emplacement"]] if not df_alim_besoin.empty else None
+
+        arts_infos[a]["Notes"] = (notes.get(a) or "").strip()
+
+    # 2. PRÉPARATION DES BESOINS MATÉRIELS (Par Catégorie)
+    besoins_cats = {}
+    for cat in data_pic["Catégorie"].unique():
+        besoins_cats[cat] = data_pic[data_pic["Catégorie"] == cat][["Marque", "Modèle", col_total]]
+
+    # Apports artistes
+    df_apporte = fiches_apporte
+    if jour is not None: df_apporte = df_apporte[df_apporte["Jour"].astype(str) == str(jour)]
+    if groupe is not None: df_apporte = df_apporte[df_apporte["Groupe"] == groupe]
+    for art in df_apporte["Groupe"].unique():
+        items_art = df_apporte[df_apporte["Groupe"] == art][["Catégorie", "Marque", "Modèle", "Quantité"]]
+        if not items_art.empty:
+            besoins_cats[f"FOURNI PAR L'ARTISTE : {art}"] = items_art
+    return arts_infos, besoins_cats
+
+
+def contenu_patch(note, circuits, alim, patch_in=None, patch_out=None):
+    """Sections du PDF patch d'un artiste (notes, circuits, alimentation, patch IN et/ou OUT)."""
+    dico_patch = {}
+    note = (note or "").strip()
+    if note: dico_patch["--- INFORMATIONS / NOTES ---"] = note
+    if circuits is not None:
+        dico_patch["--- CONFIGURATION CIRCUITS ---"] = tableau_circuits(circuits)
+    if alim is not None and not alim.empty:
+        dico_patch["--- ALIMENTATION ELECTRIQUE ---"] = alim[["Format", "Métier", "Emplacement"]]
+    if patch_in is not None:
+        dico_patch.update(patch_in)
+    if patch_out is not None:
+        dico_patch["--- PATCH OUT ---"] = patch_out
+    return dico_patch
+
+
+# --- DATE DE GÉNÉRATION (EXPORTS REPRODUCTIBLES) ---
+def horodatage():
+    """Date imprimée sur les documents : SOURCE_DATE_EPOCH s'il est défini (heure UTC, sorties
+    identiques d'une génération à l'autre), sinon l'heure locale courante."""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch:
+        return datetime.datetime.fromtimestamp(int(epoch), datetime.timezone.utc)
+    return datetime.datetime.now().astimezone()
+
+
+def _figer_xlsx(data, date):
+    """Réécrit un classeur avec la même date partout (entrées du zip, propriétés created/modified)."""
+    stamp = date.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    date_zip = max(date.astimezone(datetime.timezone.utc).timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(data)) as src, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            contenu = src.read(info.filename)
+            if info.filename == "docProps/core.xml":
+                contenu = re.sub(rb"(<dcterms:(?:created|modified)[^>]*>)[^<]*", lambda m: m.group(1) + stamp.encode(), contenu)
+            dst.writestr(zipfile.ZipInfo(info.filename, date_time=date_zip), contenu, compress_type=zipfile.ZIP_DEFLATED)
+    return out.getvalue()
+
+
+# --- EXPORT EASYJOB (XLSX) ---
+def generer_xlsx_easyjob(data_pic, col_total, mapping):
+    """Classeur EasyJob (Quantity, Items) des besoins `data_pic` ; `mapping` catégorie -> marque -> modèle -> article EasyJob."""
+    pic = data_pic[pd.to_numeric(data_pic[col_total], errors="coerce").fillna(0) > 0]
+    defaut = (pic["Marque"].astype(str) + " " + pic["Modèle"].astype(str)).str.strip()
+    items = [mapping.get(c, {}).get(m, {}).get(mod) or d for c, m, mod, d in zip(pic["Catégorie"], pic["Marque"], pic["Modèle"], defaut)]
+    df_export = pd.DataFrame({"Quantity": pic[col_total].to_numpy(), "Items": items}, columns=["Quantity", "Items"])
+    output = io.BytesIO()
+    with pd.ExcelWriter(output) as writer:
+        df_export.to_excel(writer, index=False, sheet_name='Easyjob')
+    return _figer_xlsx(output.getvalue(), horodatage())
@@ -0,0 +1,91 @@
+import pandas as pd
+
+
+# --- ÉDITION DES TABLEAUX PAR DELTAS (DATA_EDITOR) ---
+# Un data_editor décrit ses changements par positions de lignes dans la vue affichée :
+# edited_rows {position: {colonne: valeur}}, added_rows [{colonne: valeur}], deleted_rows
+# [positions]. Ils sont reportés sur la table stockée dans le callback on_change du tableau :
+# seules les lignes touchées sont retypées et seules les colonnes qui changent sont réécrites.
+# La table retournée est un nouvel objet (copie superficielle) : les index et caches qui
+# reconnaissent une table à son identité voient le changement sans recopier la table entière.
+
+
+def delta_editeur(etat):
+    """(modifiées, ajoutées, supprimées) de l'état d'un data_editor (st.session_state[key])."""
+    etat = etat or {}
+    modifiees = {int(p): v for p, v in (etat.get("edited_rows") or {}).items() if v}
+    return modifiees, list(etat.get("added_rows") or []), sorted(int(p) for p in etat.get("deleted_rows") or [])
+
+
+def _remplacer(serie, pos, valeurs):
+    """Copie de `serie` où les positions `pos` prennent `valeurs` (catégories complétées au besoin)."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        nouvelles = [v for v in pd.unique(valeurs.dropna().astype(object)) if v not in serie.cat.categories]
+        serie = serie.cat.add_categories(nouvelles) if nouvelles else serie.copy()
+        valeurs = valeurs.to_numpy(dtype=object)
+    else:
+        serie = serie.copy()
+        valeurs = valeurs.array
+    serie.iloc[pos] = valeurs
+    return serie
+
+
+def _identiques(a, b):
+    return all(pd.isna(x) and pd.isna(y) if pd.isna(x) or pd.isna(y) else x == y for x, y in zip(a, b))
+
+
+def _vide(v):
+    return v is None or v is pd.NA or v == "" or (isinstance(v, float) and v != v)
+
+
+def appliquer_edition(df, etat, lignes=None, typage=None, fixes=None, defauts=None):
+    """Table `df` après les changements d'un data_editor (`etat` : voir delta_editeur).
+
+    `lignes` : positions dans `df` des lignes de la vue éditée (par défaut toutes, dans
+    l'ordre) ; `typage` : fonction qui remet des lignes au type de la table (typer, table_patch) ;
+    `fixes` : valeurs des colonnes absentes de la vue pour les lignes ajoutées (Scène, Jour...) ;
+    `defauts` : valeurs des colonnes laissées vides dans les lignes modifiées ou ajoutées.
+    Les lignes ajoutées entièrement vides sont ignorées.
+    """
+    modifiees, ajoutees, supprimees = delta_editeur(etat)
+    pos_df = (lambda p: p) if lignes is None else (lambda p: int(lignes[p]))
+    res = df.copy(deep=False)
+    defauts = defauts or {}
+
+    if modifiees:
+        pos = [pos_df(p) for p in modifiees]
+        avant = df.iloc[pos].reset_index(drop=True)
+        # Seules les colonnes saisies repassent en valeurs brutes : le typage des autres est immédiat
+        saisies = {c for changements in modifiees.values() for c in changements if c in df.columns} | set(defauts)
+        apres = avant.astype({c: object for c in saisies})
+        for k, changements in enumerate(modifiees.values()):
+            for col, v in changements.items():
+                if col in saisies:
+                    apres.at[k, col] = v
+        for col, v in defauts.items():
+            apres[col] = apres[col].where(~apres[col].map(_vide), v)
+        apres = typage(apres) if typage else apres
+        for col in df.columns:
+            if not _identiques(avant[col], apres[col]):
+                res[col] = _remplacer(res[col], pos, apres[col])
+
+    if supprimees:
+        res = res.drop(index=res.index[[pos_df(p) for p in supprimees]]).reset_index(drop=True)
+
+    ajoutees = [{c: v for c, v in ligne.items() if c in df.columns} for ligne in ajoutees]
+    ajoutees = [ligne for ligne in ajoutees if not all(_vide(v) for v in ligne.values())]
+    if ajoutees:
+        nouvelles = pd.DataFrame(ajoutees, columns=df.columns, dtype=object)
+        nouvelles = nouvelles.where(nouvelles.notna(), None)
+        for col, v in (fixes or {}).items():
+            nouvelles[col] = v
+        for col, v in defauts.items():
+            nouvelles[col] = nouvelles[col].where(~nouvelles[col].map(_vide), v)
+        if typage is None:
+            res = pd.concat([res, nouvelles], ignore_index=True)
+        else:
+            # Lignes typées seules, puis réunies (les catégories des deux côtés sont fusionnées)
+            nouvelles = typage(nouvelles)
+            cats = {c: object for c in res.columns if isinstance(res[c].dtype, pd.CategoricalDtype)}
+            res = typage(pd.concat([res.astype(cats), nouvelles.astype(cats)], ignore_index=True))
+    return res
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+
+# --- MODELE HORAIRE DU PLANNING (MINUTES ENTIERES) ---
+# Chaque début/fin de phase est stocké en Int16 : minutes écoulées depuis le début de la
+# journée festival (06:00 par défaut), <NA> pour « -- none -- ». Une fin antérieure au début
+# passe au lendemain (+24 h) : un show 23:30 -> 01:00 dure 90 minutes partout (grille, Gantt,
+# PDF). Le texte "HH:MM" n'est produit qu'à l'affichage et à l'export.
+NONE = "-- none --"
+JOUR = 24 * 60
+DEBUT_JOURNEE = 6 * 60
+
+PHASES = [
+    ("Load IN", "Load IN Début", "Load IN Fin", "#4a90e2"),
+    ("Inst Off Stage", "Inst Off Début", "Inst Off Fin", "#f39c12"),
+    ("Inst On Stage", "Inst On Début", "Inst On Fin", "#e67e22"),
+    ("Balance", "Balance Début", "Balance Fin", "#8e44ad"),
+    ("Change Over", "Change Over Début", "Change Over Fin", "#27ae60"),
+    ("Show", "Show Début", "Show Fin", "#e74c3c"),
+]
+COLS_PHASES = [c for _, deb, fin, _ in PHASES for c in (deb, fin)]
+COULEURS_PHASES = {nom: couleur for nom, _, _, couleur in PHASES}
+
+
+def texte_vers_minutes(serie, debut=DEBUT_JOURNEE):
+    """Colonne "HH:MM" -> minutes depuis le début de journée (Int16) ; tout autre texte donne <NA>."""
+    hm = serie.astype("string").str.extract(r"^\s*(\d{1,2}):(\d{2})\s*$")
+    h = pd.to_numeric(hm[0])
+    m = pd.to_numeric(hm[1])
+    valide = (h < 24) & (m < 60)
+    return ((h * 60 + m - debut) % JOUR).where(valide).astype("Int16")
+
+
+def minutes_vers_texte(serie, debut=DEBUT_JOURNEE, vide=NONE):
+    m = serie.astype("Int32")
+    horloge = (m + debut) % JOUR
+    texte = (horloge // 60).astype(str).str.zfill(2) + ":" + (horloge % 60).astype(str).str.zfill(2)
+    return texte.where(m.notna(), vide).astype(object)
+
+
+def minute(t_str, debut=DEBUT_JOURNEE):
+    """Version scalaire de texte_vers_minutes (formulaires) : int ou None."""
+    v = texte_vers_minutes(pd.Series([t_str]), debut).iloc[0]
+    return None if pd.isna(v) else int(v)
+
+
+def minutes(serie, debut=DEBUT_JOURNEE):
+    """Colonne de phase quelconque (minutes, textes "HH:MM" ou mélange) -> Int16."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.round().astype("Int16")
+    nombres = pd.to_numeric(serie.where(serie.map(lambda v: not isinstance(v, str))), errors="coerce")
+    return texte_vers_minutes(serie, debut).fillna(nombres.astype("Int16"))
+
+
+def normaliser_fins(df):
+    """Une fin antérieure au début de sa phase est ramenée au lendemain (en place)."""
+    for _, c_deb, c_fin, _ in PHASES:
+        if c_deb in df.columns and c_fin in df.columns:
+            avant = (df[c_fin] < df[c_deb]).fillna(False)
+            if avant.any():
+                df.loc[avant, c_fin] = df.loc[avant, c_fin] + JOUR
+    return df
+
+
+def fin_par_duree(deb, fin, dur):
+    """Début/fin en minutes d'une phase saisie : la durée complète une fin absente."""
+    if deb is not None and fin is None and dur and dur > 0:
+        fin = deb + int(dur)
+    return deb, fin
+
+
+def rebaser(df, ancien, nouveau):
+    """Change le début de journée d'un planning typé en conservant heures d'horloge et durées."""
+    df = df.copy()
+    for _, c_deb, c_fin, _ in PHASES:
+        if c_deb not in df.columns:
+            continue
+        deb = df[c_deb].astype("Int32")
+        nouveau_deb = (deb + ancien - nouveau) % JOUR
+        if c_fin in df.columns:
+            fin = df[c_fin].astype("Int32")
+            nouvelle_fin = ((fin + ancien - nouveau) % JOUR).where(deb.isna(), nouveau_deb + (fin - deb))
+            df[c_fin] = nouvelle_fin.astype("Int16")
+        df[c_deb] = nouveau_deb.astype("Int16")
+    return df
+
+
+def phases_longues(df, debut=DEBUT_JOURNEE):
+    """Une ligne par phase renseignée : Artiste, Phase, Début, Fin (minutes), Couleur, _ordre, _ligne."""
+    blocs = []
+    lignes = np.arange(len(df))
+    for k, (nom, c_deb, c_fin, couleur) in enumerate(PHASES):
+        if c_deb not in df.columns or c_fin not in df.columns:
+            continue
+        deb = minutes(df[c_deb], debut)
+        fin = minutes(df[c_fin], debut)
+        ok = (deb.notna() & fin.notna()).to_numpy()
+        if not ok.any():
+            continue
+        deb, fin = deb[ok].astype("int32").to_numpy(), fin[ok].astype("int32").to_numpy()
+        blocs.append(pd.DataFrame({
+            "Artiste": df["Artiste"].to_numpy()[ok],
+            "Phase": nom,
+            "Début": deb,
+            "Fin": np.where(fin < deb, fin + JOUR, fin),
+            "Couleur": couleur,
+            "_ordre": k,
+            "_ligne": lignes[ok],
+        }))
+    if not blocs:
+        return pd.DataFrame(columns=["Artiste", "Phase", "Début", "Fin", "Couleur", "_ordre", "_ligne"])
+    return pd.concat(blocs, ignore_index=True)
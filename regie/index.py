@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+
+# --- INDEX (JOUR, SCÈNE) DES TABLES DE LA SESSION ---
+# Les tables de la session (planning, fiches_tech, alim_elec) sont toujours remplacées par
+# un nouvel objet quand leurs lignes changent : l'index est reconstruit seulement dans ce cas
+# et sert ensuite les listes d'options et les tranches par journée sans re-parcourir les colonnes.
+_VIDE = np.zeros(0, dtype=np.intp)
+
+
+def _cles(df, col):
+    if col not in df.columns:
+        return pd.Categorical([None] * len(df))
+    return pd.Categorical(df[col].astype(str).where(df[col].notna()))
+
+
+class IndexJourScene:
+    def __init__(self, df, col_groupe="Artiste"):
+        self.source = df
+        self.taille = len(df)
+        self.col_groupe = col_groupe
+        jours = _cles(df, "Jour")
+        scenes = _cles(df, "Scène")
+        cles = pd.DataFrame({"Jour": jours, "Scène": scenes})
+
+        self._journees = {k: v for k, v in cles.groupby(["Jour", "Scène"], observed=True, sort=False).indices.items()}
+        self._par_jour = cles.groupby("Jour", observed=True, sort=False).indices
+        self._par_scene = cles.groupby("Scène", observed=True, sort=False).indices
+
+        self.jours = sorted(self._par_jour)
+        self.scenes = sorted(self._par_scene)
+        self._scenes_jour = {}
+        for j, s in self._journees:
+            self._scenes_jour.setdefault(j, []).append(s)
+        for j in self._scenes_jour:
+            self._scenes_jour[j].sort()
+        self._groupes = {}
+
+    def a_jour(self, df):
+        return self.source is df and self.taille == len(df)
+
+    def positions(self, jour=None, scene=None):
+        if jour is not None and scene is not None:
+            return self._journees.get((str(jour), str(scene)), _VIDE)
+        if jour is not None:
+            return self._par_jour.get(str(jour), _VIDE)
+        if scene is not None:
+            return self._par_scene.get(str(scene), _VIDE)
+        return np.arange(self.taille)
+
+    def tranche(self, jour=None, scene=None):
+        """Lignes d'un jour, d'une scène ou d'une journée (Jour, Scène), dans l'ordre de la table."""
+        pos = self.positions(jour, scene)
+        return self.source.iloc[pos]
+
+    def masque(self, jour=None, scene=None):
+        m = np.zeros(self.taille, dtype=bool)
+        m[self.positions(jour, scene)] = True
+        return m
+
+    def scenes_du_jour(self, jour):
+        return self._scenes_jour.get(str(jour), [])
+
+    def groupes(self, jour=None, scene=None):
+        """Artistes (ou groupes) d'une tranche, dans l'ordre de passage."""
+        cle = (None if jour is None else str(jour), None if scene is None else str(scene))
+        if cle not in self._groupes:
+            col = self.source[self.col_groupe] if self.col_groupe in self.source.columns else pd.Series(dtype=object)
+            self._groupes[cle] = list(col.iloc[self.positions(jour, scene)].unique()) if len(col) else []
+        return self._groupes[cle]
+
+
+def index_a_jour(precedent, df, col_groupe="Artiste"):
+    """Réutilise `precedent` s'il a été construit sur ce même objet `df`, sinon reconstruit."""
+    if precedent is not None and precedent.a_jour(df) and precedent.col_groupe == col_groupe:
+        return precedent
+    return IndexJourScene(df, col_groupe)
@@ -0,0 +1,63 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ModuleNotFoundError:
+    PIL_AVAILABLE = False
+
+
+# --- LOGO FESTIVAL : NORMALISATION UNIQUE POUR L'IMPRESSION ---
+# Le logo est imprimé sur 33 mm de large en tête de page : au-delà de 300 dpi les pixels
+# ne servent à rien et alourdissent chaque PDF.
+LOGO_LARGEUR_MM = 33
+LOGO_DPI = 300
+LOGO_LARGEUR_PX = int(round(LOGO_LARGEUR_MM / 25.4 * LOGO_DPI))
+
+_cache = OrderedDict()
+_cache_max = 16
+_lock = threading.Lock()
+
+
+def _normaliser(data):
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    if img.width > LOGO_LARGEUR_PX:
+        hauteur = max(1, int(round(img.height * LOGO_LARGEUR_PX / img.width)))
+        img = img.resize((LOGO_LARGEUR_PX, hauteur), Image.LANCZOS)
+
+    transparent = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    out = io.BytesIO()
+    if transparent:
+        img.convert("RGBA").save(out, format="PNG", optimize=True)
+    else:
+        img.convert("RGB").save(out, format="JPEG", quality=90, optimize=True)
+    return out.getvalue()
+
+
+def preparer_logo(data):
+    """Logo prêt pour fpdf (PNG si transparence, JPEG sinon), calculé une fois par contenu.
+
+    Retourne None si l'image est absente ou illisible.
+    """
+    if not data:
+        return None
+    if not PIL_AVAILABLE:
+        return data
+    cle = hashlib.sha256(data).hexdigest()
+    with _lock:
+        if cle in _cache:
+            _cache.move_to_end(cle)
+            return _cache[cle]
+    try:
+        logo = _normaliser(data)
+    except Exception:
+        logo = None
+    with _lock:
+        _cache[cle] = logo
+        while len(_cache) > _cache_max:
+            _cache.popitem(last=False)
+    return logo
@@ -0,0 +1,259 @@
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+import traceback
+import zipfile
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from regie.cache import empreinte
+from regie.documents import contenu_besoins, contenu_patch, generer_xlsx_easyjob
+from regie.horaires import DEBUT_JOURNEE
+from regie.index import IndexJourScene, index_a_jour
+from regie.patch import projeter_tables
+from regie.pdf import generer_pdf_besoins_custom, generer_pdf_complet, generer_pdf_patch
+from regie.planning import MATPLOTLIB_AVAILABLE, build_planning_grid, generer_pdf_planning_mural, generer_pdf_planning_visuel, pages_planning_mural
+
+
+# --- EXPORT GROUPÉ (ZIP) ---
+# Tous les documents d'un périmètre (jour, scène ou festival) sont rendus en parallèle dans
+# des processus séparés (fpdf et matplotlib gardent le GIL) puis écrits un à un dans un ZIP
+# sur disque : seuls les documents en cours de rendu sont en mémoire.
+RACINE_EXPORTS = os.environ.get("REGIE_EXPORTS_DIR", os.path.join(tempfile.gettempdir(), "regie-festival-exports"))
+DUREE_CONSERVATION = 24 * 3600
+
+Document = namedtuple("Document", ["chemin", "fonction", "args"])
+
+
+def nom_fichier(texte):
+    return re.sub(r"[^\w\-. ]+", "_", str(texte)).strip(" .") or "_"
+
+
+def pdf_besoins(titre, arts_scope, data_pic, col_total, fiches_apporte, alim_scene, circuits, notes, contacts, jour, festival_name, festival_logo):
+    arts_infos, besoins_cats = contenu_besoins(arts_scope, data_pic, col_total, fiches_apporte, alim_scene, circuits, notes, contacts, jour=jour)
+    return generer_pdf_besoins_custom(titre, arts_infos, besoins_cats, festival_name=festival_name, festival_logo=festival_logo)
+
+
+def _besoins(etat, index_fiches, index_alim, scene, arts, data_pic, col_total, jour=None):
+    fiches = index_fiches.tranche(scene=scene)
+    return (
+        arts, data_pic, col_total,
+        fiches[fiches["Artiste_Apporte"]],
+        index_alim.tranche(scene=scene),
+        {a: dict(etat["artist_circuits"][a]) for a in arts if a in etat["artist_circuits"]},
+        {a: etat["notes_artistes"].get(a, "") for a in arts},
+        {a: etat["contacts_artistes"].get(a) for a in arts},
+        jour,
+    )
+
+
+def _mapping(mapping, data_pic):
+    """Correspondances EasyJob des seules catégories présentes (arguments du document plus légers)."""
+    return {cat: mapping[cat] for cat in data_pic["Catégorie"].dropna().unique() if cat in mapping}
+
+
+def lister_documents(etat, besoins_cache, jour=None, scene=None, index=None, mapping=None):
+    """Documents d'un périmètre : besoins (PDF + EasyJob), plannings (tableau + visuels) et patchs de chaque artiste.
+
+    `etat` a les clés de la session (planning, fiches_tech, patches_io...) ; `besoins_cache`
+    doit être à jour ; `index` est l'IndexJourScene du planning s'il existe déjà ; `mapping` :
+    correspondances EasyJob du catalogue (par défaut etat["easyjob_mapping"]).
+    Sans `jour` ni `scene`, tout le festival est exporté.
+    """
+    index = index_a_jour(index, etat["planning"])
+    mapping = (etat.get("easyjob_mapping") if mapping is None else mapping) or {}
+    index_fiches = IndexJourScene(etat["fiches_tech"], "Groupe")
+    index_alim = IndexJourScene(etat["alim_elec"], "Groupe")
+    nom_fest, logo_fest = etat.get("festival_name", ""), etat.get("festival_logo")
+    debut = etat.get("debut_journee", DEBUT_JOURNEE)
+    jours = index.jours if jour is None else [str(jour)]
+    journees = [(j, s) for j in jours for s in index.scenes_du_jour(j) if scene is None or s == str(scene)]
+    docs = []
+
+    grilles = {}
+    for j, s in journees:
+        sub_df = index.tranche(j, s)
+        dossier = f"{nom_fichier(j)}/{nom_fichier(s)}"
+        arts = list(sub_df["Artiste"].unique())
+
+        grille = build_planning_grid(sub_df, debut)
+        if not grille.empty:
+            grilles[f"JOUR : {j} | SCENE : {s}"] = grille
+            if MATPLOTLIB_AVAILABLE:
+                docs.append(Document(f"{dossier}/planning_visuel.pdf", generer_pdf_planning_visuel, (sub_df, f"Planning Vertical {s} - {j}", debut)))
+
+        data_pic = besoins_cache.pics(j, s)
+        docs.append(Document(f"{dossier}/besoins.pdf", pdf_besoins,
+                             (f"BESOINS ({s} - {j})",) + _besoins(etat, index_fiches, index_alim, s, arts, data_pic, "Total", jour=j) + (nom_fest, logo_fest)))
+        docs.append(Document(f"{dossier}/easyjob.xlsx", generer_xlsx_easyjob, (data_pic, "Total", _mapping(mapping, data_pic))))
+
+        alim = index_alim.tranche(j, s)
+        for a in arts:
+            io_a = etat["patches_io"].get(a) or {}
+            patch_out = etat["patches_out"].get(a)
+            circuits = etat["artist_circuits"].get(a)
+            formats = [f for f in ("12N", "20H") if io_a.get(f) is not None]
+            titre = f"PATCH - {a} ({j} | {s})"
+            args_patch = (etat["notes_artistes"].get(a, ""), circuits, alim[alim["Groupe"] == a])
+            for f in formats:
+                docs.append(Document(f"{dossier}/patch/{nom_fichier(a)}_{f}.pdf", generer_pdf_patch,
+                                     (titre, contenu_patch(*args_patch, projeter_tables(io_a[f], f), patch_out), nom_fest, logo_fest)))
+            if not formats and (patch_out is not None or circuits is not None):
+                docs.append(Document(f"{dossier}/patch/{nom_fichier(a)}.pdf", generer_pdf_patch,
+                                     (titre, contenu_patch(*args_patch, None, patch_out), nom_fest, logo_fest)))
+
+    if MATPLOTLIB_AVAILABLE and scene is None:
+        # Planning mural du jour : toutes ses scènes côte à côte (rendu sur place, le lot est déjà parallèle)
+        for j in jours:
+            scenes_j = index.scenes_du_jour(j)
+            if len(scenes_j) > 1:
+                pages = pages_planning_mural([(j, s, index.tranche(j, s)) for s in scenes_j], "jour", "A2", debut)
+                if pages:
+                    docs.append(Document(f"{nom_fichier(j)}/planning_mural.pdf", generer_pdf_planning_mural, (pages,)))
+
+    if jour is None:
+        for s in sorted({s for _, s in journees}):
+            arts = index.groupes(scene=s)
+            data_periode = besoins_cache.periode(s)
+            docs.append(Document(f"periode/besoins_{nom_fichier(s)}.pdf", pdf_besoins,
+                                 (f"BESOINS ({s} - Période Totale)",) + _besoins(etat, index_fiches, index_alim, s, arts, data_periode, "Max_Periode") + (nom_fest, logo_fest)))
+            docs.append(Document(f"periode/easyjob_{nom_fichier(s)}.xlsx", generer_xlsx_easyjob, (data_periode, "Max_Periode", _mapping(mapping, data_periode))))
+
+    if grilles:
+        grand = len(grilles) > 1
+        docs.insert(0, Document("planning.pdf", generer_pdf_complet,
+                                ("PLANNING GLOBAL" if grand else "PLANNING PAR JOUR & SCÈNE", grilles, "L" if grand else "P", "A3" if grand else "A4", True, nom_fest, logo_fest)))
+    return docs
+
+
+# Clés de la session lues par lister_documents (et le cache des besoins)
+CLES_ETAT_LOT = ["planning", "fiches_tech", "alim_elec", "patches_io", "patches_out", "artist_circuits",
+                 "notes_artistes", "contacts_artistes", "festival_name", "festival_logo", "debut_journee", "fenetre_besoins"]
+
+
+def cle_perimetre(etat, jour=None, scene=None, *autres):
+    """Empreinte d'un export groupé sans construire ses documents : périmètre, tables de la session
+    et `autres` (version du catalogue...). Sert à savoir si une archive déjà générée est à jour."""
+    return empreinte(jour, scene, *(etat.get(k) for k in CLES_ETAT_LOT), *autres)
+
+
+def cle_lot(docs):
+    return empreinte(*[(d.chemin, d.fonction.__module__, d.fonction.__qualname__, d.args) for d in docs])
+
+
+def _rendre(fonction, args):
+    try:
+        return fonction(*args), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def purger_exports(racine=RACINE_EXPORTS, duree=DUREE_CONSERVATION):
+    if not os.path.isdir(racine):
+        return
+    limite = time.time() - duree
+    for nom in os.listdir(racine):
+        chemin = os.path.join(racine, nom)
+        try:
+            if os.path.getmtime(chemin) < limite:
+                os.unlink(chemin)
+        except OSError:
+            pass
+
+
+def nouveau_pool(max_workers=None):
+    # "spawn" : le serveur Streamlit est multi-thread, un fork pourrait hériter de verrous tenus
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _rendus(docs, pool):
+    """Rend `docs` dans `pool` ; produit (document, octets, erreur) au fil des fins de rendu."""
+    # Documents soumis mais non encore consommés : borne la mémoire occupée par les résultats
+    en_vol_max = 2 * (os.cpu_count() or 1)
+    en_cours = {}
+    for doc in docs:
+        if len(en_cours) >= en_vol_max:
+            termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for fut in termines:
+                yield (en_cours.pop(fut),) + fut.result()
+        en_cours[pool.submit(_rendre, doc.fonction, doc.args)] = doc
+    while en_cours:
+        termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+        for fut in termines:
+            yield (en_cours.pop(fut),) + fut.result()
+
+
+def exporter_zip(docs, chemin=None, pool=None, progression=None):
+    """Rend `docs` dans un pool de processus et les écrit au fil de l'eau dans un ZIP ; retourne son chemin.
+
+    `pool` permet de réutiliser des processus déjà démarrés (voir nouveau_pool), sinon un pool
+    est créé pour l'occasion. Un lot déjà exporté (même empreinte) n'est pas régénéré. Les
+    documents en échec sont listés dans ERREURS.txt à la racine de l'archive.
+    """
+    if chemin is None:
+        chemin = os.path.join(RACINE_EXPORTS, f"{cle_lot(docs)}.zip")
+    os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+    if os.path.exists(chemin):
+        if progression: progression(len(docs), len(docs))
+        return chemin
+
+    propre = pool is None
+    if propre:
+        pool = nouveau_pool(max(1, min(os.cpu_count() or 1, len(docs))))
+    erreurs = []
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(chemin)), suffix=".part")
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for faits, (doc, data, erreur) in enumerate(_rendus(docs, pool), 1):
+                if erreur:
+                    erreurs.append(f"{doc.chemin}\n{erreur}")
+                elif data:
+                    zf.writestr(doc.chemin, data)
+                if progression: progression(faits, len(docs))
+            if erreurs:
+                zf.writestr("ERREURS.txt", "\n\n".join(erreurs))
+        os.replace(tmp, chemin)
+    finally:
+        if propre:
+            pool.shutdown()
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return chemin
+
+
+def exporter_dossier(docs, dossier, pool=None, progression=None):
+    """Rend `docs` et écrit chaque document sous `dossier` (chemins relatifs des documents).
+
+    Chaque fichier est écrit à côté puis renommé : une génération interrompue ne laisse pas de
+    document tronqué. Retourne les erreurs (chemin + trace), aussi écrites dans ERREURS.txt ;
+    un ERREURS.txt d'une génération précédente est supprimé si tout a réussi.
+    """
+    propre = pool is None
+    if propre:
+        pool = nouveau_pool(max(1, min(os.cpu_count() or 1, len(docs))))
+    erreurs = []
+    try:
+        for faits, (doc, data, erreur) in enumerate(_rendus(docs, pool), 1):
+            if erreur:
+                erreurs.append(f"{doc.chemin}\n{erreur}")
+            elif data:
+                cible = os.path.join(dossier, *doc.chemin.split("/"))
+                os.makedirs(os.path.dirname(cible), exist_ok=True)
+                with open(cible + ".part", "wb") as f:
+                    f.write(data)
+                os.replace(cible + ".part", cible)
+            if progression: progression(faits, len(docs))
+    finally:
+        if propre:
+            pool.shutdown()
+    rapport = os.path.join(dossier, "ERREURS.txt")
+    if erreurs:
+        os.makedirs(dossier, exist_ok=True)
+        with open(rapport, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(sorted(erreurs)))
+    elif os.path.exists(rapport):
+        os.unlink(rapport)
+    return erreurs
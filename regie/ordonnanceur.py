@@ -0,0 +1,184 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from regie.horaires import PHASES, minutes
+
+
+# --- ORDONNANCEUR D'UNE JOURNÉE (JOUR, SCÈNE) ---
+# Le soir, chaque artiste occupe la scène pour son Change Over suivi immédiatement de son Show ;
+# les shows commencent après l'ouverture des portes, finissent avant le couvre-feu, et un show
+# à heure fixe est une ancre. L'ordre de passage est cherché en profondeur (essai dans l'ordre
+# souhaité d'abord, retour arrière, élagage sur le temps mort) pour minimiser le temps mort
+# entre les blocs, puis l'écart à l'ordre souhaité.
+# Le matin, Load IN -> Inst On Stage -> Balance s'enchaînent par artiste, en ordre inverse de
+# passage (le premier à jouer fait sa balance en dernier), calés contre le premier Change Over
+# sans dépasser l'ouverture des portes. L'Inst Off Stage, hors plateau, précède le Change Over.
+NOMS_PHASES = [nom for nom, _, _, _ in PHASES]
+COLS_DUREES = ["Artiste"] + NOMS_PHASES + ["Show fixe"]
+
+
+class Infaisable(ValueError):
+    pass
+
+
+def durees_planning(df, debut):
+    """Durées (minutes) de chaque phase des lignes `df` d'une journée, dans l'ordre de passage."""
+    res = pd.DataFrame({"Artiste": df["Artiste"].to_numpy()})
+    for nom, c_deb, c_fin, _ in PHASES:
+        d = (minutes(df[c_fin], debut) - minutes(df[c_deb], debut)).astype("Int32")
+        res[nom] = d.where(d > 0, 0).fillna(0).astype(int).to_numpy()
+    res["Show fixe"] = None
+    return res
+
+
+def _soir(blocs, co, show, fixe, portes, couvre_feu, ordre_impose, limite):
+    """Début de Change Over de chaque artiste ; blocs = co + show, fixe = début de show imposé ou -1."""
+    n = len(blocs)
+    ancres = sorted((fixe[i] - co[i], i) for i in range(n) if fixe[i] >= 0)
+    for (a, i), (b, _) in zip(ancres, ancres[1:]):
+        if a + blocs[i] > b:
+            raise Infaisable("Deux shows à heure fixe se chevauchent (change over compris).")
+    libres = [i for i in range(n) if fixe[i] < 0]
+    if (couvre_feu - (portes - max(co))) < sum(blocs):
+        raise Infaisable(f"Les change over et shows demandent {sum(blocs)} min de plateau : ils ne tiennent pas entre les portes et le couvre-feu.")
+    fin_limite = time.perf_counter() + limite
+    meilleur = {"cout": None, "sequence": None, "interrompu": False}
+    sequence = []
+    # Même position atteinte (ancres passées, artistes restants, heure) par un chemin moins cher : inutile de continuer
+    vus_etats = {}
+
+    def explorer(t, k_ancre, restants, mort, inversions, charge):
+        cout = (mort, inversions)
+        if meilleur["cout"] is not None and cout >= meilleur["cout"]:
+            return
+        # Tout ce qui reste à placer doit encore tenir avant le couvre-feu
+        if t is not None and t + charge > couvre_feu:
+            return
+        etat = (k_ancre, tuple(restants), t)
+        if vus_etats.get(etat, (np.inf, np.inf)) <= cout:
+            return
+        vus_etats[etat] = cout
+        if not restants and k_ancre == len(ancres):
+            meilleur["cout"], meilleur["sequence"] = cout, list(sequence)
+            return
+        if time.perf_counter() > fin_limite:
+            meilleur["interrompu"] = True
+            return
+        prochaine = ancres[k_ancre][0] if k_ancre < len(ancres) else None
+        candidats = restants[:1] if ordre_impose else restants
+        vus = set()
+        for r, i in enumerate(candidats):
+            # Deux artistes de mêmes durées sont interchangeables : seul le premier est essayé
+            if (co[i], blocs[i]) in vus:
+                continue
+            vus.add((co[i], blocs[i]))
+            debut_bloc = max(t, portes - co[i]) if t is not None else portes - co[i]
+            if prochaine is not None and debut_bloc + blocs[i] > prochaine:
+                continue
+            if debut_bloc + blocs[i] > couvre_feu:
+                continue
+            trou = debut_bloc - t if t is not None else 0
+            sequence.append((i, debut_bloc))
+            explorer(debut_bloc + blocs[i], k_ancre, restants[:r] + restants[r + 1:], mort + trou, inversions + r, charge - blocs[i])
+            sequence.pop()
+            if meilleur["cout"] == (0, 0):
+                return
+        if prochaine is not None:
+            # Ancre suivante : les blocs qui précèdent la première y seront calés, sans temps mort
+            a, i = ancres[k_ancre]
+            if t is not None and t > a:
+                return
+            if a + co[i] < portes or a + blocs[i] > couvre_feu:
+                return
+            trou = a - t if k_ancre > 0 else 0
+            sequence.append((i, a))
+            explorer(a + blocs[i], k_ancre + 1, restants, mort + trou, inversions, charge - blocs[i])
+            sequence.pop()
+
+    explorer(None, 0, libres, 0, 0, sum(blocs))
+    if meilleur["sequence"] is None:
+        if meilleur["interrompu"]:
+            raise Infaisable("Aucun ordre de passage trouvé dans le temps imparti.")
+        raise Infaisable("Aucun ordre de passage ne respecte portes, couvre-feu et shows à heure fixe.")
+    seq = meilleur["sequence"]
+    # Les blocs avant la première ancre sont calés contre elle (pas de temps mort initial)
+    if ancres:
+        k = next(p for p, (i, _) in enumerate(seq) if fixe[i] >= 0)
+        t = seq[k][1]
+        for p in range(k - 1, -1, -1):
+            i = seq[p][0]
+            t -= blocs[i]
+            seq[p] = (i, t)
+    return seq
+
+
+def ordonnancer(durees, portes, couvre_feu, acces=0, co_min=0, ordre_impose=False, limite=1.0):
+    """Horaires (minutes depuis le début de journée) d'une journée à partir des durées de phases.
+
+    `durees` a les colonnes COLS_DUREES, une ligne par artiste dans l'ordre de passage souhaité ;
+    « Show fixe » est un début de show imposé en minutes (ou vide). `acces` est l'heure
+    d'ouverture du plateau le matin (début de journée par défaut). Retourne un DataFrame (_ligne, Artiste + colonnes de phases
+    en Int16) trié dans le nouvel ordre de passage ; lève Infaisable si les contraintes ne
+    peuvent pas être tenues.
+    """
+    n = len(durees)
+    if n == 0:
+        return pd.DataFrame(columns=["_ligne", "Artiste"] + [c for _, d, f, _ in PHASES for c in (d, f)])
+    d = {nom: pd.to_numeric(durees[nom], errors="coerce").fillna(0).clip(lower=0).astype(int).to_numpy() for nom in NOMS_PHASES}
+    co = np.maximum(d["Change Over"], int(co_min))
+    show = d["Show"]
+    fixe = pd.to_numeric(durees["Show fixe"], errors="coerce").fillna(-1).astype(int).to_numpy()
+    blocs = co + show
+    seq = _soir(blocs.tolist(), co.tolist(), show.tolist(), fixe.tolist(), portes, couvre_feu, ordre_impose, limite)
+
+    ordre = [i for i, _ in seq]
+    debut_co = np.zeros(n, dtype=int)
+    for i, t in seq:
+        debut_co[i] = t
+
+    # Matin : ordre inverse de passage, calé contre le premier Change Over et avant les portes
+    matin = d["Load IN"] + d["Inst On Stage"] + d["Balance"]
+    fin_matin = min(debut_co[ordre[0]], portes)
+    debut_matin = np.zeros(n, dtype=int)
+    t = fin_matin
+    for i in ordre:
+        t -= matin[i]
+        debut_matin[i] = t
+    if t < acces:
+        raise Infaisable(f"Les balances demandent {int(matin.sum())} min de plateau : elles ne tiennent pas entre l'accès et l'ouverture des portes.")
+
+    res = pd.DataFrame({"_ligne": ordre, "Artiste": durees["Artiste"].to_numpy()[ordre]})
+    debuts = {
+        "Load IN": debut_matin,
+        "Inst On Stage": debut_matin + d["Load IN"],
+        "Balance": debut_matin + d["Load IN"] + d["Inst On Stage"],
+        "Inst Off Stage": debut_co - d["Inst Off Stage"],
+        "Change Over": debut_co,
+        "Show": debut_co + co,
+    }
+    longueurs = dict(d, **{"Change Over": co})
+    for nom, c_deb, c_fin, _ in PHASES:
+        deb = pd.Series(debuts[nom][ordre], dtype="Int16")
+        lg = longueurs[nom][ordre]
+        res[c_deb] = deb.where(lg > 0)
+        res[c_fin] = (deb + lg).where(lg > 0).astype("Int16")
+    return res
+
+
+def appliquer(planning, positions, horaires):
+    """Nouveau planning où les lignes `positions` d'une journée prennent les horaires calculés,
+    réordonnées selon le nouvel ordre de passage (les autres lignes ne bougent pas)."""
+    res = planning.copy()
+    sources = np.asarray(positions)[horaires["_ligne"].to_numpy(dtype=np.intp)]
+    lignes = res.iloc[sources].reset_index(drop=True)
+    for _, c_deb, c_fin, _ in PHASES:
+        lignes[c_deb] = horaires[c_deb].to_numpy()
+        lignes[c_fin] = horaires[c_fin].to_numpy()
+    garde = np.ones(len(res), dtype=bool)
+    garde[positions] = False
+    bloc = res.iloc[np.flatnonzero(garde)]
+    # La journée reprend la place de sa première ligne dans la table
+    insertion = int(np.min(positions))
+    return pd.concat([bloc.iloc[:insertion], lignes, bloc.iloc[insertion:]], ignore_index=True)
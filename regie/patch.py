@@ -0,0 +1,324 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from regie.cache import empreinte
+
+
+# --- ALLOCATION DU PATCH IN (INPUTS, MICROS / DI, PIEDS, BOÎTIERS) ---
+# Chaque ressource est une réserve de libellés avec un compteur d'usage global et un compteur
+# par table (MASTER, DEPART_n). Une valeur est proposée dans une table tant qu'elle n'est pas
+# prise ailleurs (capacité 1 : input, micro, boîtier ; quantité de la fiche pour les pieds) ;
+# les valeurs déjà présentes dans la table restent toujours proposées. Une édition ne touche
+# que les cellules modifiées : les options se lisent sur les compteurs, sans re-parcourir les
+# autres tables.
+COULEURS_BOITIERS = ["🟤", "🔴", "🟠", "🟡", "🟢", "🔵", "🟣", "⚪", "🍏"]
+# Au-delà de 9 boîtiers les couleurs repartent en cycle, numéroté : 🟤, ..., 🍏, 🟤2, ..., 🍏2, 🟤3...
+CATEGORIES_HORS_MICROS = ["EAR MONITOR", "PIEDS MICROS", "MONITOR", "PRATICABLE & CADRE ROULETTE", "REGIE", "MULTI"]
+CATEGORIE_PIEDS = "PIEDS MICROS"
+# Patch automatique : modèles courants alimentés en 48V (statiques, DI actives) et sources sans pied
+MODELES_48V = r"KM ?\d|C ?214|C ?414|C ?451|C ?535|SM ?81|SM ?27|BETA ?91|BETA ?98|B ?91|B ?98|E ?9\d\d|KSM|NT ?\d|AT ?40|MKH|MK ?4|ATM ?350|D ?6\d\d?0?S|AR ?133|DI ?ACTIVE|DB ?10|LD ?1"
+SANS_PIED = r"\bDI\b|BOITE DE DIRECT|KICK|B ?91|BETA ?91|E ?90\d"
+
+
+# --- BOÎTIERS DE SCÈNE ET INFRASTRUCTURE ---
+# Un format de patch = des boîtiers de `step` entrées reliés par multipaire (12N : B12M/F,
+# 20H : B20). Chaque scène déclare combien de boîtiers de chaque format elle possède et les
+# tailles de MASTER patch de sa régie ; sans déclaration, l'ancienne configuration (9 boîtiers,
+# MASTER 40/60) est complétée pour qu'un artiste ait toujours assez de boîtiers.
+FORMATS_PATCH = {"12N": (12, "B12M/F"), "20H": (20, "B20")}
+INFRA_DEFAUT = {"12N": 9, "20H": 9, "masters": [40, 60]}
+TAILLES_MASTER = [24, 32, 40, 48, 56, 60, 64, 72, 96, 128, 144]
+
+
+def repere_boitier(j):
+    """Repère couleur du boîtier n° `j` (à partir de 1), numéroté à partir du 2e cycle."""
+    cycle, k = divmod(j - 1, len(COULEURS_BOITIERS))
+    return COULEURS_BOITIERS[k] + (str(cycle + 1) if cycle else "")
+
+
+def infrastructure(infra_scenes, scene):
+    """Infrastructure d'une scène (boîtiers par format, tailles de MASTER), valeurs par défaut comprises."""
+    return {**INFRA_DEFAUT, **(infra_scenes.get(scene) or {})}
+
+
+def nb_boitiers(infra_scenes, scene, mode_key, nb_inputs):
+    """Boîtiers de la scène pour un format ; sans déclaration, au moins un par DEPART de l'artiste."""
+    declares = (infra_scenes.get(scene) or {}).get(mode_key)
+    if declares is not None:
+        return int(declares)
+    return max(INFRA_DEFAUT[mode_key], -(-nb_inputs // FORMATS_PATCH[mode_key][0]))
+
+
+def taille_master(infra, max_inputs):
+    """Plus petit MASTER patch de la scène qui couvre `max_inputs`, None si aucun ne suffit."""
+    tailles = sorted(int(t) for t in infra["masters"] if int(t) >= max_inputs)
+    return tailles[0] if tailles else None
+
+
+class Reserve:
+    def __init__(self, libelles, capacites=1):
+        self.libelles = np.asarray(list(libelles), dtype=object)
+        self.capacites = np.broadcast_to(np.asarray(capacites, dtype=np.int32), (len(self.libelles),))
+        self._pos = {v: k for k, v in enumerate(self.libelles)}
+        self._total = np.zeros(len(self.libelles), dtype=np.int32)
+        self._par_table = {}
+        # Valeurs hors réserve (micro retiré de la fiche...) : gardées dans les options de leur table
+        self._autres = {}
+
+    def _table(self, table):
+        if table not in self._par_table:
+            self._par_table[table] = np.zeros(len(self.libelles), dtype=np.int32)
+            self._autres[table] = Counter()
+        return self._par_table[table]
+
+    def prendre(self, table, valeur, n=1):
+        if valeur is None or (not isinstance(valeur, str) and pd.isna(valeur)):
+            return
+        valeur = int(valeur) if isinstance(valeur, np.integer) else valeur
+        propre = self._table(table)
+        k = self._pos.get(valeur)
+        if k is None:
+            self._autres[table][valeur] += n
+            if self._autres[table][valeur] <= 0:
+                del self._autres[table][valeur]
+        else:
+            propre[k] += n
+            self._total[k] += n
+
+    def rendre(self, table, valeur):
+        self.prendre(table, valeur, -1)
+
+    def libres(self, table):
+        """Masque des libellés encore disponibles pour `table` (ou déjà dans `table`)."""
+        propre = self._table(table)
+        return ((self._total - propre) < self.capacites) | (propre > 0)
+
+    def options(self, table, domaine=None):
+        """[None] + libellés proposés dans `table` ; `domaine` : masque des libellés autorisés."""
+        libres = self.libres(table)
+        if domaine is not None:
+            libres = (libres & domaine) | (self._par_table[table] > 0)
+        return [None] + self.libelles[libres].tolist() + list(self._autres[table])
+
+    def utilises(self):
+        return int((self._total > 0).sum())
+
+
+def _unites_micros(df_mat):
+    """Une ligne par unité de micro / DI de la fiche, dans l'ordre de saisie : Instance, Catégorie, Modèle."""
+    micros = df_mat[~df_mat["Catégorie"].isin(CATEGORIES_HORS_MICROS)]
+    qte = pd.to_numeric(micros["Quantité"], errors="coerce").fillna(0).clip(lower=0).astype(int).to_numpy()
+    modeles = np.repeat(micros["Modèle"].astype(str).to_numpy(dtype=object), qte)
+    categories = np.repeat(micros["Catégorie"].astype(str).to_numpy(dtype=object), qte)
+    rang = np.arange(len(modeles)) - np.repeat(np.cumsum(qte) - qte, qte) + 1
+    return pd.DataFrame({"Instance": [f"{m} #{r}" for m, r in zip(modeles, rang)], "Catégorie": categories, "Modèle": modeles})
+
+
+def instances_micros(df_mat):
+    """« Modèle #i » pour chaque unité des micros / DI d'une fiche, triés."""
+    return sorted(_unites_micros(df_mat)["Instance"])
+
+
+def pieds_disponibles(df_mat):
+    """(modèles, quantités) des pieds de micro d'une fiche, dans l'ordre de la fiche."""
+    pieds = df_mat[df_mat["Catégorie"] == CATEGORIE_PIEDS]
+    qte = pd.to_numeric(pieds["Quantité"], errors="coerce").fillna(0).groupby(pieds["Modèle"].astype(str), sort=False).sum()
+    # Ligne à quantité nulle (ou pas encore saisie) : aucun pied de ce modèle à attribuer
+    qte = qte[qte > 0]
+    return qte.index.tolist(), qte.astype(int).tolist()
+
+
+def signature_patch(df_mat, nb_inputs, step, nb_boitiers):
+    """Clé des réserves d'un PatchAllocator : empreinte de la fiche (sans la déplier en instances) et dimensions."""
+    return (empreinte(df_mat[["Catégorie", "Modèle", "Quantité"]]), nb_inputs, step, nb_boitiers)
+
+
+class PatchAllocator:
+    COLONNES = {"Input": "inputs", "Micro / DI": "micros", "Stand": "pieds", "Boîtier": "boitiers"}
+
+    @classmethod
+    def depuis_fiche(cls, df_mat, nb_inputs, step, nb_boitiers):
+        """Réserves des micros / DI et pieds de la fiche matériel `df_mat` (signature : voir signature_patch)."""
+        return cls(nb_inputs, step, nb_boitiers, instances_micros(df_mat), pieds_disponibles(df_mat),
+                   signature_patch(df_mat, nb_inputs, step, nb_boitiers))
+
+    def __init__(self, nb_inputs, step, nb_boitiers, micros, pieds, signature=None):
+        """Inputs et boîtiers par numéro ; `micros` : instances « Modèle #i » ; `pieds` : (modèles, quantités)."""
+        self.nb_inputs, self.step = nb_inputs, step
+        self.reserves = {
+            "inputs": Reserve(range(1, nb_inputs + 1)),
+            "micros": Reserve(micros),
+            "pieds": Reserve(pieds[0], pieds[1]),
+            "boitiers": Reserve(range(1, nb_boitiers + 1)),
+        }
+        self.signature = signature
+        self.versions = {}
+
+    def charger(self, tables):
+        """Prend en compte toutes les tables (première ouverture, projet restauré)."""
+        for nom, df in tables.items():
+            for col, res in self.COLONNES.items():
+                if col in df.columns:
+                    for v, n in df[col].dropna().value_counts().items():
+                        self.reserves[res].prendre(nom, v, int(n))
+            self.versions[nom] = df
+        return self
+
+    def a_jour(self, tables):
+        return all(self.versions.get(nom) is df for nom, df in tables.items()) and len(self.versions) == len(tables)
+
+    def affecter(self, table, colonne, ancienne, nouvelle):
+        """Une cellule de `table` passe de `ancienne` à `nouvelle`."""
+        res = self.reserves.get(self.COLONNES.get(colonne))
+        if res is not None:
+            res.rendre(table, ancienne)
+            res.prendre(table, nouvelle)
+
+    def maj_table(self, table, ancienne, nouvelle):
+        """Reporte l'édition d'une table (mêmes lignes) : seules les cellules modifiées sont relues."""
+        for col in self.COLONNES:
+            if col not in nouvelle.columns:
+                continue
+            a, n = ancienne[col].reset_index(drop=True), nouvelle[col].reset_index(drop=True)
+            change = ~((a == n).fillna(False) | (a.isna() & n.isna()))
+            for k in np.flatnonzero(change.to_numpy()):
+                self.affecter(table, col, a.iat[k], n.iat[k])
+        self.versions[table] = nouvelle
+
+    def domaine_depart(self, i):
+        """Masque des inputs du DEPART `i` (plage de `step` inputs)."""
+        j = np.arange(1, self.nb_inputs + 1)
+        return (j > (i - 1) * self.step) & (j <= i * self.step)
+
+    def options(self, table, colonne, domaine=None):
+        return self.reserves[self.COLONNES[colonne]].options(table, domaine)
+
+
+# --- STOCKAGE CANONIQUE DU PATCH IN ---
+# Une seule table par tableau (MASTER, DEPART_n) et par format : n° de boîtier et n° d'input
+# typés (Int16), Micro / DI, Source, Stand, 48V. La couleur d'une ligne est celle de son
+# boîtier (repere_boitier) : les libellés affichés et imprimés (« B12M/F 3 🟠 », « INPUT 27 🟠 »)
+# sont une projection calculée au rendu, jamais stockée.
+COLONNES_PATCH = ["Boîtier", "Input", "Micro / DI", "Source", "Stand", "48V"]
+
+
+def libelle_boitier(prefixe, j):
+    return "" if j is None or pd.isna(j) else f"{prefixe} {int(j)} {repere_boitier(int(j))}"
+
+
+def libelle_input(j):
+    return "" if j is None or pd.isna(j) else f"INPUT {int(j)}"
+
+
+def _numeros(serie):
+    """N° (Int16) d'une colonne Boîtier / Input, numérique ou libellé d'une ancienne sauvegarde."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype("Int16")
+    if serie.isna().all():
+        return pd.Series(pd.NA, index=serie.index, dtype="Int16")
+    # « B12M/F 3 🟠 » -> 3, « INPUT 27 🟠2 » -> 27 : premier nombre isolé
+    return pd.to_numeric(serie.astype("string").str.extract(r"(?:^|\s)(\d+)(?=\s|$)", expand=False), errors="coerce").astype("Int16")
+
+
+def _texte(serie, vide=None):
+    return serie.astype(object).where(serie.notna(), vide)
+
+
+def table_patch(df, boitiers=True):
+    """Table canonique (types fixés, colonnes dans l'ordre, colonnes manquantes vides) ; accepte les anciens libellés."""
+    df = df.reset_index(drop=True)
+    vide = pd.Series([None] * len(df), dtype=object)
+    col = lambda c: df[c] if c in df.columns else vide
+    cols = {}
+    if boitiers:
+        cols["Boîtier"] = _numeros(col("Boîtier"))
+    cols["Input"] = _numeros(col("Input"))
+    cols["Micro / DI"] = _texte(col("Micro / DI"))
+    cols["Source"] = _texte(col("Source"), "")
+    cols["Stand"] = _texte(col("Stand"))
+    cols["48V"] = col("48V").where(col("48V").notna(), False).astype(bool)
+    return pd.DataFrame(cols)
+
+
+def table_patch_vide(nb, boitiers=True):
+    vide = pd.DataFrame({"Boîtier": [None] * nb, "Input": [None] * nb, "Micro / DI": [None] * nb,
+                         "Source": [""] * nb, "Stand": [None] * nb, "48V": [False] * nb})
+    return table_patch(vide, boitiers)
+
+
+def normaliser_patches(patches_io):
+    """patches_io au format canonique ; les anciennes sauvegardes (libellés colorés + copies "_src") sont converties."""
+    res = {}
+    for artiste, etat in patches_io.items():
+        if not isinstance(etat, dict):
+            continue
+        res[artiste] = {"nb_inputs": etat.get("nb_inputs", 0)}
+        for f in FORMATS_PATCH:
+            tables = etat.get(f)
+            res[artiste][f] = None if tables is None else {t: table_patch(df, "Boîtier" in df.columns) for t, df in tables.items()}
+    return res
+
+
+def projeter_patch(df, prefixe):
+    """Libellés affichés / imprimés d'une table canonique : boîtier et input portent la couleur du boîtier."""
+    res = df.copy()
+    entrees = "INPUT " + df["Input"].astype("string")
+    if "Boîtier" in df.columns:
+        num = df["Boîtier"]
+        plus_grand = int(num.max()) if num.notna().any() else 0
+        reperes = np.array([""] + [repere_boitier(j) for j in range(1, plus_grand + 1)], dtype=object)
+        repere = pd.Series(reperes[num.fillna(0).astype(int).to_numpy()], index=df.index, dtype="string")
+        res["Boîtier"] = (f"{prefixe} " + num.astype("string") + " " + repere).astype(object).where(num.notna(), None)
+        entrees = entrees + (" " + repere).where(repere != "", "")
+    res["Input"] = entrees.astype(object).where(df["Input"].notna(), None)
+    return res
+
+
+def projeter_tables(tables, format_patch):
+    """Projection de toutes les tables d'un format (export PDF)."""
+    prefixe = FORMATS_PATCH[format_patch][1]
+    return {t: projeter_patch(df, prefixe) for t, df in tables.items()}
+
+
+def patch_automatique(df_mat, nb_inputs, step, nb_boitiers, master=None, cible="DEPART"):
+    """Tables canoniques MASTER / DEPART_n remplies d'un coup depuis la fiche matériel.
+
+    Les micros / DI sont patchés dans l'ordre de la fiche sur les inputs 1..nb_inputs ; `cible`
+    "DEPART" les répartit par boîtier (`step` inputs, boîtiers 1..nb_boitiers dans l'ordre),
+    "MASTER" les place dans la table MASTER (`master` : nombre de lignes, None sans MASTER).
+    Les pieds de la fiche sont attribués aux sources qui en ont besoin tant qu'il en reste,
+    le 48V est coché pour les modèles statiques et DI actives courants (MODELES_48V).
+    """
+    unites = _unites_micros(df_mat).head(nb_inputs).reset_index(drop=True)
+    n = len(unites)
+    modele = unites["Modèle"].str.upper()
+    besoin_48v = modele.str.contains(MODELES_48V, regex=True).to_numpy()
+    a_pied = ~(modele.str.contains(SANS_PIED, regex=True) | unites["Catégorie"].str.upper().str.contains(r"\bDI\b", regex=True)).to_numpy()
+    modeles_pieds, qte_pieds = pieds_disponibles(df_mat)
+    stock = np.repeat(np.asarray(modeles_pieds, dtype=object), qte_pieds)
+    pied = np.full(n, None, dtype=object)
+    rangs = np.flatnonzero(a_pied)[:len(stock)]
+    pied[rangs] = stock[:len(rangs)]
+
+    # Ligne k = input k+1, boîtier de son DEPART ; sources au-delà de la fiche : ligne vide
+    num = np.arange(1, nb_inputs + 1)
+    boitier = pd.Series((num - 1) // step + 1)
+    lignes = table_patch(pd.DataFrame({
+        "Boîtier": boitier.where(boitier <= nb_boitiers).astype("Int16"),
+        "Input": num,
+        "Micro / DI": list(unites["Instance"]) + [None] * (nb_inputs - n),
+        "Source": [""] * nb_inputs,
+        "Stand": list(pied) + [None] * (nb_inputs - n),
+        "48V": list(besoin_48v) + [False] * (nb_inputs - n),
+    }))
+    tables = {}
+    if master is not None:
+        tables["MASTER"] = table_patch(lignes.reindex(range(master)), False) if cible == "MASTER" else table_patch_vide(master, False)
+    for i in range(1, -(-nb_inputs // step) + 1):
+        if cible == "DEPART":
+            tables[f"DEPART_{i}"] = table_patch(lignes.iloc[(i - 1) * step:i * step].reset_index(drop=True).reindex(range(step)))
+        else:
+            tables[f"DEPART_{i}"] = table_patch_vide(step)
+    return tables
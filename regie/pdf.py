@@ -0,0 +1,335 @@
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+
+from regie.documents import horodatage
+from regie.logo import preparer_logo
+
+
+# --- PREPARATION VECTORISEE DES CELLULES ---
+# Les tableaux sont nettoyés colonne par colonne avant le rendu : la boucle d'émission
+# ne manipule plus que des tuples de textes déjà prêts (pas d'iterrows, pas d'encode par cellule).
+_SEP = "\x1f"
+
+EMOJI_COLORS = {
+    "🟤": (205, 133, 63), "🔴": (255, 153, 153), "🟠": (255, 204, 153),
+    "🟡": (255, 255, 153), "🟢": (153, 255, 153), "🔵": (153, 204, 255),
+    "🟣": (204, 153, 255), "⚪": (240, 240, 240), "🍏": (204, 255, 153)
+}
+
+PHASE_COLORS = [
+    ("LOAD IN", (180, 220, 255)),
+    ("INST OFF", (255, 230, 180)),
+    ("INST ON", (255, 200, 120)),
+    ("BALANCE", (180, 240, 180)),
+    ("CHANGE OVER", (255, 250, 180)),
+    ("SHOW", (255, 180, 180)),
+]
+BLANC = (255, 255, 255)
+
+
+def latin1(colonnes):
+    """Remplace les sauts de ligne et replie en latin-1 (caractères inconnus -> '?') des colonnes de textes.
+
+    Toutes les cellules sont traitées en un seul encode/decode sur le texte concaténé.
+    """
+    if not colonnes or not colonnes[0]:
+        return [list(c) for c in colonnes]
+    n = len(colonnes[0])
+    bloc = _SEP.join(_SEP.join(c) for c in colonnes)
+    if bloc.count(_SEP) != n * len(colonnes) - 1:
+        # Séparateur présent dans une saisie : on retombe sur le traitement cellule par cellule
+        return [[v.replace("\n", " ").encode("latin-1", "replace").decode("latin-1") for v in c] for c in colonnes]
+    morceaux = bloc.replace("\n", " ").encode("latin-1", "replace").decode("latin-1").split(_SEP)
+    return [morceaux[i * n:(i + 1) * n] for i in range(len(colonnes))]
+
+
+def cellules_tableau(df):
+    return latin1([[str(v) for v in df.iloc[:, i].tolist()] for i in range(df.shape[1])])
+
+
+def couleur_repere(emoji, cycle=1):
+    """Couleur RVB d'un repère de boîtier ; les cycles suivants (🟤2, 🟤3...) sont assombris."""
+    facteur = max(0.55, 1 - 0.15 * (cycle - 1))
+    return tuple(int(v * facteur) for v in EMOJI_COLORS[emoji])
+
+
+def cellules_patch(df):
+    """Textes des cellules d'un patch et couleur de chaque ligne (dernier repère couleur rencontré)."""
+    emojis = list(EMOJI_COLORS)
+    motif = f"({'|'.join(emojis)})(\\d*)"
+    repere = pd.Series([None] * len(df), dtype=object)
+    cycle = pd.Series([1] * len(df))
+    colonnes = []
+    for i in range(df.shape[1]):
+        serie = df.iloc[:, i]
+        texte = serie.astype(str)
+        net = texte.str.strip()
+        texte = texte.mask(serie.isna(), "").mask(net == "True", "[ X ]").mask(net == "False", "[   ]")
+        trouve = texte.str.extract(motif)
+        m = trouve[0].notna().to_numpy()
+        if m.any():
+            repere[m] = trouve[0][m].to_numpy()
+            cycle[m] = pd.to_numeric(trouve[1][m], errors="coerce").fillna(1).astype(int).to_numpy()
+            texte = texte.mask(m, texte.str.replace(f" ?{motif}", "", regex=True).str.strip())
+        colonnes.append(texte.tolist())
+    couleurs = [couleur_repere(e, c) if e is not None else BLANC for e, c in zip(repere.tolist(), cycle.tolist())]
+    return latin1(colonnes), couleurs
+
+
+def couleurs_phases(activites):
+    act = pd.Series(activites, dtype=object).astype(str).str.upper()
+    conditions = [act.str.contains(cle, regex=False).to_numpy() for cle, _ in PHASE_COLORS]
+    indices = np.select(conditions, np.arange(len(PHASE_COLORS)), default=-1)
+    return [PHASE_COLORS[k][1] if k >= 0 else BLANC for k in indices.tolist()]
+
+
+# --- EMISSION COMMUNE DES TABLEAUX ---
+class TableauPDFMixin:
+    def emettre_tableau(self, entetes, largeurs, colonnes, hauteur=6, marge=20, couleur_entete=(220, 230, 255),
+                        police_entete=("B", 9), police=("", 8), couleurs=None, aligns=None):
+        """Dessine un tableau à partir de colonnes de textes prêts.
+
+        `couleurs` (une couleur de fond par ligne) active le remplissage des cellules.
+        """
+        nb = len(colonnes[0]) if colonnes else 0
+        if nb == 0:
+            return
+        aligns = aligns or ["C"] * len(largeurs)
+        self.set_font("helvetica", *police_entete)
+
+        estimated_height = 8 + (nb * hauteur) + 5
+        if estimated_height < (self.h - 30) and (self.get_y() + estimated_height) > (self.h - marge):
+            self.add_page()
+
+        self.set_fill_color(*couleur_entete)
+        for titre, w in zip(entetes, largeurs):
+            self.cell(w, 8, titre, border=1, fill=True, align="C")
+        self.ln()
+
+        self.set_font("helvetica", *police)
+        remplir = couleurs is not None
+        bas = self.h - marge
+        cellules = list(zip(largeurs, aligns))
+        courante = None
+        for i, ligne in enumerate(zip(*colonnes)):
+            if self.get_y() > bas:
+                self.add_page()
+                courante = None
+            if remplir and couleurs[i] != courante:
+                courante = couleurs[i]
+                self.set_fill_color(*courante)
+            for (w, align), val in zip(cellules, ligne):
+                self.cell(w, hauteur, val, border=1, align=align, fill=remplir)
+            self.ln()
+        self.ln(5)
+
+    def dessiner_tableau(self, df):
+        if df is None or df.empty: return
+        cols = list(df.columns)
+        col_width = (self.w - 20) / len(cols)
+        self.emettre_tableau([str(c) for c in cols], [col_width] * len(cols), cellules_tableau(df))
+
+
+# --- FONCTION TECHNIQUE POUR LE RENDU PDF STANDARD (PLANNING / PATCH) ---
+class FestivalPDF(TableauPDFMixin, FPDF):
+    def __init__(self, *args, festival_name="", festival_logo=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.festival_name = festival_name
+        # Logo normalisé une fois par document : fpdf l'embarque une seule fois et le référence sur chaque page
+        self.festival_logo = preparer_logo(festival_logo)
+        self.date_generation = horodatage()
+        self.set_creation_date(self.date_generation)
+
+    def header(self):
+        if self.festival_logo:
+            self.image(self.festival_logo, 10, 8, 33)
+
+        self.set_font("helvetica", "B", 15)
+        offset_x = 45 if self.festival_logo else 10
+        self.set_xy(offset_x, 10)
+        self.cell(0, 10, self.festival_name.upper(), ln=1)
+
+        self.set_font("helvetica", "I", 8)
+        self.set_xy(offset_x, 18)
+        self.cell(0, 5, f"Généré le {self.date_generation.strftime('%d/%m/%Y à %H:%M')}", ln=1)
+        self.ln(10)
+
+    def ajouter_titre_section(self, titre):
+        self.set_font("helvetica", "B", 12)
+        self.set_fill_color(240, 240, 240)
+        self.cell(0, 10, titre, ln=True, fill=True, border="B")
+        self.ln(2)
+
+    def dessiner_texte(self, texte):
+        self.set_font("helvetica", "", 10)
+        val = str(texte).encode('latin-1', 'replace').decode('latin-1')
+        self.multi_cell(0, 6, val)
+        self.ln(5)
+
+    def dessiner_planning_grille(self, df_grid):
+        if df_grid.empty: return
+        col_w = [25, 25, 45, self.w - 20 - 95]
+        headers = ["DÉBUT", "FIN", "PHASE", "ARTISTE"]
+        deb = df_grid['Heure Début'].astype(str).tolist()
+        fin = df_grid['Heure Fin'].astype(str).tolist()
+        act = df_grid['Activité'].astype(str).tolist()
+        art = ["  " + a for a in latin1([df_grid['Artiste'].astype(str).tolist()])[0]]
+
+        self.set_text_color(0, 0, 0)
+        self.emettre_tableau(headers, col_w, [deb, fin, act, art], hauteur=7, marge=15, couleur_entete=(200, 200, 200),
+                             police_entete=("B", 10), police=("B", 9), couleurs=couleurs_phases(act), aligns=["C", "C", "C", "L"])
+
+    def dessiner_tableau_patch(self, df):
+        if df.empty: return
+        cols = list(df.columns)
+        col_width = (self.w - 20) / len(cols)
+        colonnes, couleurs = cellules_patch(df)
+        self.emettre_tableau([str(c) for c in cols], [col_width] * len(cols), colonnes, couleurs=couleurs)
+
+
+# --- NOUVELLE CLASSE EXCLUSIVE POUR L'EXPORT "BESOINS" (Mise en page demandée) ---
+class BesoinsPDF(TableauPDFMixin, FPDF):
+    def __init__(self, *args, festival_name="", festival_logo=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.festival_name = festival_name
+        # Logo normalisé une fois par document : fpdf l'embarque une seule fois et le référence sur chaque page
+        self.festival_logo = preparer_logo(festival_logo)
+        self.date_generation = horodatage()
+        self.set_creation_date(self.date_generation)
+
+    def header(self):
+        # 1. Image du festival en haut a gauche
+        if self.festival_logo:
+            self.image(self.festival_logo, 10, 8, 33)
+
+        # 2. Nom du festival + date de génération centrée
+        self.set_font("helvetica", "B", 15)
+        self.cell(0, 6, self.festival_name.upper(), ln=1, align='C')
+        self.set_font("helvetica", "I", 10)
+        self.cell(0, 6, f"Généré le {self.date_generation.strftime('%d/%m/%Y à %H:%M')}", ln=1, align='C')
+        self.ln(10)
+
+
+def generer_pdf_besoins_custom(titre_doc, arts_infos, besoins_cats, festival_name="", festival_logo=None):
+    pdf = BesoinsPDF(orientation='P', unit='mm', format='A4', festival_name=festival_name, festival_logo=festival_logo)
+    pdf.add_page()
+    
+    # 3. BESOINS (Nom STAGE + période) centré avec trait 
+    pdf.ln(5)
+    pdf.set_draw_color(0, 0, 0)
+    pdf.set_line_width(0.5)
+    pdf.line(10, pdf.get_y(), pdf.w - 10, pdf.get_y())
+    pdf.ln(4)
+    pdf.set_font("helvetica", "B", 16)
+    pdf.cell(0, 10, titre_doc.upper(), ln=1, align='C')
+    pdf.ln(1)
+    pdf.line(10, pdf.get_y(), pdf.w - 10, pdf.get_y())
+    pdf.ln(10)
+
+    # 4. INFORMATION TECHNIQUE 
+    pdf.set_font("helvetica", "B", 14)
+    pdf.cell(0, 10, "INFORMATION TECHNIQUE", ln=1, align='L')
+    pdf.ln(3)
+
+    for art, info in arts_infos.items():
+        if pdf.get_y() > (pdf.h - 40): pdf.add_page()
+
+        # 4-X Groupe X dans un cadre avec un fond de couleur pale
+        pdf.set_font("helvetica", "B", 12)
+        pdf.set_fill_color(240, 248, 255) # Couleur pale (AliceBlue)
+        pdf.cell(0, 10, str(art), ln=1, align='C', fill=True, border=1)
+        pdf.ln(3)
+
+        # 4-X-1 Contact
+        if info.get("Contacts"):
+            pdf.set_font("helvetica", "B", 10)
+            pdf.cell(0, 6, "Contacts :", ln=1)
+            pdf.set_font("helvetica", "", 9)
+            val = str(info["Contacts"]).encode('latin-1', 'replace').decode('latin-1')
+            pdf.multi_cell(0, 5, val)
+            pdf.ln(2)
+
+        # 4-X-2 Configuration circuits
+        if info.get("Circuits") is not None and not info["Circuits"].empty:
+            pdf.set_font("helvetica", "B", 10)
+            pdf.cell(0, 6, "Configuration circuits :", ln=1)
+            pdf.dessiner_tableau(info["Circuits"])
+
+        # Alimentation 
+        if info.get("Alim") is not None and not info["Alim"].empty:
+            pdf.set_font("helvetica", "B", 10)
+            pdf.cell(0, 6, "Alimentation électrique :", ln=1)
+            pdf.dessiner_tableau(info["Alim"])
+
+        # 4-X-3 Informations complémentaire
+        if info.get("Notes"):
+            pdf.set_font("helvetica", "B", 10)
+            pdf.cell(0, 6, "Informations complémentaires :", ln=1)
+            pdf.set_font("helvetica", "", 9)
+            val = str(info["Notes"]).encode('latin-1', 'replace').decode('latin-1')
+            pdf.multi_cell(0, 5, val)
+            pdf.ln(2)
+
+        pdf.ln(5)
+
+    # 5. BESOINS TECHNIQUE 
+    if pdf.get_y() > (pdf.h - 30): pdf.add_page()
+    pdf.set_font("helvetica", "B", 14)
+    pdf.cell(0, 10, "BESOINS TECHNIQUE", ln=1, align='L')
+    pdf.ln(3)
+
+    for cat, df_cat in besoins_cats.items():
+        if pdf.get_y() > (pdf.h - 30): pdf.add_page()
+        pdf.set_font("helvetica", "B", 11)
+        pdf.set_fill_color(230, 230, 230)
+        pdf.cell(0, 8, f"CATÉGORIE : {cat}", ln=1, fill=True)
+        pdf.dessiner_tableau(df_cat)
+
+    out = pdf.output(dest='S')
+    return out.encode('latin-1') if isinstance(out, str) else bytes(out)
+
+def generer_pdf_complet(titre_doc, dictionnaire_dfs, orientation='P', format='A4', is_planning=False, festival_name="", festival_logo=None):
+    pdf = FestivalPDF(orientation=orientation, unit='mm', format=format, festival_name=festival_name, festival_logo=festival_logo)
+    pdf.add_page()
+    pdf.set_font("helvetica", "B", 16)
+    pdf.cell(0, 10, titre_doc, ln=True, align='C')
+    pdf.ln(5)
+    
+    for section, data in dictionnaire_dfs.items():
+        if isinstance(data, pd.DataFrame):
+            if not data.empty:
+                if pdf.get_y() > (pdf.h - 30): pdf.add_page()
+                pdf.ajouter_titre_section(section)
+                if is_planning:
+                    pdf.dessiner_planning_grille(data)
+                else:
+                    pdf.dessiner_tableau(data)
+        elif isinstance(data, str) and data.strip():
+            if pdf.get_y() > (pdf.h - 30): pdf.add_page()
+            pdf.ajouter_titre_section(section)
+            pdf.dessiner_texte(data)
+            
+    out = pdf.output(dest='S')
+    return out.encode('latin-1') if isinstance(out, str) else bytes(out)
+
+def generer_pdf_patch(titre_doc, dictionnaire_dfs, festival_name="", festival_logo=None):
+    pdf = FestivalPDF(orientation='L', unit='mm', format='A4', festival_name=festival_name, festival_logo=festival_logo)
+    pdf.add_page()
+    pdf.set_font("helvetica", "B", 16)
+    pdf.cell(0, 10, titre_doc, ln=True, align='C')
+    pdf.ln(5)
+    
+    for section, data in dictionnaire_dfs.items():
+        if isinstance(data, pd.DataFrame):
+            if not data.empty:
+                if pdf.get_y() > (pdf.h - 30): pdf.add_page()
+                pdf.ajouter_titre_section(section)
+                pdf.dessiner_tableau_patch(data)
+        elif isinstance(data, str) and data.strip():
+            if pdf.get_y() > (pdf.h - 30): pdf.add_page()
+            pdf.ajouter_titre_section(section)
+            pdf.dessiner_texte(data)
+            
+    out = pdf.output(dest='S')
+    return out.encode('latin-1') if isinstance(out, str) else bytes(out)
@@ -0,0 +1,174 @@
+import io
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from regie.demarrage import disponible, mesure_imports
+from regie.horaires import DEBUT_JOURNEE, PHASES, minutes_vers_texte, phases_longues
+
+# --- FILET DE SÉCURITÉ POUR MATPLOTLIB (EXPORT PDF VISUEL) ---
+# matplotlib (~0,6 s) et pypdf ne sont importés qu'au premier rendu : la présence du module
+# suffit à afficher les boutons d'export.
+MATPLOTLIB_AVAILABLE = disponible("matplotlib")
+
+# --- PYPDF (OPTIONNEL) : ASSEMBLAGE DES PAGES RENDUES EN PARALLÈLE ---
+PYPDF_AVAILABLE = disponible("pypdf")
+
+
+def _pyplot():
+    with mesure_imports("matplotlib.pyplot"):
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    return plt
+
+
+# --- GRILLE HORAIRE (UNE LIGNE PAR PHASE) ---
+def build_planning_grid(df_scene, debut=DEBUT_JOURNEE):
+    ev = phases_longues(df_scene, debut)
+    if ev.empty:
+        return pd.DataFrame(columns=["Heure Début", "Heure Fin", "Activité", "Artiste"])
+    ev = ev.sort_values(by=["Début", "Fin", "_ligne", "_ordre"], kind="stable")
+    return pd.DataFrame({
+        "Heure Début": minutes_vers_texte(ev["Début"], debut).to_numpy(),
+        "Heure Fin": minutes_vers_texte(ev["Fin"], debut).to_numpy(),
+        "Activité": ev["Phase"].to_numpy(),
+        "Artiste": ev["Artiste"].to_numpy(),
+    })
+
+
+# --- PLANNING VISUEL (MATPLOTLIB) ---
+# Une page = une ou plusieurs scènes côte à côte sur un axe horaire vertical commun. Chaque
+# phase est une seule PolyCollection (toutes ses barres en un appel, comme broken_barh mais
+# en colonnes verticales). Les pages gardent exactement le format papier demandé.
+FORMATS_PAPIER = {"A4": (8.27, 11.69), "A3": (11.69, 16.54), "A2": (16.54, 23.39)}
+Page = namedtuple("Page", ["titre", "scenes", "format", "orientation"])
+
+
+def _evenements(df_scene, debut):
+    """Phases d'une scène triées par ligne puis phase, en heures depuis minuit (au-delà de 24 la nuit)."""
+    ev = phases_longues(df_scene, debut).sort_values(by=["_ligne", "_ordre"])
+    return pd.DataFrame({
+        "Artiste": ev["Artiste"].to_numpy(),
+        "Phase": ev["Phase"].to_numpy(),
+        "start": (ev["Début"].to_numpy(dtype=float) + debut) / 60.0,
+        "end": (ev["Fin"].to_numpy(dtype=float) + debut) / 60.0,
+    })
+
+
+def _dessiner_scene(ax, ev, sous_titre=None, compact=False):
+    from matplotlib.collections import PolyCollection
+    artistes = list(dict.fromkeys(ev["Artiste"]))
+    x = pd.Categorical(ev["Artiste"], categories=artistes).codes.astype(float)
+    start, end = ev["start"].to_numpy(), ev["end"].to_numpy()
+    for nom, _, _, couleur in PHASES:
+        m = (ev["Phase"] == nom).to_numpy()
+        if not m.any():
+            continue
+        x0, x1, y0, y1 = x[m] - 0.4, x[m] + 0.4, start[m], end[m]
+        rectangles = np.stack([np.column_stack([x0, y0]), np.column_stack([x1, y0]), np.column_stack([x1, y1]), np.column_stack([x0, y1])], axis=1)
+        ax.add_collection(PolyCollection(rectangles, facecolors=couleur, edgecolors="white", linewidths=1))
+    for xi, y, h, phase in zip(x, start, end - start, ev["Phase"]):
+        ax.text(xi, y + h / 2, phase, ha='center', va='center', color='white', fontsize=7 if compact else 10, fontweight='bold', clip_on=True)
+
+    ax.set_xticks(range(len(artistes)))
+    incline = compact or len(artistes) > 8
+    ax.set_xticklabels(artistes, fontsize=9 if incline else 12, fontweight='bold', rotation=45 if incline else 0, ha="right" if incline else "center")
+    ax.set_xlim(-0.5, len(artistes) - 0.5)
+    ax.grid(axis='y', linestyle='-', color='#ecf0f1', alpha=0.7)
+    if sous_titre:
+        ax.set_title(sous_titre, fontsize=14, fontweight='bold')
+
+
+def _figure_page(page):
+    largeur, hauteur = FORMATS_PAPIER[page.format]
+    if page.orientation == "L":
+        largeur, hauteur = hauteur, largeur
+    ratios = [max(1, ev["Artiste"].nunique()) for _, ev in page.scenes]
+    fig, axes = _pyplot().subplots(1, len(page.scenes), figsize=(largeur, hauteur), sharey=True, squeeze=False, gridspec_kw={"width_ratios": ratios})
+    for ax, (sous_titre, ev) in zip(axes[0], page.scenes):
+        _dessiner_scene(ax, ev, sous_titre, compact=len(page.scenes) > 1)
+
+    tous = pd.concat([ev for _, ev in page.scenes])
+    min_hour = np.floor(tous["start"].min())
+    max_hour = np.ceil(tous["end"].max())
+    if max_hour <= min_hour: max_hour = min_hour + 1
+    y_ticks = np.arange(min_hour, max_hour + 0.25, 0.25)
+    axes[0][0].set_yticks(y_ticks)
+    axes[0][0].set_yticklabels(minutes_vers_texte(pd.Series(np.round(y_ticks * 60).astype(int)), 0).tolist())
+    axes[0][0].set_ylim(max_hour, min_hour)
+    axes[0][0].set_ylabel("Heure", fontsize=12)
+
+    from matplotlib.lines import Line2D
+    presentes = set(tous["Phase"])
+    legend_elements = [Line2D([0], [0], color=c, lw=6, label=p) for p, _, _, c in PHASES if p in presentes]
+    fig.suptitle(page.titre, fontsize=18, fontweight='bold')
+    fig.legend(handles=legend_elements, title="Phases", loc="upper center", ncol=len(legend_elements), bbox_to_anchor=(0.5, 0.97))
+    fig.tight_layout(rect=(0, 0, 1, 0.93))
+    return fig
+
+
+def _rendre_page(page):
+    fig = _figure_page(page)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="pdf")
+    _pyplot().close(fig)
+    return buf.getvalue()
+
+
+# --- HELPER POUR LE PLANNING VISUEL (A3 PORTRAIT) ---
+def generer_pdf_planning_visuel(df_scene, titre, debut=DEBUT_JOURNEE):
+    if not MATPLOTLIB_AVAILABLE: return None
+    ev = _evenements(df_scene, debut)
+    if ev.empty: return None
+    return _rendre_page(Page(titre, [(None, ev)], "A3", "P"))
+
+
+# --- PLANNINGS MURAUX (PDF MULTI-PAGES) ---
+def pages_planning_mural(journees, mode="jour", format="A3", debut=DEBUT_JOURNEE):
+    """Pages d'un planning mural. `journees` : liste (jour, scène, lignes du planning) dans l'ordre voulu.
+
+    mode "jour" : une page paysage par jour, toutes ses scènes côte à côte ;
+    mode "scene" : une page portrait par (jour, scène).
+    """
+    pages = []
+    par_jour = {}
+    for jour, scene, df in journees:
+        ev = _evenements(df, debut)
+        if ev.empty:
+            continue
+        if mode == "scene":
+            pages.append(Page(f"Planning Vertical {scene} - {jour}", [(None, ev)], format, "P"))
+        else:
+            par_jour.setdefault(jour, []).append((scene, ev))
+    for jour, scenes in par_jour.items():
+        pages.append(Page(f"Planning Vertical - {jour}", scenes, format, "L" if len(scenes) > 1 else "P"))
+    return pages
+
+
+def generer_pdf_planning_mural(pages, pool=None):
+    """Toutes les pages dans un seul PDF.
+
+    Avec `pool` (voir regie.lot.nouveau_pool) et pypdf, chaque page est rendue dans un processus
+    séparé puis les pages sont assemblées ; sinon elles sont rendues ici, l'une après l'autre, via PdfPages.
+    """
+    if not MATPLOTLIB_AVAILABLE or not pages: return None
+    buf = io.BytesIO()
+    if pool is not None and PYPDF_AVAILABLE and len(pages) > 1:
+        with mesure_imports("pypdf"):
+            from pypdf import PdfReader, PdfWriter
+        writer = PdfWriter()
+        for morceau in pool.map(_rendre_page, pages):
+            writer.append(PdfReader(io.BytesIO(morceau)))
+        # Les polices embarquées par chaque page sont identiques : une seule copie est gardée
+        writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+        writer.write(buf)
+    else:
+        from matplotlib.backends.backend_pdf import PdfPages
+        with PdfPages(buf) as pdf:
+            for page in pages:
+                fig = _figure_page(page)
+                pdf.savefig(fig)
+                _pyplot().close(fig)
+    return buf.getvalue()
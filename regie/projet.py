@@ -0,0 +1,301 @@
+import hashlib
+import io
+import json
+import pickle
+import warnings
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from regie.cache import empreinte
+from regie.horaires import DEBUT_JOURNEE
+from regie.patch import normaliser_patches
+from regie.schema import table_vide, typer
+
+
+# --- FORMAT PROJET (.regie) ---
+# Archive zip versionnée :
+#   manifest.json                     version, liste des sections, index des riders
+#   tables/<nom>.parquet              planning, fiches_tech, alim_elec
+#   <section>.json (+ <section>/*.parquet pour les DataFrames imbriqués)
+#   logo.bin, riders/<sha256>         blobs binaires, lus à la demande
+FORMAT = "regie-festival"
+FORMAT_VERSION = 1
+
+TABLES = ["planning", "fiches_tech", "alim_elec"]
+SECTIONS_JSON = {
+    "meta": ["festival_name", "fenetre_besoins", "debut_journee"],
+    "circuits": ["artist_circuits", "infra_scenes"],
+    "notes": ["notes_artistes"],
+    "contacts": ["contacts_festival", "contacts_scenes", "contacts_artistes"],
+    "catalogue": ["catalogue_version"],
+    "patches": ["patches_io", "patches_out"],
+}
+
+
+def _parquet(df):
+    buf = io.BytesIO()
+    try:
+        df.to_parquet(buf)
+    except (TypeError, ValueError):
+        # Colonnes object hétérogènes (ex. saisies libres) : on les fige en texte
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].map(lambda v: v if v is None or isinstance(v, (str, bool)) or pd.isna(v) else str(v))
+        buf = io.BytesIO()
+        df.to_parquet(buf)
+    return buf.getvalue()
+
+
+def _encoder(obj, tables, prefixe):
+    """Convertit une structure (dicts, listes, DataFrames) en JSON + tables Parquet annexes."""
+    if isinstance(obj, pd.DataFrame):
+        nom = f"{prefixe}/{len(tables):05d}.parquet"
+        tables[nom] = _parquet(obj)
+        return {"__table__": nom}
+    if isinstance(obj, dict):
+        if all(isinstance(k, str) for k in obj):
+            return {k: _encoder(v, tables, prefixe) for k, v in obj.items()}
+        return {"__paires__": [[_encoder(k, tables, prefixe), _encoder(v, tables, prefixe)] for k, v in obj.items()]}
+    if isinstance(obj, (list, tuple)):
+        return [_encoder(v, tables, prefixe) for v in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    return str(obj)
+
+
+def _decoder(obj, lire_table):
+    if isinstance(obj, dict):
+        if "__table__" in obj:
+            return lire_table(obj["__table__"])
+        if "__paires__" in obj:
+            return {_decoder(k, lire_table): _decoder(v, lire_table) for k, v in obj["__paires__"]}
+        return {k: _decoder(v, lire_table) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_decoder(v, lire_table) for v in obj]
+    return obj
+
+
+# --- ECRITURE INCREMENTALE ---
+class ProjetWriter:
+    """Assemble l'archive projet en ne re-sérialisant que les sections modifiées depuis la dernière sauvegarde."""
+
+    def __init__(self):
+        self._sections = {}
+        # Riders de la dernière sauvegarde absents du store (purgés, jamais importés) : (artiste, fichier)
+        self.absents = []
+
+    def _section(self, nom, source, serialiser):
+        cle = empreinte(nom, source)
+        precedent = self._sections.get(nom)
+        if precedent is None or precedent[0] != cle:
+            precedent = (cle, serialiser())
+            self._sections[nom] = precedent
+        return precedent[1]
+
+    def ecrire(self, etat, store=None):
+        """`riders_stockage` contient soit des octets, soit des SHA-256 du `store` (RiderStore).
+
+        Un rider absent du store est laissé hors de l'archive (avertissement, voir `absents`)
+        plutôt que de faire échouer toute la sauvegarde.
+        """
+        fichiers = {}
+        manifest = {"format": FORMAT, "version": FORMAT_VERSION, "tables": {}, "sections": {}, "riders": {}, "logo": None}
+
+        for nom in TABLES:
+            df = etat.get(nom)
+            if df is None:
+                continue
+            chemin = f"tables/{nom}.parquet"
+            fichiers[chemin] = self._section(nom, df, lambda df=df: _parquet(df))
+            manifest["tables"][nom] = chemin
+
+        for nom, cles in SECTIONS_JSON.items():
+            source = {k: etat.get(k) for k in cles}
+
+            def serialiser(source=source, nom=nom):
+                annexes = {}
+                doc = json.dumps(_encoder(source, annexes, nom), ensure_ascii=False).encode("utf-8")
+                return doc, annexes
+
+            doc, annexes = self._section(nom, source, serialiser)
+            fichiers[f"{nom}.json"] = doc
+            fichiers.update(annexes)
+            manifest["sections"][nom] = f"{nom}.json"
+
+        if etat.get("festival_logo"):
+            fichiers["logo.bin"] = etat["festival_logo"]
+            manifest["logo"] = "logo.bin"
+
+        blobs = {}
+        self.absents = []
+        for artiste, docs in (etat.get("riders_stockage") or {}).items():
+            manifest["riders"][artiste] = {}
+            for nom_fichier, ref in docs.items():
+                if isinstance(ref, str):
+                    sha = ref
+                    if store is None or not store.existe(sha):
+                        self.absents.append((artiste, nom_fichier))
+                        continue
+                    blobs[f"riders/{sha}"] = store.chemin(sha)
+                else:
+                    sha = hashlib.sha256(ref).hexdigest()
+                    fichiers[f"riders/{sha}"] = ref
+                manifest["riders"][artiste][nom_fichier] = sha
+
+        if self.absents:
+            warnings.warn("Riders absents du stockage, non sauvegardés : " + ", ".join(f"{a} / {f}" for a, f in self.absents), stacklevel=2)
+
+        out = io.BytesIO()
+        with zipfile.ZipFile(out, "w") as zf:
+            zf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=1), compress_type=zipfile.ZIP_DEFLATED)
+            for chemin, data in fichiers.items():
+                compression = zipfile.ZIP_DEFLATED if chemin.endswith(".json") else zipfile.ZIP_STORED
+                zf.writestr(chemin, data, compress_type=compression)
+            # Les riders du store sont recopiés par flux depuis le disque
+            for chemin, source in blobs.items():
+                if chemin not in fichiers:
+                    zf.write(source, chemin, compress_type=zipfile.ZIP_STORED)
+        return out.getvalue()
+
+
+# --- LECTURE PARTIELLE ---
+class ProjetArchive:
+    """Lecture d'une archive projet : les tables et sections sont lues à la demande, les riders un par un."""
+
+    def __init__(self, fichier):
+        self._zip = zipfile.ZipFile(fichier)
+        # Riders du manifeste écartés à la lecture (absents ou contenu différent de leur SHA) : (artiste, fichier)
+        self.riders_ecartes = []
+        try:
+            self.manifest = json.loads(self._zip.read("manifest.json"))
+        except KeyError:
+            raise ValueError("Archive projet invalide (manifest.json absent).")
+        if self.manifest.get("format") != FORMAT:
+            raise ValueError("Ce fichier n'est pas un projet Regie-Festival.")
+        if self.manifest.get("version", 0) > FORMAT_VERSION:
+            raise ValueError(f"Projet enregistré avec une version plus récente du format ({self.manifest['version']}).")
+
+    @property
+    def version(self):
+        return self.manifest.get("version")
+
+    def _lire_table(self, chemin):
+        return pd.read_parquet(io.BytesIO(self._zip.read(chemin)))
+
+    def lire_tables(self, noms=None):
+        noms = TABLES if noms is None else noms
+        return {n: self._lire_table(c) for n, c in self.manifest["tables"].items() if n in noms}
+
+    def lire_section(self, nom):
+        chemin = self.manifest["sections"].get(nom)
+        if chemin is None:
+            return {}
+        return _decoder(json.loads(self._zip.read(chemin)), self._lire_table)
+
+    def index_riders(self):
+        return self.manifest.get("riders", {})
+
+    def lire_rider(self, sha):
+        data = self._zip.read(f"riders/{sha}")
+        if hashlib.sha256(data).hexdigest() != sha:
+            raise ValueError(f"Contenu du rider différent de son empreinte annoncée : {sha[:12]}")
+        return data
+
+    def ouvrir_rider(self, sha):
+        return self._zip.open(f"riders/{sha}")
+
+    def _garder_riders(self, index, verifies):
+        """Index restreint aux SHA vérifiés ; les autres riders sont notés dans `riders_ecartes`."""
+        self.riders_ecartes = [(a, f) for a, docs in index.items() for f, sha in docs.items() if sha not in verifies]
+        if self.riders_ecartes:
+            warnings.warn("Riders altérés ou absents de l'archive, écartés : " + ", ".join(f"{a} / {f}" for a, f in self.riders_ecartes), stacklevel=3)
+        return {a: {f: verifies[sha] for f, sha in docs.items() if sha in verifies} for a, docs in index.items()}
+
+    def importer_riders(self, store):
+        """Verse les riders dans le store ; retourne l'index artiste -> fichier -> SHA-256 vérifié.
+
+        Chaque rider est relu et haché, même si le store possède déjà un blob de ce nom : un
+        membre dont le contenu ne correspond pas au SHA du manifeste est écarté.
+        """
+        verifies = {}
+        for sha in {sha for docs in self.index_riders().values() for sha in docs.values()}:
+            try:
+                with self.ouvrir_rider(sha) as flux:
+                    verifies[sha] = store.ajouter_flux(flux, attendu=sha)
+            except (KeyError, ValueError):
+                continue
+        return self._garder_riders(self.index_riders(), verifies)
+
+    def lire_logo(self):
+        chemin = self.manifest.get("logo")
+        return self._zip.read(chemin) if chemin else None
+
+    def charger(self, riders=True):
+        """Etat complet (mêmes clés que la session). Sans `riders`, les PDF restent dans l'archive (voir lire_rider)."""
+        etat = dict(self.lire_tables())
+        for nom in SECTIONS_JSON:
+            etat.update(self.lire_section(nom))
+        etat["festival_logo"] = self.lire_logo()
+        if riders:
+            contenus = {}
+            for sha in {sha for docs in self.index_riders().values() for sha in docs.values()}:
+                try:
+                    contenus[sha] = self.lire_rider(sha)
+                except (KeyError, ValueError):
+                    continue
+            etat["riders_stockage"] = self._garder_riders(self.index_riders(), contenus)
+        return etat
+
+    def close(self):
+        self._zip.close()
+
+
+def est_archive_projet(data):
+    return data[:4] == b"PK\x03\x04"
+
+
+def charger_pickle_legacy(data):
+    # Ancien format .pkl : à n'utiliser que pour ses propres sauvegardes (pickle exécute du code)
+    return pickle.loads(data)
+
+
+# --- ÉTAT COMPLET (SESSION OU EXPORT HORS LIGNE) ---
+def _defaut(valeur, defaut):
+    # Pas de `valeur or defaut` : les contacts édités sont des DataFrames (vérité ambiguë)
+    return defaut if valeur is None else valeur
+
+
+def normaliser_etat(data):
+    """Projet chargé (archive ou ancien pickle) -> toutes les clés de la session, tables typées.
+
+    Les riders sont repris tels quels (SHA-256 ou octets des anciennes sauvegardes). Le catalogue
+    n'est qu'une référence (catalogue_version) ; celui des anciennes sauvegardes est gardé à part
+    (custom_catalog, easyjob_mapping) pour être versé dans le registre. Les patchs IN sont
+    ramenés au format canonique (regie.patch.normaliser_patches).
+    """
+    debut = int(_defaut(data.get("debut_journee"), DEBUT_JOURNEE))
+    return {
+        "debut_journee": debut,
+        "planning": typer("planning", data["planning"], debut),
+        "fiches_tech": typer("fiches_tech", data["fiches_tech"]),
+        "alim_elec": typer("alim_elec", data["alim_elec"]) if data.get("alim_elec") is not None else table_vide("alim_elec"),
+        "riders_stockage": _defaut(data.get("riders_stockage"), {}),
+        "artist_circuits": _defaut(data.get("artist_circuits"), {}),
+        "infra_scenes": _defaut(data.get("infra_scenes"), {}),
+        "patches_io": normaliser_patches(_defaut(data.get("patches_io"), {})),
+        "patches_out": _defaut(data.get("patches_out"), {}),
+        "festival_name": data.get("festival_name") or "Mon Festival",
+        "festival_logo": data.get("festival_logo", None),
+        "catalogue_version": data.get("catalogue_version"),
+        "custom_catalog": _defaut(data.get("custom_catalog"), {}),
+        "easyjob_mapping": _defaut(data.get("easyjob_mapping"), {}),
+        "notes_artistes": _defaut(data.get("notes_artistes"), {}),
+        "fenetre_besoins": _defaut(data.get("fenetre_besoins"), 2),
+        "contacts_festival": _defaut(data.get("contacts_festival"), {}),
+        "contacts_scenes": _defaut(data.get("contacts_scenes"), {}),
+        "contacts_artistes": _defaut(data.get("contacts_artistes"), {}),
+    }
@@ -0,0 +1,122 @@
+import hashlib
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+import numpy as np
+
+
+# --- INDEX DE RECHERCHE DU CATALOGUE ---
+# Construit une fois par catalogue : une fiche (catégorie, marque, modèle) par référence, avec
+# un identifiant stable (hash du triplet), et un index des mots normalisés (minuscules, sans
+# accents ni ponctuation). Un mot de la requête trouve les mots qui commencent par lui
+# (recherche dichotomique dans la liste triée) et, à partir de 4 lettres, ceux à une faute de
+# frappe près (table des variantes à une lettre supprimée). Tous les mots de la requête
+# doivent être trouvés ; les meilleures fiches sont classées par score.
+MIN_FAUTE = 4
+# Score d'un mot trouvé : exact > début de mot > une faute ; bonus s'il est dans le modèle
+SCORES = {"exact": 3.0, "prefixe": 2.0, "faute": 1.0}
+BONUS_MODELE = 1.0
+
+
+def normaliser(texte):
+    t = unicodedata.normalize("NFKD", str(texte))
+    t = "".join(c for c in t if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^0-9a-z]+", " ", t).strip()
+
+
+def id_article(categorie, marque, modele):
+    return hashlib.sha1(f"{categorie}\x1f{marque}\x1f{modele}".encode("utf-8")).hexdigest()[:12]
+
+
+def _suppressions(mot):
+    return {mot[:i] + mot[i + 1:] for i in range(len(mot))}
+
+
+class IndexCatalogue:
+    def __init__(self, catalogue):
+        fiches = [(str(c), str(m), str(mod)) for c, marques in catalogue.items() for m, modeles in marques.items()
+                  for mod in modeles if not str(mod).startswith("//") and not str(mod).startswith("🔹")]
+        # Une référence présente deux fois dans une liste n'est gardée qu'une fois
+        self.fiches = list(dict.fromkeys(fiches))
+        self.ids = [id_article(*f) for f in self.fiches]
+        self._par_id = {i: k for k, i in enumerate(self.ids)}
+
+        postings = defaultdict(set)
+        dans_modele = defaultdict(set)
+        for k, (c, m, mod) in enumerate(self.fiches):
+            for mot in normaliser(mod).split():
+                postings[mot].add(k)
+                dans_modele[mot].add(k)
+            for mot in normaliser(f"{m} {c}").split():
+                postings[mot].add(k)
+        self.mots = sorted(postings)
+        self._postings = [np.fromiter(sorted(postings[w]), dtype=np.int32) for w in self.mots]
+        self._modele = [np.fromiter(sorted(dans_modele.get(w, ())), dtype=np.int32) for w in self.mots]
+        self._variantes = defaultdict(set)
+        for j, mot in enumerate(self.mots):
+            if len(mot) >= MIN_FAUTE:
+                for v in _suppressions(mot):
+                    self._variantes[v].add(j)
+
+    def __len__(self):
+        return len(self.fiches)
+
+    def fiche(self, id_):
+        """(catégorie, marque, modèle) d'un identifiant, None s'il n'existe plus."""
+        k = self._par_id.get(id_)
+        return None if k is None else self.fiches[k]
+
+    def libelle(self, id_):
+        f = self.fiche(id_)
+        return "" if f is None else f"{f[2]} ({f[1]} - {f[0]})"
+
+    def _prefixes(self, debut):
+        j = bisect_left(self.mots, debut)
+        while j < len(self.mots) and self.mots[j].startswith(debut):
+            yield j
+            j += 1
+
+    def _mots_proches(self, mot):
+        """Indices des mots de l'index qui correspondent à `mot`, avec leur type de correspondance."""
+        trouves = {j: "exact" if self.mots[j] == mot else "prefixe" for j in self._prefixes(mot)}
+        if len(mot) >= MIN_FAUTE:
+            for v in _suppressions(mot):
+                # Lettre en trop ou remplacée dans la requête, y compris sur un début de mot
+                for j in self._prefixes(v):
+                    trouves.setdefault(j, "faute")
+            for v in _suppressions(mot) | {mot}:
+                # Lettre oubliée ou remplacée dans la requête (mot complet)
+                for j in self._variantes.get(v, ()):
+                    trouves.setdefault(j, "faute")
+        return trouves
+
+    def chercher(self, requete, n=20):
+        """Identifiants des `n` meilleures fiches pour `requete` (tous les mots doivent correspondre)."""
+        mots = normaliser(requete).split()
+        if not mots or not self.fiches:
+            return []
+        score = None
+        for mot in dict.fromkeys(mots):
+            s = np.zeros(len(self.fiches))
+            par_genre = defaultdict(list)
+            for j, genre in self._mots_proches(mot).items():
+                par_genre[genre].append(j)
+            # Un appel par genre : meilleure correspondance du mot pour chaque fiche
+            for genre, js in par_genre.items():
+                np.maximum.at(s, np.concatenate([self._postings[j] for j in js]), SCORES[genre])
+                np.maximum.at(s, np.concatenate([self._modele[j] for j in js]), SCORES[genre] + BONUS_MODELE)
+            if not s.any():
+                return []
+            score = s if score is None else np.where((score > 0) & (s > 0), score + s, 0)
+        candidats = np.flatnonzero(score > 0)
+        if len(candidats) == 0:
+            return []
+        if len(candidats) > n:
+            seuil = np.partition(score[candidats], -n)[-n]
+            candidats = candidats[score[candidats] >= seuil]
+        # Score décroissant, puis modèle le plus court, puis ordre alphabétique du libellé
+        cles = sorted(candidats, key=lambda k: (-score[k], len(self.fiches[k][2]), self.fiches[k][2].lower(), self.fiches[k][1], self.fiches[k][0]))
+        return [self.ids[k] for k in cles[:n]]
+
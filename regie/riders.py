@@ -0,0 +1,79 @@
+import hashlib
+import os
+import tempfile
+
+
+# --- STOCKAGE DES RIDERS SUR DISQUE (ADRESSAGE PAR CONTENU) ---
+# Chaque PDF est rangé sous son SHA-256 : un même rider envoyé pour plusieurs dates
+# ou plusieurs artistes n'est écrit qu'une fois. La session ne garde que les hash.
+RACINE_DEFAUT = os.environ.get("REGIE_RIDERS_DIR", os.path.join(os.path.expanduser("~"), ".regie-festival", "riders"))
+
+_BLOC = 1024 * 1024
+
+
+class RiderStore:
+    def __init__(self, racine=RACINE_DEFAUT):
+        self.racine = racine
+        os.makedirs(self.racine, exist_ok=True)
+
+    def chemin(self, sha):
+        if len(sha) != 64 or any(c not in "0123456789abcdef" for c in sha):
+            raise ValueError(f"Empreinte de rider invalide : {sha!r}")
+        return os.path.join(self.racine, sha[:2], sha)
+
+    def existe(self, sha):
+        return os.path.exists(self.chemin(sha))
+
+    def taille(self, sha):
+        return os.path.getsize(self.chemin(sha))
+
+    def ajouter_flux(self, flux, attendu=None):
+        """Copie un fichier ouvert (upload, membre de zip) dans le store par blocs ; retourne son SHA-256.
+
+        Le nom du blob est toujours le hash des octets lus. `attendu` : SHA-256 annoncé par
+        l'appelant (manifeste d'un projet) ; un contenu qui ne lui correspond pas est refusé
+        (ValueError) sans rien écrire.
+        """
+        h = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=self.racine, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    bloc = flux.read(_BLOC)
+                    if not bloc:
+                        break
+                    h.update(bloc)
+                    out.write(bloc)
+            sha = h.hexdigest()
+            if attendu is not None and sha != attendu:
+                raise ValueError(f"Contenu du rider différent de son empreinte annoncée : {attendu[:12]}")
+            dest = self.chemin(sha)
+            if os.path.exists(dest):
+                os.unlink(tmp)
+            else:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.replace(tmp, dest)
+            return sha
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def ajouter(self, data):
+        sha = hashlib.sha256(data).hexdigest()
+        if not self.existe(sha):
+            dest = self.chemin(sha)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.racine, suffix=".part")
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(tmp, dest)
+        return sha
+
+    def lire(self, sha):
+        """Contenu du rider (téléchargement) ; les copies et exports passent par ouvrir() ou chemin()."""
+        with open(self.chemin(sha), "rb") as f:
+            return f.read()
+
+    def ouvrir(self, sha):
+        return open(self.chemin(sha), "rb")
@@ -0,0 +1,89 @@
+import pandas as pd
+
+from regie.horaires import COLS_PHASES, DEBUT_JOURNEE, minutes, minutes_vers_texte, normaliser_fins
+
+
+# --- SCHÉMA DES TABLES DE LA SESSION ---
+# Les textes répétés (scènes, jours, groupes, catalogue) sont stockés en catégories, les
+# quantités en int32, « Artiste apporte » en vrai booléen et les horaires du planning en
+# minutes Int16 depuis le début de journée (voir regie.horaires). `typer` est appliqué une fois
+# après chaque ajout ou suppression et après chaque chargement de projet ; une édition de
+# data_editor ne retype que les lignes touchées (regie.edition).
+
+COLS_PLANNING = ["Scène", "Jour", "Artiste"] + COLS_PHASES
+COLS_FICHES = ["Scène", "Jour", "Groupe", "Catégorie", "Marque", "Modèle", "Quantité", "Artiste_Apporte"]
+COLS_ALIM = ["Scène", "Jour", "Groupe", "Format", "Métier", "Emplacement"]
+
+SCHEMAS = {
+    "planning": {"colonnes": COLS_PLANNING, "categories": ["Scène", "Jour"], "entiers": [], "booleens": [], "minutes": COLS_PHASES},
+    "fiches_tech": {"colonnes": COLS_FICHES, "categories": ["Scène", "Jour", "Groupe", "Catégorie", "Marque", "Modèle"], "entiers": ["Quantité"], "booleens": ["Artiste_Apporte"], "minutes": []},
+    "alim_elec": {"colonnes": COLS_ALIM, "categories": ["Scène", "Jour", "Groupe", "Format", "Métier"], "entiers": [], "booleens": [], "minutes": []},
+}
+
+_VRAI = {"true", "1", "1.0", "oui", "x"}
+
+
+def table_vide(nom):
+    return typer(nom, pd.DataFrame(columns=SCHEMAS[nom]["colonnes"]))
+
+
+def _categorie(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype) and all(isinstance(c, str) for c in serie.cat.categories):
+        return serie
+    return serie.astype(str).where(serie.notna()).astype("category")
+
+
+def _entier(serie):
+    return pd.to_numeric(serie, errors="coerce").fillna(0).round().astype("int32")
+
+
+def _booleen(serie):
+    if serie.dtype == bool:
+        return serie
+    return serie.astype(str).str.strip().str.lower().isin(_VRAI)
+
+
+def conforme(nom, df):
+    schema = SCHEMAS[nom]
+    if any(c not in df.columns for c in schema["colonnes"]):
+        return False
+    return (all(isinstance(df[c].dtype, pd.CategoricalDtype) for c in schema["categories"])
+            and all(df[c].dtype == "int32" for c in schema["entiers"])
+            and all(df[c].dtype == bool for c in schema["booleens"])
+            and all(df[c].dtype == "Int16" for c in schema["minutes"]))
+
+
+def typer(nom, df, debut=DEBUT_JOURNEE):
+    """Table `nom` au schéma attendu ; retourne `df` lui-même s'il y est déjà (l'index reste valable).
+
+    `debut` (minutes après minuit) sert à lire les horaires "HH:MM" du planning.
+    """
+    if conforme(nom, df):
+        return df
+    schema = SCHEMAS[nom]
+    df = df.copy()
+    for col in schema["colonnes"]:
+        if col not in df.columns:
+            df[col] = None
+    for col in schema["categories"]:
+        df[col] = _categorie(df[col])
+    for col in schema["entiers"]:
+        df[col] = _entier(df[col])
+    for col in schema["booleens"]:
+        df[col] = _booleen(df[col])
+    for col in schema["minutes"]:
+        df[col] = minutes(df[col], debut)
+    return normaliser_fins(df) if schema["minutes"] else df
+
+
+def vers_editeur(df, debut=DEBUT_JOURNEE):
+    """Copie éditable : les catégories redeviennent du texte libre (data_editor les limiterait aux
+    valeurs existantes) et les horaires en minutes redeviennent des "HH:MM"."""
+    cats = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    heures = [c for c in df.columns if df[c].dtype == "Int16"]
+    if not cats and not heures:
+        return df
+    df = df.astype({c: object for c in cats})
+    for c in heures:
+        df[c] = minutes_vers_texte(df[c], debut)
+    return df
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from regie.demarrage import disponible, mesure_imports
+from regie.horaires import DEBUT_JOURNEE, PHASES, minutes_vers_texte, phases_longues
+
+# --- FILET DE SÉCURITÉ POUR PLOTLY (IMPORTÉ À LA PREMIÈRE FIGURE) ---
+PLOTLY_AVAILABLE = disponible("plotly")
+
+
+# --- TIMELINE FESTIVAL (TOUTES SCÈNES, TOUS JOURS) ---
+# Le planning est déplié une fois par version (une ligne par phase, horaires absolus en ms) ;
+# la figure trace ensuite une polyligne WebGL par phase : chaque barre est un segment
+# [début, fin] suivi d'un NaN, ce qui reste fluide avec plusieurs milliers de barres.
+COULEURS = {nom: couleur for nom, _, _, couleur in PHASES}
+_MS_MINUTE = 60_000
+
+
+def _origines(jours):
+    """Date (ms) de chaque jour ; les libellés qui ne sont pas des dates se suivent à partir du 1er janvier 2000."""
+    dates = pd.to_datetime(pd.Series(jours, dtype=object), errors="coerce")
+    secours = pd.Timestamp("2000-01-01") + pd.to_timedelta(np.arange(len(jours)), unit="D")
+    dates = dates.where(dates.notna(), pd.Series(secours))
+    return dates.to_numpy(dtype="datetime64[ms]").astype(np.int64)
+
+
+def donnees_timeline(planning, debut=DEBUT_JOURNEE):
+    """Une ligne par phase : Jour, Scène, Artiste, Phase, Texte, Début/Fin (ms epoch), Voie (rang de la scène)."""
+    ev = phases_longues(planning, debut)
+    if ev.empty:
+        return pd.DataFrame(columns=["Jour", "Scène", "Artiste", "Phase", "Texte", "Début", "Fin", "Voie"])
+    lignes = ev["_ligne"].to_numpy(dtype=np.intp)
+    jours = pd.Categorical(planning["Jour"].astype(str).to_numpy()[lignes])
+    scenes = pd.Categorical(planning["Scène"].astype(str).to_numpy()[lignes])
+    origine = _origines(list(jours.categories))[jours.codes] + debut * _MS_MINUTE
+    texte = (ev["Artiste"].astype(str) + " · " + ev["Phase"] + " " + minutes_vers_texte(ev["Début"], debut)
+             + "-" + minutes_vers_texte(ev["Fin"], debut) + " (" + scenes.astype(str) + ")")
+    return pd.DataFrame({
+        "Jour": jours,
+        "Scène": scenes,
+        "Artiste": ev["Artiste"].to_numpy(),
+        "Phase": ev["Phase"].to_numpy(),
+        "Texte": texte.to_numpy(),
+        "Début": origine + ev["Début"].to_numpy(dtype=np.int64) * _MS_MINUTE,
+        "Fin": origine + ev["Fin"].to_numpy(dtype=np.int64) * _MS_MINUTE,
+        "Voie": scenes.codes,
+    })
+
+
+def figure_timeline(donnees, jour=None, titre="Timeline Festival"):
+    """Figure Plotly (Scattergl) : une voie par scène, l'Inst Off Stage (hors plateau) en sous-voie."""
+    if not PLOTLY_AVAILABLE or donnees.empty:
+        return None
+    if jour is not None:
+        donnees = donnees[donnees["Jour"] == str(jour)]
+        if donnees.empty:
+            return None
+    with mesure_imports("plotly.graph_objects"):
+        import plotly.graph_objects as go
+    # Voies des seules scènes présentes (un jour n'occupe pas forcément toutes les scènes du festival)
+    presentes = donnees["Scène"].cat.remove_unused_categories()
+    scenes = list(presentes.cat.categories)
+    donnees = donnees.assign(Voie=presentes.cat.codes.to_numpy())
+    fig = go.Figure()
+    for nom, couleur in COULEURS.items():
+        sous = donnees[donnees["Phase"] == nom]
+        if sous.empty:
+            continue
+        n = len(sous)
+        x = np.column_stack([sous["Début"].to_numpy(), sous["Fin"].to_numpy(), np.full(n, np.nan)]).ravel()
+        voie = sous["Voie"].to_numpy(dtype=float) + (0.3 if nom == "Inst Off Stage" else 0.0)
+        y = np.column_stack([voie, voie, np.full(n, np.nan)]).ravel()
+        texte = np.repeat(sous["Texte"].to_numpy(), 3)
+        fig.add_trace(go.Scattergl(
+            x=x, y=y, mode="lines", name=nom, line=dict(color=couleur, width=6 if nom == "Inst Off Stage" else 16),
+            text=texte, hovertemplate="%{text}<extra></extra>", connectgaps=False
+        ))
+    fig.update_xaxes(type="date", tickformat="%H:%M\n%d/%m", rangeslider=dict(visible=True), title="Heure")
+    fig.update_yaxes(tickmode="array", tickvals=list(range(len(scenes))), ticktext=scenes,
+                     range=[len(scenes) - 0.5, -0.6], title="Scène")
+    fig.update_layout(title=titre, height=220 + 70 * len(scenes), hovermode="closest", legend=dict(orientation="h"))
+    return fig
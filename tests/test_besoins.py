@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from regie.besoins import BesoinsCache, besoins_jour_scene, besoins_periode, calcul_besoins, pics_fenetre
+from regie.schema import typer
+
+
+# --- RÉFÉRENCE : ANCIEN CALCUL ARTISTE PAR ARTISTE ---
+def pic_boucle(fiches, artistes, fenetre):
+    """Somme de chaque groupe de `fenetre` artistes consécutifs, maximum par item (ancien calcul de l'onglet Besoins)."""
+    mat = fiches.groupby(["Catégorie", "Marque", "Modèle", "Groupe"], observed=True)["Quantité"].sum().unstack(fill_value=0)
+    for a in artistes:
+        if a not in mat.columns:
+            mat[a] = 0
+    largeur = min(fenetre, len(artistes))
+    fenetres = [mat[artistes[i:i + largeur]].sum(axis=1) for i in range(len(artistes) - largeur + 1)]
+    res = pd.concat(fenetres, axis=1).max(axis=1).rename("Total").reset_index()
+    res[["Catégorie", "Marque", "Modèle"]] = res[["Catégorie", "Marque", "Modèle"]].astype(str)
+    return res[res["Total"] > 0].sort_values(["Catégorie", "Marque", "Modèle"]).reset_index(drop=True)
+
+
+def festival(graine=0):
+    rng = np.random.default_rng(graine)
+    plan, fiches = [], []
+    for jour in ["2026-07-01", "2026-07-02"]:
+        for scene in ["Club", "MainStage"]:
+            for k in range(int(rng.integers(1, 7))):
+                artiste = f"{scene}_{jour[-1]}_{k}"
+                plan.append({"Jour": jour, "Scène": scene, "Artiste": artiste})
+                for item in rng.choice(40, size=int(rng.integers(1, 12)), replace=False):
+                    fiches.append({"Jour": jour, "Scène": scene, "Groupe": artiste, "Catégorie": f"CAT{item % 4}",
+                                   "Marque": f"M{item % 3}", "Modèle": f"X{item}", "Quantité": int(rng.integers(1, 6)),
+                                   "Artiste_Apporte": bool(rng.random() < 0.15)})
+    return typer("fiches_tech", pd.DataFrame(fiches)), typer("planning", pd.DataFrame(plan))
+
+
+def journees(planning):
+    for (jour, scene), plan in planning.groupby(["Jour", "Scène"], observed=True, sort=False):
+        yield str(jour), str(scene), plan["Artiste"].tolist()
+
+
+def sans_zeros(df):
+    return df[df["Total"] > 0].reset_index(drop=True)
+
+
+# --- PICS SUR FENÊTRE GLISSANTE ---
+def test_pics_fenetre():
+    m = np.array([[10, 20, 5, 30], [1, 2, 3, 4]])
+    assert pics_fenetre(m, [4, 4], 2).tolist() == [35, 7]
+    assert pics_fenetre(m, [4, 4], 3).tolist() == [55, 9]
+    assert pics_fenetre(m, [4, 4], 1).tolist() == [30, 4]
+    # Journée plus courte que la fenêtre : somme de tous ses artistes, zéros de complément ignorés
+    assert pics_fenetre(m, [1, 3], 2).tolist() == [10, 5]
+    assert pics_fenetre(np.zeros((0, 3), dtype=np.int64), [], 2).tolist() == []
+
+
+@pytest.mark.parametrize("fenetre", [1, 2, 3])
+def test_calcul_besoins_equivaut_a_la_boucle(fenetre):
+    fiches, planning = festival()
+    besoins = calcul_besoins(fiches, planning, fenetre)
+    fournies = fiches[~fiches["Artiste_Apporte"]]
+    for jour, scene, artistes in journees(planning):
+        attendu = pic_boucle(fournies[(fournies["Jour"] == jour) & (fournies["Scène"] == scene)], artistes, fenetre)
+        calcule = sans_zeros(besoins_jour_scene(besoins, jour, scene))
+        assert calcule.values.tolist() == attendu.values.tolist(), (jour, scene)
+
+
+def test_materiel_apporte_ignore():
+    fiches, planning = festival()
+    apporte = fiches.assign(Artiste_Apporte=True)
+    assert calcul_besoins(apporte, planning).empty
+
+
+# --- CACHE INCRÉMENTAL ---
+def test_cache_equivaut_au_calcul_complet():
+    fiches, planning = festival(1)
+    cache = BesoinsCache()
+    assert len(cache.actualiser(fiches, planning, 2)) == len(list(journees(planning)))
+    besoins = calcul_besoins(fiches, planning, 2)
+    for jour, scene, _ in journees(planning):
+        assert cache.pics(jour, scene).values.tolist() == besoins_jour_scene(besoins, jour, scene).values.tolist()
+    assert cache.periode("Club").values.tolist() == besoins_periode(besoins, "Club").values.tolist()
+    # Rien n'a changé : aucune journée recalculée
+    assert cache.actualiser(fiches, planning, 2) == []
+
+
+def test_cache_recalcule_la_seule_journee_modifiee():
+    fiches, planning = festival(2)
+    cache = BesoinsCache()
+    cache.actualiser(fiches, planning, 2)
+    artiste = planning["Artiste"].iloc[0]
+    cle = (str(planning["Jour"].iloc[0]), str(planning["Scène"].iloc[0]))
+    ajout = pd.DataFrame([{"Jour": cle[0], "Scène": cle[1], "Groupe": artiste, "Catégorie": "CAT1", "Marque": "M1",
+                           "Modèle": "NOUVEAU", "Quantité": 3, "Artiste_Apporte": False}])
+    fiches2 = typer("fiches_tech", pd.concat([fiches.astype(object), ajout], ignore_index=True))
+    assert cache.actualiser(fiches2, planning, 2) == [cle]
+    assert cache.pics(*cle).query("Modèle == 'NOUVEAU'")["Total"].tolist() == [3]
+    assert cache.pics(*cle, groupe=artiste).query("Modèle == 'NOUVEAU'")["Total"].tolist() == [3]
+    # Changer la fenêtre invalide tout le cache
+    assert len(cache.actualiser(fiches2, planning, 3)) == len(list(journees(planning)))
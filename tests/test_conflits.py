@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from regie.conflits import ConflitsCache, chevauchements
+from regie.index import IndexJourScene
+from regie.schema import typer
+
+
+# --- BALAYAGE TRIÉ ---
+def paires_naives(groupes, debuts, fins, lignes):
+    n = len(debuts)
+    return {tuple(sorted((i, j))) for i in range(n) for j in range(i + 1, n)
+            if groupes[i] == groupes[j] and lignes[i] != lignes[j] and debuts[i] < fins[j] and debuts[j] < fins[i]}
+
+
+def test_chevauchements_equivaut_aux_paires():
+    rng = np.random.default_rng(0)
+    n = 300
+    groupes = rng.integers(0, 4, n)
+    debuts = rng.integers(0, 1400, n)
+    fins = debuts + rng.integers(1, 120, n)
+    lignes = rng.integers(0, 150, n)
+    a, b = chevauchements(groupes, debuts, fins, lignes)
+    trouvees = {tuple(sorted(p)) for p in zip(a.tolist(), b.tolist())}
+    assert len(trouvees) == len(a)
+    assert trouvees == paires_naives(groupes, debuts, fins, lignes)
+
+
+def test_bord_a_bord_et_meme_ligne():
+    # [0, 60) puis [60, 90) : pas de conflit ; deux phases d'une même ligne non plus
+    a, b = chevauchements([0, 0, 0], [0, 60, 30], [60, 90, 70], [0, 1, 0])
+    assert {tuple(sorted(p)) for p in zip(a.tolist(), b.tolist())} == {(1, 2)}
+    assert len(chevauchements([0], [0], [10], [0])[0]) == 0
+    # Groupes différents : pas de conflit
+    assert len(chevauchements([0, 1], [0, 0], [60, 60], [0, 1])[0]) == 0
+
+
+# --- CONFLITS DU PLANNING ---
+def planning():
+    return typer("planning", pd.DataFrame({
+        "Scène": ["Club", "Club", "MainStage", "Club"],
+        "Jour": ["2026-07-01", "2026-07-01", "2026-07-01", "2026-07-02"],
+        "Artiste": ["A", "B", "C", "D"],
+        "Balance Début": ["15:00", "15:30", "15:30", None], "Balance Fin": ["16:00", "16:30", "16:30", None],
+        # Inst Off Stage hors plateau : ne gêne pas le show de A
+        "Inst Off Début": [None, "20:30", None, None], "Inst Off Fin": [None, "21:30", None, None],
+        "Show Début": ["20:00", "22:00", "20:00", "20:00"], "Show Fin": ["21:00", "23:00", "21:00", "21:00"],
+    }))
+
+
+def test_conflits_par_journee():
+    plan = planning()
+    cache = ConflitsCache()
+    cache.actualiser(plan, IndexJourScene(plan))
+    c = cache.conflits()
+    assert c[["Jour", "Scène", "Artiste", "Phase", "Artiste 2", "Phase 2"]].values.tolist() == [
+        ["2026-07-01", "Club", "A", "Balance", "B", "Balance"]]
+    assert c[["_ligne", "_ligne 2"]].values.tolist() == [[0, 1]]
+    alertes = cache.par_ligne("2026-07-01", "Club")
+    assert alertes.index.tolist() == [0, 1]
+    assert alertes[0] == "Balance ↔ B Balance 15:30-16:30"
+
+
+def test_cache_recalcule_la_seule_journee_modifiee():
+    plan = planning()
+    cache = ConflitsCache()
+    assert len(cache.actualiser(plan, IndexJourScene(plan))) == 3
+    modifie = plan.copy()
+    modifie.loc[3, "Balance Début"], modifie.loc[3, "Balance Fin"] = 14 * 60, 16 * 60
+    assert cache.actualiser(modifie, IndexJourScene(modifie)) == [("2026-07-02", "Club")]
+    assert cache.actualiser(modifie, IndexJourScene(modifie)) == []
+    # Balance de B ramenée après celle de A : plus de conflit
+    modifie.loc[1, ["Balance Début", "Balance Fin"]] = [plan.loc[0, "Balance Fin"], plan.loc[0, "Balance Fin"] + 60]
+    assert cache.actualiser(modifie, IndexJourScene(modifie)) == [("2026-07-01", "Club")]
+    assert cache.conflits().empty
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from regie.edition import appliquer_edition, delta_editeur
+from regie.schema import conforme, typer
+
+
+def fiches():
+    return typer("fiches_tech", pd.DataFrame({
+        "Scène": ["Club", "Club", "MainStage"], "Jour": ["2026-07-01"] * 3, "Groupe": ["A", "A", "B"],
+        "Catégorie": ["MICROS", "DI", "MICROS"], "Marque": ["SHURE", "BSS", "SHURE"],
+        "Modèle": ["SM58", "AR133", "SM57"], "Quantité": [4, 2, 6], "Artiste_Apporte": [False, True, False],
+    }))
+
+
+def donnees(serie):
+    return serie.array.codes if isinstance(serie.dtype, pd.CategoricalDtype) else serie.to_numpy()
+
+
+def typage(df):
+    return typer("fiches_tech", df)
+
+
+def test_delta_editeur():
+    etat = {"edited_rows": {"2": {"Quantité": 3}, "0": {}}, "added_rows": [{"Modèle": "X"}], "deleted_rows": [4, 1]}
+    assert delta_editeur(etat) == ({2: {"Quantité": 3}}, [{"Modèle": "X"}], [1, 4])
+    assert delta_editeur(None) == ({}, [], [])
+
+
+# --- RETYPAGE PARTIEL ---
+def test_modification_ne_touche_que_la_colonne_saisie():
+    df = fiches()
+    res = appliquer_edition(df, {"edited_rows": {1: {"Quantité": "5"}}}, typage=typage)
+    assert res is not df and conforme("fiches_tech", res)
+    assert res["Quantité"].tolist() == [4, 5, 6] and res["Quantité"].dtype == "int32"
+    assert df["Quantité"].tolist() == [4, 2, 6]
+    # Colonnes non modifiées : mêmes données, sans copie
+    for col in ["Scène", "Groupe", "Modèle", "Artiste_Apporte"]:
+        assert np.shares_memory(donnees(res[col]), donnees(df[col]))
+
+
+def test_modification_ajoute_les_categories():
+    df = fiches()
+    res = appliquer_edition(df, {"edited_rows": {0: {"Modèle": "BETA 58", "Artiste_Apporte": True}}}, typage=typage)
+    assert res["Modèle"].tolist() == ["BETA 58", "AR133", "SM57"]
+    assert isinstance(res["Modèle"].dtype, pd.CategoricalDtype) and "BETA 58" in res["Modèle"].cat.categories
+    assert res["Artiste_Apporte"].tolist() == [True, True, False] and res["Artiste_Apporte"].dtype == bool
+
+
+def test_vue_partielle_ajout_et_suppression():
+    df = fiches()
+    # Vue de l'artiste A : lignes 0 et 1 de la table
+    etat = {"edited_rows": {1: {"Quantité": 8}}, "deleted_rows": [0],
+            "added_rows": [{"Catégorie": "MICROS", "Marque": "SHURE", "Modèle": "SM81", "Quantité": "2"}, {}, {"Modèle": ""}]}
+    res = appliquer_edition(df, etat, lignes=np.array([0, 1]), typage=typage,
+                            fixes={"Scène": "Club", "Jour": "2026-07-01", "Groupe": "A"})
+    assert conforme("fiches_tech", res)
+    assert res[["Groupe", "Modèle", "Quantité"]].astype(object).values.tolist() == [
+        ["A", "AR133", 8], ["B", "SM57", 6], ["A", "SM81", 2]]
+    assert res["Artiste_Apporte"].tolist() == [True, False, False]
+    assert res.index.tolist() == [0, 1, 2]
+
+
+def test_defauts_et_planning_en_minutes():
+    plan = typer("planning", pd.DataFrame({"Scène": ["Club"], "Jour": ["2026-07-01"], "Artiste": ["A"],
+                                           "Show Début": ["20:00"], "Show Fin": ["21:00"]}))
+    etat = {"edited_rows": {0: {"Show Fin": "01:30"}}, "added_rows": [{"Scène": "Club", "Jour": "2026-07-01", "Artiste": None}]}
+    res = appliquer_edition(plan, etat, typage=lambda d: typer("planning", d, 360), defauts={"Artiste": "À définir"})
+    assert res["Artiste"].tolist() == ["A", "À définir"]
+    assert res.loc[0, "Show Fin"] - res.loc[0, "Show Début"] == 330
+    assert res["Show Début"].dtype == "Int16"
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from regie.horaires import JOUR, minute, minutes, minutes_vers_texte, phases_longues, rebaser, texte_vers_minutes
+from regie.schema import typer
+
+
+# --- LECTURE DES HORAIRES ---
+def test_texte_vers_minutes():
+    serie = pd.Series(["06:00", "05:59", "23:30", "01:00", " 7:05 ", "-- none --", "25:00", "12:60", None])
+    assert texte_vers_minutes(serie, 360).tolist() == [0, 1439, 1050, 1140, 65, pd.NA, pd.NA, pd.NA, pd.NA]
+    assert texte_vers_minutes(serie, 0).tolist()[:4] == [360, 359, 1410, 60]
+    assert str(texte_vers_minutes(serie).dtype) == "Int16"
+
+
+def test_minutes_mixtes_et_scalaire():
+    assert minutes(pd.Series(["07:00", 90, None], dtype=object), 360).tolist() == [60, 90, pd.NA]
+    assert minutes(pd.Series([30.0, 45.4])).tolist() == [30, 45]
+    assert minute("02:15", 360) == 1215
+    assert minute("-- none --") is None
+
+
+def test_aller_retour_texte():
+    textes = pd.Series(["06:00", "18:45", "00:10", "05:55"])
+    assert minutes_vers_texte(texte_vers_minutes(textes, 360), 360).tolist() == textes.tolist()
+    assert minutes_vers_texte(pd.Series([pd.NA, 1500], dtype="Int16"), 360).tolist() == ["-- none --", "07:00"]
+
+
+# --- FINS APRÈS MINUIT ET CHANGEMENT DE DÉBUT DE JOURNÉE ---
+def planning_nuit(debut=360):
+    return typer("planning", pd.DataFrame({
+        "Scène": ["Club", "Club"], "Jour": ["2026-07-01"] * 2, "Artiste": ["A", "B"],
+        "Show Début": ["23:30", "05:00"], "Show Fin": ["01:00", "07:00"],
+        "Balance Début": ["15:00", None], "Balance Fin": ["16:00", None],
+    }), debut)
+
+
+def test_fin_avant_debut_passe_au_lendemain():
+    plan = planning_nuit()
+    # 23:30 -> 01:00 dure 90 min ; 05:00 -> 07:00 traverse le début de journée (06:00)
+    assert (plan["Show Fin"] - plan["Show Début"]).tolist() == [90, 120]
+    assert plan["Show Fin"].tolist() == [1140, 60 + JOUR]
+    ev = phases_longues(plan, 360)
+    assert ((ev["Fin"] - ev["Début"]) > 0).all()
+
+
+def test_rebaser_conserve_horloge_et_durees():
+    plan = planning_nuit(360)
+    rebase = rebaser(plan, 360, 0)
+    for c in ["Show Début", "Show Fin", "Balance Début", "Balance Fin"]:
+        assert minutes_vers_texte(rebase[c], 0).tolist() == minutes_vers_texte(plan[c], 360).tolist()
+    assert (rebase["Show Fin"] - rebase["Show Début"]).tolist() == [90, 120]
+    assert rebase["Balance Début"].isna().tolist() == [False, True]
+    assert str(rebase["Show Début"].dtype) == "Int16"
+    # Retour au début d'origine : planning identique
+    pd.testing.assert_frame_equal(rebaser(rebase, 0, 360), plan)
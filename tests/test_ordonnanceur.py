@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+from regie.ordonnanceur import COLS_DUREES, NOMS_PHASES, Infaisable, appliquer, durees_planning, ordonnancer
+from regie.schema import typer
+
+PORTES, COUVRE_FEU = 18 * 60, 18 * 60 + 250
+
+
+def durees(lignes):
+    """(Artiste, {phase: minutes}, show fixe) -> table des durées dans l'ordre souhaité."""
+    return pd.DataFrame([{"Artiste": a, **dict.fromkeys(NOMS_PHASES, 0), **d, "Show fixe": fixe}
+                         for a, d, fixe in lignes])[COLS_DUREES]
+
+
+# --- SOIR : ORDRE DE PASSAGE ---
+def test_ordre_souhaite_garde_quand_il_tient():
+    d = durees([("A", {"Change Over": 20, "Show": 60, "Balance": 30}, None),
+                ("B", {"Change Over": 30, "Show": 90, "Balance": 45, "Inst Off Stage": 40}, None)])
+    res = ordonnancer(d, PORTES, COUVRE_FEU)
+    assert res["Artiste"].tolist() == ["A", "B"]
+    # Premier show aux portes, change over collé au show, blocs enchaînés sans temps mort
+    assert res["Change Over Début"].tolist() == [PORTES - 20, PORTES + 60]
+    assert res["Show Début"].tolist() == [PORTES, PORTES + 90]
+    assert res.loc[1, "Inst Off Début"] == res.loc[1, "Change Over Début"] - 40
+    # Matin en ordre inverse de passage : A (premier à jouer) balance en dernier, juste avant son change over
+    assert res.loc[0, "Balance Fin"] == res.loc[0, "Change Over Début"]
+    assert res.loc[1, "Balance Fin"] == res.loc[0, "Balance Début"]
+    assert res["Load IN Début"].isna().all()
+
+
+def test_retour_arriere_autour_d_un_show_fixe():
+    # X joue à heure fixe (100 min après les portes) : 100 min avant, 100 min après jusqu'au couvre-feu.
+    # L'ordre souhaité A, B remplit 90 min avant X et laisse C + D (110 min) après : impasse,
+    # la recherche revient en arrière et place C avant X.
+    d = durees([("A", {"Show": 60}, None), ("B", {"Show": 30}, None), ("X", {"Show": 50}, PORTES + 100),
+                ("C", {"Show": 40}, None), ("D", {"Show": 70}, None)])
+    res = ordonnancer(d, PORTES, COUVRE_FEU)
+    assert res["Artiste"].tolist() == ["A", "C", "X", "B", "D"]
+    assert (res["Show Début"] - PORTES).tolist() == [0, 60, 100, 150, 180]
+    assert res["Show Fin"].max() == COUVRE_FEU
+    assert res["_ligne"].tolist() == [0, 3, 2, 1, 4]
+    with pytest.raises(Infaisable):
+        ordonnancer(d, PORTES, COUVRE_FEU, ordre_impose=True)
+
+
+def test_infaisable():
+    trop_long = durees([("A", {"Show": 200}, None), ("B", {"Show": 100}, None)])
+    with pytest.raises(Infaisable):
+        ordonnancer(trop_long, PORTES, COUVRE_FEU)
+    ancres = durees([("A", {"Show": 60}, PORTES), ("B", {"Show": 60}, PORTES + 30)])
+    with pytest.raises(Infaisable):
+        ordonnancer(ancres, PORTES, COUVRE_FEU)
+    balances = durees([("A", {"Show": 60, "Balance": 120}, None)])
+    with pytest.raises(Infaisable):
+        ordonnancer(balances, PORTES, COUVRE_FEU, acces=PORTES - 60)
+
+
+# --- REPORT DANS LE PLANNING ---
+def test_appliquer_reordonne_la_journee():
+    plan = typer("planning", pd.DataFrame({
+        "Scène": ["Club", "MainStage", "Club"], "Jour": ["2026-07-01"] * 3, "Artiste": ["A", "Z", "B"],
+        "Show Début": ["20:00", "20:00", "21:00"], "Show Fin": ["21:00", "21:30", "23:00"],
+    }))
+    positions = [0, 2]
+    d = durees_planning(plan.iloc[positions], 360)
+    assert d["Show"].tolist() == [60, 120]
+    d["Show fixe"] = [None, 18 * 60 - 360]
+    res = appliquer(plan, positions, ordonnancer(d, 18 * 60 - 360, 24 * 60 - 360))
+    assert res["Artiste"].tolist() == ["B", "A", "Z"]
+    assert res["Show Début"].tolist() == [720, 840, 840]
+    assert res["Scène"].astype(str).tolist() == ["Club", "Club", "MainStage"]
@@ -0,0 +1,125 @@
+import pandas as pd
+
+from regie.patch import PatchAllocator, Reserve, _numeros, normaliser_patches, patch_automatique, pieds_disponibles, projeter_tables, table_patch
+
+
+# --- FICHE MATÉRIEL DE RÉFÉRENCE ---
+def fiche():
+    return pd.DataFrame({
+        "Catégorie": ["MICROS", "MICROS", "DI", "PIEDS MICROS", "MICROS"],
+        "Modèle": ["Beta 91", "SM57", "BSS AR133", "Grand pied", "KM184"],
+        "Quantité": [1, 3, 2, 3, 2],
+    })
+
+
+# --- ANCIENNES SAUVEGARDES (LIBELLÉS COLORÉS) ---
+def test_numeros_libelles():
+    serie = pd.Series(["B12M/F 10 🟤2", None, "INPUT 3", "B20 7 🟠"], dtype=object)
+    assert _numeros(serie).tolist() == [10, pd.NA, 3, 7]
+    assert str(_numeros(serie).dtype) == "Int16"
+
+
+def test_numeros_numerique_et_vide():
+    assert _numeros(pd.Series([1, 2])).tolist() == [1, 2]
+    assert _numeros(pd.Series([None, None], dtype=object)).isna().all()
+
+
+def test_table_patch_colonnes_manquantes():
+    df = table_patch(pd.DataFrame({"Input": ["INPUT 5 🔴", None]}))
+    assert list(df.columns) == ["Boîtier", "Input", "Micro / DI", "Source", "Stand", "48V"]
+    assert df["Boîtier"].isna().all()
+    assert df["Input"].tolist() == [5, pd.NA]
+    assert df["Source"].tolist() == ["", ""]
+    assert df["48V"].tolist() == [False, False]
+    assert "Boîtier" not in table_patch(df, boitiers=False).columns
+
+
+def test_normaliser_patches_ancienne_sauvegarde():
+    ancien = pd.DataFrame({"Boîtier": ["B12M/F 10 🟤2", None], "Input": ["INPUT 109 🟤2", "INPUT 3"],
+                           "Micro / DI": ["SM57 #1", None], "Source": ["Caisse claire", None],
+                           "Stand": [None, None], "48V": [None, True]})
+    master = pd.DataFrame({"Input": ["INPUT 1"], "Micro / DI": [None], "Source": [""], "Stand": [None], "48V": [False]})
+    patches = {"Artiste": {"nb_inputs": 2, "12N": {"DEPART_10": ancien, "MASTER": master},
+                           "12N_src": {"DEPART_10": ancien}, "20H": None},
+               "Illisible": "texte"}
+    res = normaliser_patches(patches)
+    assert list(res) == ["Artiste"]
+    assert list(res["Artiste"]) == ["nb_inputs", "12N", "20H"]
+    depart = res["Artiste"]["12N"]["DEPART_10"]
+    assert depart[["Boîtier", "Input"]].astype(object).values.tolist() == [[10, 109], [pd.NA, 3]]
+    assert depart["48V"].tolist() == [False, True]
+    assert "Boîtier" not in res["Artiste"]["12N"]["MASTER"].columns
+    assert res["Artiste"]["20H"] is None
+    # Projection : les libellés d'origine sont retrouvés
+    proj = projeter_tables(res["Artiste"]["12N"], "12N")["DEPART_10"]
+    assert proj.loc[0, ["Boîtier", "Input"]].tolist() == ["B12M/F 10 🟤2", "INPUT 109 🟤2"]
+
+
+# --- PATCH AUTOMATIQUE ---
+def test_patch_automatique_departs():
+    tables = patch_automatique(fiche(), 14, 12, 3)
+    assert list(tables) == ["DEPART_1", "DEPART_2"]
+    d1, d2 = tables["DEPART_1"], tables["DEPART_2"]
+    assert len(d1) == len(d2) == 12
+    assert d1["Input"].tolist() == list(range(1, 13))
+    assert (d1["Boîtier"] == 1).all()
+    # Beta 91 : sans pied, 48V ; SM57 : pieds de la fiche tant qu'il en reste
+    assert d1.loc[0, "Micro / DI"].startswith("Beta 91")
+    assert d1.loc[0, "Stand"] is None and bool(d1.loc[0, "48V"])
+    sm57 = d1["Micro / DI"].str.startswith("SM57", na=False)
+    assert sm57.sum() == 3
+    assert d1.loc[sm57, "Stand"].tolist() == ["Grand pied"] * 3
+    assert d2.loc[:1, "Input"].tolist() == [13, 14]
+    assert d2.loc[:1, "Boîtier"].tolist() == [2, 2]
+    assert d2["Input"].iloc[2:].isna().all()
+    proj = projeter_tables(tables, "12N")["DEPART_2"]
+    assert proj.loc[0, ["Boîtier", "Input"]].tolist() == ["B12M/F 2 🔴", "INPUT 13 🔴"]
+
+
+def test_patch_automatique_master():
+    tables = patch_automatique(fiche(), 14, 12, 3, master=24, cible="MASTER")
+    assert list(tables) == ["MASTER", "DEPART_1", "DEPART_2"]
+    assert "Boîtier" not in tables["MASTER"].columns
+    assert tables["MASTER"]["Input"].iloc[:14].tolist() == list(range(1, 15))
+    assert tables["MASTER"]["Micro / DI"].notna().sum() == 8
+    assert tables["DEPART_1"]["Input"].isna().all()
+
+
+def test_pieds_quantite_nulle():
+    mat = pd.concat([fiche(), pd.DataFrame({"Catégorie": ["PIEDS MICROS"] * 2, "Modèle": ["Petit pied", "Pince"],
+                                            "Quantité": [0, None]})], ignore_index=True)
+    assert pieds_disponibles(mat) == (["Grand pied"], [3])
+    alloc = PatchAllocator.depuis_fiche(mat, 14, 12, 3)
+    assert "Petit pied" not in alloc.options("DEPART_1", "Stand")
+    assert "Pince" not in alloc.options("DEPART_1", "Stand")
+    # Pieds de la fiche attribués tant qu'il en reste, jamais un modèle à quantité nulle
+    stands = patch_automatique(mat, 14, 12, 3)["DEPART_1"]["Stand"]
+    assert set(stands.dropna()) == {"Grand pied"}
+
+
+# --- RÉSERVES ---
+def test_reserve_options():
+    r = Reserve([1, 2, 3])
+    r.prendre("DEPART_1", 1)
+    assert r.options("DEPART_2") == [None, 2, 3]
+    # Une valeur déjà dans la table reste proposée
+    assert r.options("DEPART_1") == [None, 1, 2, 3]
+    r.rendre("DEPART_1", 1)
+    assert r.options("DEPART_2") == [None, 1, 2, 3]
+    assert r.utilises() == 0
+
+
+def test_reserve_capacites_domaine_et_hors_reserve():
+    r = Reserve(["Grand pied", "Petit pied"], [2, 1])
+    r.prendre("A", "Grand pied")
+    r.prendre("B", "Petit pied")
+    assert r.options("C") == [None, "Grand pied"]
+    r.prendre("C", "Grand pied")
+    assert r.options("D") == [None]
+    # Domaine restreint, sans retirer les valeurs déjà prises dans la table
+    assert r.options("B", [True, False]) == [None, "Petit pied"]
+    # Valeur retirée de la fiche : proposée uniquement dans sa table
+    r.prendre("A", "Pince")
+    assert r.options("A")[-1] == "Pince" and "Pince" not in r.options("B")
+    r.rendre("A", "Pince")
+    assert "Pince" not in r.options("A")
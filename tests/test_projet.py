@@ -0,0 +1,132 @@
+import hashlib
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from regie.patch import patch_automatique
+from regie.projet import ProjetArchive, ProjetWriter, normaliser_etat
+from regie.riders import RiderStore
+from regie.schema import typer
+
+
+def etat_projet():
+    planning = typer("planning", pd.DataFrame({
+        "Scène": ["Club", "Club"], "Jour": ["2026-07-01", "2026-07-01"], "Artiste": ["A", "B"],
+        "Balance Début": ["14:00", "15:30"], "Balance Fin": ["15:00", "16:30"],
+        "Show Début": ["20:00", "23:30"], "Show Fin": ["21:00", "01:00"],
+    }))
+    fiches = typer("fiches_tech", pd.DataFrame({
+        "Scène": ["Club"], "Jour": ["2026-07-01"], "Groupe": ["A"], "Catégorie": ["MICROS"],
+        "Marque": ["SHURE"], "Modèle": ["SM58"], "Quantité": [4], "Artiste_Apporte": [False],
+    }))
+    # Contacts après une édition dans l'application : DataFrames, pas des dicts
+    contacts = pd.DataFrame({"Rôle": ["Régie générale"], "Nom": ["Martin"], "Prénom": ["Léa"],
+                             "Tel": ["0600000000"], "Mail": ["lea@exemple.fr"], "Canal Talkie": ["3"]})
+    return {
+        "planning": planning, "fiches_tech": fiches, "alim_elec": None,
+        "festival_name": "Test", "fenetre_besoins": 3, "debut_journee": 360,
+        "artist_circuits": {"A": {"LIGNES": 4}}, "notes_artistes": {"A": "note"},
+        "contacts_festival": contacts,
+        "contacts_scenes": {"Club": contacts},
+        "contacts_artistes": {"A": contacts},
+        "riders_stockage": {"A": {"rider.pdf": b"%PDF-1.4 rider A"}},
+    }
+
+
+def relire(data, **options):
+    archive = ProjetArchive(io.BytesIO(data))
+    try:
+        return archive.charger(**options)
+    finally:
+        archive.close()
+
+
+def test_aller_retour_archive():
+    etat = etat_projet()
+    charge = normaliser_etat(relire(ProjetWriter().ecrire(etat)))
+    pd.testing.assert_frame_equal(charge["planning"], etat["planning"])
+    assert charge["planning"]["Show Fin"].tolist() == [15 * 60, 19 * 60]
+    pd.testing.assert_frame_equal(charge["fiches_tech"], etat["fiches_tech"])
+    pd.testing.assert_frame_equal(charge["contacts_festival"], etat["contacts_festival"])
+    pd.testing.assert_frame_equal(charge["contacts_scenes"]["Club"], etat["contacts_festival"])
+    pd.testing.assert_frame_equal(charge["contacts_artistes"]["A"], etat["contacts_festival"])
+    assert charge["riders_stockage"] == {"A": {"rider.pdf": b"%PDF-1.4 rider A"}}
+    assert charge["artist_circuits"] == {"A": {"LIGNES": 4}}
+    assert (charge["festival_name"], charge["fenetre_besoins"], charge["debut_journee"]) == ("Test", 3, 360)
+    assert len(charge["alim_elec"]) == 0
+
+
+def test_aller_retour_patchs_et_sections_inchangees():
+    etat = etat_projet()
+    mat = pd.DataFrame({"Catégorie": ["MICROS", "PIEDS MICROS"], "Modèle": ["SM58", "Grand pied"], "Quantité": [4, 2]})
+    etat["patches_io"] = {"A": {"nb_inputs": 14, "12N": patch_automatique(mat, 14, 12, 3), "20H": None}}
+    writer = ProjetWriter()
+    data = writer.ecrire(etat)
+    charge = normaliser_etat(relire(data))
+    for table, df in etat["patches_io"]["A"]["12N"].items():
+        pd.testing.assert_frame_equal(charge["patches_io"]["A"]["12N"][table], df)
+    assert charge["patches_io"]["A"]["20H"] is None
+    # Deuxième sauvegarde sans modification : archive identique ; une section modifiée est re-sérialisée
+    assert writer.ecrire(etat) == data
+    etat["notes_artistes"] = {"A": "autre note"}
+    assert normaliser_etat(relire(writer.ecrire(etat)))["notes_artistes"] == {"A": "autre note"}
+
+
+def test_normaliser_etat_valeurs_absentes():
+    etat = etat_projet()
+    etat.update({"contacts_festival": None, "notes_artistes": None, "debut_journee": 0, "fenetre_besoins": None})
+    charge = normaliser_etat(etat)
+    assert charge["contacts_festival"] == {} and charge["notes_artistes"] == {}
+    # Minuit est un début de journée valide, pas une valeur absente
+    assert charge["debut_journee"] == 0
+    assert charge["fenetre_besoins"] == 2
+
+
+# --- RIDERS : EMPREINTES VÉRIFIÉES ---
+def alterer(data, chemin, contenu):
+    """Copie de l'archive `data` où le membre `chemin` est remplacé par `contenu`."""
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(data)) as src, zipfile.ZipFile(out, "w") as dst:
+        for info in src.infolist():
+            dst.writestr(info, contenu if info.filename == chemin else src.read(info))
+    return out.getvalue()
+
+
+def test_importer_riders_ecarte_contenu_altere(tmp_path):
+    etat = etat_projet()
+    etat["riders_stockage"]["B"] = {"sain.pdf": b"%PDF-1.4 rider B"}
+    data = ProjetWriter().ecrire(etat)
+    sha_a = hashlib.sha256(b"%PDF-1.4 rider A").hexdigest()
+    sha_b = hashlib.sha256(b"%PDF-1.4 rider B").hexdigest()
+    data = alterer(data, f"riders/{sha_a}", b"%PDF-1.4 autre contenu")
+
+    store = RiderStore(str(tmp_path))
+    # Le store connaît déjà ce SHA (autre projet) : le membre altéré est tout de même écarté
+    store.ajouter(b"%PDF-1.4 rider A")
+    archive = ProjetArchive(io.BytesIO(data))
+    with pytest.warns(UserWarning):
+        index = archive.importer_riders(store)
+    assert index == {"A": {}, "B": {"sain.pdf": sha_b}}
+    assert archive.riders_ecartes == [("A", "rider.pdf")]
+    assert store.lire(sha_b) == b"%PDF-1.4 rider B"
+    assert store.lire(sha_a) == b"%PDF-1.4 rider A"
+
+    with pytest.warns(UserWarning):
+        assert relire(data)["riders_stockage"] == {"A": {}, "B": {"sain.pdf": b"%PDF-1.4 rider B"}}
+
+
+def test_ecrire_sans_rider_du_store(tmp_path):
+    store = RiderStore(str(tmp_path))
+    present = store.ajouter(b"%PDF-1.4 present")
+    purge = hashlib.sha256(b"%PDF-1.4 purge").hexdigest()
+    etat = etat_projet()
+    etat["riders_stockage"] = {"A": {"present.pdf": present, "purge.pdf": purge}}
+    writer = ProjetWriter()
+    with pytest.warns(UserWarning):
+        data = writer.ecrire(etat, store=store)
+    assert writer.absents == [("A", "purge.pdf")]
+    archive = ProjetArchive(io.BytesIO(data))
+    assert archive.index_riders() == {"A": {"present.pdf": present}}
+    assert archive.importer_riders(RiderStore(str(tmp_path / "autre"))) == {"A": {"present.pdf": present}}
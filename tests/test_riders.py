@@ -0,0 +1,36 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from regie.riders import RiderStore
+
+
+def fichiers(racine):
+    return sorted(os.path.relpath(os.path.join(d, f), racine) for d, _, fs in os.walk(racine) for f in fs)
+
+
+def test_ajouter_flux_nomme_par_contenu(tmp_path):
+    store = RiderStore(str(tmp_path))
+    data = b"%PDF-1.4 rider" * 100_000
+    sha = store.ajouter_flux(io.BytesIO(data))
+    assert sha == hashlib.sha256(data).hexdigest()
+    assert store.lire(sha) == data
+    # Même contenu : un seul blob
+    assert store.ajouter_flux(io.BytesIO(data)) == sha == store.ajouter(data)
+    assert fichiers(str(tmp_path)) == [os.path.join(sha[:2], sha)]
+
+
+def test_ajouter_flux_refuse_empreinte_fausse(tmp_path):
+    store = RiderStore(str(tmp_path))
+    annonce = hashlib.sha256(b"original").hexdigest()
+    with pytest.raises(ValueError):
+        store.ajouter_flux(io.BytesIO(b"altere"), attendu=annonce)
+    assert fichiers(str(tmp_path)) == []
+    assert store.ajouter_flux(io.BytesIO(b"original"), attendu=annonce) == annonce
+
+
+def test_chemin_refuse_empreinte_invalide(tmp_path):
+    with pytest.raises(ValueError):
+        RiderStore(str(tmp_path)).chemin("../../etc/passwd")